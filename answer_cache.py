@@ -0,0 +1,247 @@
+"""
+Shared cache of LLM answers for the general OpenAI fallback.
+
+Only conversations with an empty or short history are cached. A question is
+normalized (casefolded, stopwords removed, tokens deduplicated and sorted)
+and keyed together with a fingerprint of the history, the system prompt and
+the model, so an answer is reused only in the same context.
+
+Paraphrases are found with a 64-bit SimHash of the question's tokens. The
+hash is split into bands and every entry is listed in one Redis set per band
+(locality-sensitive hashing), so hashes that differ in only a few bits very
+likely share a band. A candidate's answer is served only if it is close in
+Hamming distance and has exactly the question's terms once filler words are
+dropped and synonyms folded, so a question about another park, animal or
+person always misses.
+
+Turns that mention a person by name (an introduction in the question or
+history, a greeting by name in the reply) are never cached: the cache is
+shared across sessions.
+"""
+
+import hashlib
+import json
+import re
+import time
+
+import metrics
+from app_logging import get_logger
+from config import ANSWER_CACHE_CONFIG
+from utils import normalize_token, tokenize
+
+log = get_logger('answer_cache')
+
+SIMHASH_BITS = 64
+
+# "I am Priya", "my name is Rahul", "Hi Priya," - capitalized, so only the original text is checked
+PERSONAL_NAME_PATTERN = re.compile(
+    r"\b(?:[Mm]y name is|[Ii] am|[Ii]'m|[Tt]his is|[Cc]all me|[Hh]i|[Hh]ello|[Hh]ey|[Dd]ear)\s+[A-Z][a-z]+"
+)
+
+
+def normalize_question(text: str, stop_words) -> list:
+    """Sorted, deduplicated, stopword-free tokens of a question"""
+    return sorted({token for token in tokenize(text.casefold()) if token not in stop_words})
+
+
+def question_hash(tokens: list) -> str:
+    return hashlib.sha1(" ".join(tokens).encode('utf-8')).hexdigest()[:16]
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(tokens: list) -> int:
+    """64-bit SimHash: each bit is the majority vote of the tokens' hash bits"""
+    votes = [0] * SIMHASH_BITS
+    for token in tokens:
+        hashed = _token_hash(token)
+        for bit in range(SIMHASH_BITS):
+            votes[bit] += 1 if hashed >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if votes[bit] > 0)
+
+
+def bands(value: int, count: int) -> list:
+    """`value` split into `count` equal bit ranges"""
+    width = SIMHASH_BITS // count
+    mask = (1 << width) - 1
+    return [value >> (band * width) & mask for band in range(count)]
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def mentions_person(text: str) -> bool:
+    """True if `text` introduces or greets someone by name"""
+    return bool(PERSONAL_NAME_PATTERN.search(text or ''))
+
+
+class AnswerCache:
+    """Redis-backed exact and near-duplicate answer lookup"""
+
+    def __init__(self, redis_client, context: str, config: dict = ANSWER_CACHE_CONFIG):
+        self.redis = redis_client
+        self.config = config
+        # Stored as tokenize() would produce them ('does' -> 'doe')
+        self.stop_words = frozenset(normalize_token(word) for word in config['stop_words'])
+        self.filler_words = frozenset(normalize_token(word) for word in config['filler_words'])
+        self.synonyms = {normalize_token(word): normalize_token(canonical) for word, canonical in config['synonyms'].items()}
+        # Answers depend on the system prompt and model too
+        self.context = hashlib.sha1(context.encode('utf-8')).hexdigest()[:12]
+        self.stats = {'exact_hits': 0, 'near_hits': 0, 'misses': 0, 'skipped': 0, 'stores': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.config['enabled']
+
+    def history_fingerprint(self, history: list):
+        """Fingerprint of a short history, or None if it is too long to cache against"""
+        if len(history) > self.config['max_history_messages']:
+            return None
+        normalized = "\n".join(
+            f"{m['sender']}:{' '.join(normalize_question(m['text'], self.stop_words))}" for m in history
+        )
+        return hashlib.sha1(f"{self.context}\n{normalized}".encode('utf-8')).hexdigest()[:16]
+
+    def core_terms(self, tokens: list) -> frozenset:
+        """Terms two paraphrases must share: filler dropped, synonyms folded"""
+        return frozenset(self.synonyms.get(token, token) for token in tokens if token not in self.filler_words)
+
+    def _key(self, *parts) -> str:
+        return self.config['key_prefix'] + ":".join(str(part) for part in parts)
+
+    def _lookup_plan(self, question: str, history: list):
+        """(history fingerprint, tokens, question hash) or None when the turn isn't cacheable"""
+        fingerprint = self.history_fingerprint(history)
+        tokens = normalize_question(question, self.stop_words)
+        if fingerprint is None or len(tokens) < self.config['min_tokens']:
+            return None
+        if mentions_person(question) or any(mentions_person(m['text']) for m in history):
+            return None
+        return fingerprint, tokens, question_hash(tokens)
+
+    async def get(self, question: str, history: list):
+        """Cached answer for this question and history, or None"""
+        if not self.enabled:
+            return None
+        plan = self._lookup_plan(question, history)
+        if plan is None:
+            self.stats['skipped'] += 1
+            return None
+        fingerprint, tokens, entry_hash = plan
+
+        try:
+            with metrics.track('redis', 'answer_cache_get'):
+                cached = await self.redis.get(self._key('entry', fingerprint, entry_hash))
+                if cached is None and self.config['near_duplicates']:
+                    cached = await self._nearest(fingerprint, tokens)
+                    result = 'near' if cached is not None else 'miss'
+                else:
+                    result = 'exact' if cached is not None else 'miss'
+        except Exception as e:
+            log.warning("Error reading answer cache", extra={'error': str(e)})
+            cached, result = None, 'error'
+
+        metrics.count_cache('answer', result)
+        if cached is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['exact_hits' if result == 'exact' else 'near_hits'] += 1
+        return json.loads(cached)['reply']
+
+    async def _nearest(self, fingerprint: str, tokens: list):
+        """Entry of the closest paraphrase sharing an LSH band with the question, if close enough"""
+        query = simhash(tokens)
+        terms = self.core_terms(tokens)
+        pipe = self.redis.pipeline(transaction=False)
+        for band, value in enumerate(bands(query, self.config['lsh_bands'])):
+            pipe.smembers(self._key('lsh', fingerprint, band, value))
+        candidates = set().union(*await pipe.execute())
+        ranked = sorted(
+            (hamming(query, int(member.split(':')[0], 16)), member.split(':')[1]) for member in candidates
+        )
+        for distance, entry_hash in ranked[:self.config['max_candidates']]:
+            if distance > self.config['max_hamming_distance']:
+                break
+            cached = await self.redis.get(self._key('entry', fingerprint, entry_hash))
+            if cached is not None and self.core_terms(json.loads(cached)['tokens']) == terms:
+                return cached
+        return None
+
+    async def put(self, question: str, history: list, reply: str):
+        """Cache an answer (no-op for uncacheable turns or empty replies)"""
+        if not self.enabled or not reply or mentions_person(reply):
+            return
+        plan = self._lookup_plan(question, history)
+        if plan is None:
+            return
+        fingerprint, tokens, entry_hash = plan
+        ttl = self.config['ttl']
+        entry = json.dumps({'tokens': tokens, 'question': question, 'reply': reply, 'cached_at': time.time()})
+        signature = simhash(tokens)
+        member = f"{signature:016x}:{entry_hash}"
+
+        try:
+            with metrics.track('redis', 'answer_cache_put'):
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.set(self._key('entry', fingerprint, entry_hash), entry, ex=ttl)
+                if self.config['near_duplicates']:
+                    for band, value in enumerate(bands(signature, self.config['lsh_bands'])):
+                        bucket = self._key('lsh', fingerprint, band, value)
+                        pipe.sadd(bucket, member)
+                        pipe.expire(bucket, ttl)
+                await pipe.execute()
+        except Exception as e:
+            log.warning("Error caching answer", extra={'error': str(e)})
+            return
+        self.stats['stores'] += 1
+
+    async def purge(self, question: str = None) -> int:
+        """Drop every cached answer, or only those for `question` (in any context); returns keys removed"""
+        if question is not None:
+            return await self._purge_question(question)
+        removed = await self._unlink_matching(self.config['key_prefix'] + '*')
+        log.info("Answer cache purged", extra={'question': question, 'keys': removed})
+        return removed
+
+    async def _purge_question(self, question: str) -> int:
+        """Drop `question`'s entries and their LSH bucket members, so paraphrases can't reach it either"""
+        tokens = normalize_question(question, self.stop_words)
+        entry_hash = question_hash(tokens)
+        signature = simhash(tokens)
+        member = f"{signature:016x}:{entry_hash}"
+        entry_prefix = self._key('entry', '')
+        fingerprints = [
+            key[len(entry_prefix):].rsplit(':', 1)[0]
+            async for key in self.redis.scan_iter(match=self._key('entry', '*', entry_hash), count=500)
+        ]
+        removed = 0
+        if fingerprints:
+            pipe = self.redis.pipeline(transaction=False)
+            for fingerprint in fingerprints:
+                pipe.unlink(self._key('entry', fingerprint, entry_hash))
+                for band, value in enumerate(bands(signature, self.config['lsh_bands'])):
+                    pipe.srem(self._key('lsh', fingerprint, band, value), member)
+            results = await pipe.execute()
+            removed = sum(results[::self.config['lsh_bands'] + 1])
+        log.info("Answer cache purged", extra={'question': question, 'keys': removed})
+        return removed
+
+    async def _unlink_matching(self, pattern: str) -> int:
+        removed = 0
+        batch = []
+        async for key in self.redis.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                removed += await self.redis.unlink(*batch)
+                batch = []
+        if batch:
+            removed += await self.redis.unlink(*batch)
+        return removed
+
+    def stats_report(self) -> dict:
+        lookups = self.stats['exact_hits'] + self.stats['near_hits'] + self.stats['misses']
+        hits = self.stats['exact_hits'] + self.stats['near_hits']
+        return {**self.stats, 'hit_ratio': round(hits / lookups, 3) if lookups else 0.0}
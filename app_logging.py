@@ -0,0 +1,197 @@
+"""
+Structured, non-blocking logging.
+
+Modules log through `get_logger('<subsystem>')` (loggers under 'junglore.')
+with data passed as `extra` fields. A QueueHandler only puts records on an
+in-memory queue; a QueueListener thread formats them (JSON lines or text)
+and writes them to stdout, so the event loop never waits on the terminal.
+Every record carries the current request id (set per request by
+RequestIdMiddleware and echoed as X-Request-ID), levels are set per
+subsystem in LOGGING_CONFIG, and DEBUG records are sampled.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+
+from config import LOGGING_CONFIG
+
+ROOT_LOGGER = 'junglore'
+
+_request_id = ContextVar('request_id', default='-')
+_listener = None
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+_exception_formatter = logging.Formatter()
+
+
+def get_logger(subsystem: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{subsystem}")
+
+
+def request_id() -> str:
+    """Id of the request being handled ('-' outside a request)"""
+    return _request_id.get()
+
+
+def _extras(record) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _STANDARD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, request id, message and extra fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'msg': record.getMessage(),
+            **_extras(record)
+        }
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def format(self, record):
+        line = (f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} "
+                f"[{getattr(record, 'request_id', '-')}] {record.name}: {record.getMessage()}")
+        extras = _extras(record)
+        if extras:
+            line += " " + " ".join(f"{k}={v}" for k, v in extras.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the request id of the context that logged them"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keeps a fraction of DEBUG records, per logger; other levels always pass"""
+
+    def __init__(self, default_rate: float, rates: dict):
+        super().__init__()
+        self.default_rate = default_rate
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = self.rates.get(record.name, self.default_rate)
+        return rate >= 1 or random.random() < rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queues records for the writer thread, dropping them when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve arguments and tracebacks now (they may change or disappear);
+        # formatting is left to the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _parse_levels(overrides: str) -> dict:
+    """'junglore.content=DEBUG,httpx=INFO' -> {'junglore.content': 'DEBUG', 'httpx': 'INFO'}"""
+    levels = {}
+    for item in overrides.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(config: dict = LOGGING_CONFIG):
+    """Route all logging through the queue and start the writer thread (once per process)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if config['format'] == 'json' else TextFormatter())
+
+    handler = NonBlockingQueueHandler(queue.Queue(config['queue_size']))
+    handler.addFilter(ContextFilter())
+    handler.addFilter(DebugSampler(config['debug_sample_rate'], config['debug_sample_rates']))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(config['level'].upper())
+    for name, level in {**config['levels'], **_parse_levels(config['level_overrides'])}.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Write out queued records and stop the writer thread (on shutdown)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """ASGI middleware giving each HTTP request an id for its log lines.
+
+    An incoming X-Request-ID (from a proxy or the client) is reused when it
+    looks sane; otherwise a new one is generated. The id is returned in the
+    response's X-Request-ID header.
+    """
+
+    def __init__(self, app, header: str = LOGGING_CONFIG['request_id_header']):
+        self.app = app
+        self.header = header.lower().encode('latin-1')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        incoming = dict(scope.get('headers', [])).get(self.header, b'').decode('latin-1')
+        current = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex[:16]
+        token = _request_id.set(current)
+
+        async def send_with_id(message):
+            if message['type'] == 'http.response.start':
+                message = {**message, 'headers': [*message.get('headers', []), (self.header, current.encode('latin-1'))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _request_id.reset(token)
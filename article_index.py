@@ -0,0 +1,226 @@
+"""
+In-memory BM25 index over published rows of the PostgreSQL `content` table.
+
+Each worker loads the index at startup and keeps it fresh with incremental
+refreshes driven by an updated_at/published_at watermark, so content
+matching for chat messages never has to touch PostgreSQL.
+
+Scores must reach `min_score_ratio` of the best score a query term can get
+in the current corpus (a word only one article contains, fully saturated),
+so the bar rises with idf as the content table grows.
+"""
+
+import asyncio
+import math
+
+from sqlalchemy import text
+
+from app_logging import get_logger
+from config import ARTICLE_INDEX_CONFIG, SITE_BASE_URL
+from utils import normalize_token, tokenize
+
+log = get_logger('content')
+
+ARTICLE_COLUMNS = """
+    id, title, slug, excerpt, author_name, featured_image, type, view_count, status,
+    COALESCE(updated_at, published_at, created_at) AS changed_at
+"""
+
+
+def row_to_article(row) -> dict:
+    """Format a content row the same way find_blog_content does"""
+    return {
+        "id": str(row.id),
+        "title": row.title,
+        "slug": row.slug,
+        "excerpt": row.excerpt or "",
+        "author": row.author_name or "Junglore",
+        "image": row.featured_image or "",
+        "type": row.type,
+        "views": row.view_count or 0,
+        "url": f"{SITE_BASE_URL}/blog/{row.slug}",  # explorejungles.com blog URL
+        "relevance_score": 0
+    }
+
+
+class ArticleIndex:
+    """Inverted index with BM25 ranking over weighted article fields"""
+
+    def __init__(self, config: dict = ARTICLE_INDEX_CONFIG):
+        self.k1 = config['k1']
+        self.b = config['b']
+        self.field_weights = config['field_weights']
+        self.articles = {}   # doc id -> article dict
+        self.doc_terms = {}  # doc id -> {term: weighted term frequency}
+        self.doc_lengths = {}
+        self.postings = {}   # term -> {doc id: weighted term frequency}
+        self.total_length = 0.0
+
+    def __len__(self):
+        return len(self.articles)
+
+    def document_frequency(self, term: str) -> int:
+        return len(self.postings.get(normalize_token(term), ()))
+
+    def upsert(self, article: dict):
+        """Add or replace an article"""
+        doc_id = article['id']
+        self.remove(doc_id)
+        terms = {}
+        for field, weight in self.field_weights.items():
+            for token in tokenize(article.get(field)):
+                terms[token] = terms.get(token, 0.0) + weight
+        self.articles[doc_id] = article
+        self.doc_terms[doc_id] = terms
+        length = sum(terms.values())
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: str):
+        """Drop an article if it is indexed"""
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self.articles.pop(doc_id, None)
+        self.total_length -= self.doc_lengths.pop(doc_id, 0.0)
+        for term in terms:
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+
+    def max_term_score(self) -> float:
+        """Best BM25 score one query term can reach in this corpus (a unique word, saturated tf)"""
+        n_docs = len(self.articles)
+        return math.log(1 + (n_docs - 0.5) / 1.5) * (self.k1 + 1)
+
+    def search(self, query: str, max_results: int = 10, min_score_ratio: float = 0.0) -> list:
+        """Return articles containing every query term, ranked by BM25 (ties broken by views).
+
+        Each query term must contribute `min_score_ratio` of max_term_score() on average,
+        so several weak terms can't add up to a match.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.articles:
+            return []
+        postings = [self.postings.get(term) for term in terms]
+        if not all(postings):
+            return []
+
+        # Intersect starting from the rarest term
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for docs in postings[1:]:
+            candidates.intersection_update(docs)
+            if not candidates:
+                return []
+
+        n_docs = len(self.articles)
+        avg_length = self.total_length / n_docs if n_docs else 0.0
+        min_score = min_score_ratio * self.max_term_score() * len(terms)
+        scored = []
+        for doc_id in candidates:
+            length_norm = 1 - self.b + self.b * (self.doc_lengths[doc_id] / avg_length if avg_length else 0)
+            score = 0.0
+            for docs in postings:
+                tf = docs[doc_id]
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+            if score >= min_score:
+                scored.append((score, self.articles[doc_id]['views'], doc_id))
+
+        scored.sort(reverse=True)
+        results = []
+        for score, _views, doc_id in scored[:max_results]:
+            article = dict(self.articles[doc_id])
+            article['relevance_score'] = round(score, 4)
+            results.append(article)
+        return results
+
+    def search_first(self, topics: list, max_results: int = 10, min_score_ratio: float = 0.0):
+        """Search topics in priority order; return (topic, posts) for the first with results"""
+        for topic in topics:
+            posts = self.search(topic, max_results, min_score_ratio)
+            if posts:
+                return topic, posts
+        return None, []
+
+
+class ArticleIndexRefresher:
+    """Loads the article index from PostgreSQL and keeps it up to date"""
+
+    def __init__(self, session_factory, config: dict = ARTICLE_INDEX_CONFIG):
+        self.session_factory = session_factory
+        self.config = config
+        self.index = ArticleIndex(config)
+        self.watermark = None  # (changed_at, id) of the last row applied
+        self.ready = False
+        self._refreshes_since_reload = 0
+
+    async def load(self):
+        """Build a fresh index from every published article and swap it in"""
+        index = ArticleIndex(self.config)
+        watermark = None
+        async with self.session_factory() as session:
+            result = await session.execute(text(f"""
+                SELECT {ARTICLE_COLUMNS}
+                FROM content
+                WHERE status = 'PUBLISHED'
+            """))
+            for row in result:
+                index.upsert(row_to_article(row))
+                if row.changed_at and (watermark is None or (row.changed_at, str(row.id)) > watermark):
+                    watermark = (row.changed_at, str(row.id))
+        self.index = index
+        self.watermark = watermark
+        self.ready = True
+        self._refreshes_since_reload = 0
+        log.info("📚 Article index loaded", extra={'articles': len(index), 'terms': len(index.postings)})
+
+    async def refresh(self) -> int:
+        """Apply rows changed after the (changed_at, id) watermark; returns the number of rows applied.
+
+        Rows that are no longer published are removed. Hard deletes are not
+        visible to the watermark, so the index is fully rebuilt every
+        `full_reload_every` refreshes.
+        """
+        if (not self.ready or self.watermark is None
+                or self._refreshes_since_reload >= self.config['full_reload_every']):
+            await self.load()
+            return len(self.index)
+        self._refreshes_since_reload += 1
+
+        async with self.session_factory() as session:
+            result = await session.execute(text(f"""
+                SELECT {ARTICLE_COLUMNS}
+                FROM content
+                WHERE (COALESCE(updated_at, published_at, created_at), CAST(id AS text))
+                      > (:watermark, :watermark_id)
+                ORDER BY changed_at, CAST(id AS text)
+            """), {"watermark": self.watermark[0], "watermark_id": self.watermark[1]})
+            rows = result.fetchall()
+
+        for row in rows:
+            if row.status == 'PUBLISHED':
+                self.index.upsert(row_to_article(row))
+            else:
+                self.index.remove(str(row.id))
+            if row.changed_at and (row.changed_at, str(row.id)) > self.watermark:
+                self.watermark = (row.changed_at, str(row.id))
+        if rows:
+            log.info("📚 Article index refreshed", extra={'changed_articles': len(rows)})
+        return len(rows)
+
+    async def run(self):
+        """Background loop: initial load, then periodic incremental refreshes"""
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.exception("Error refreshing article index")
+            await asyncio.sleep(self.config['refresh_interval'])
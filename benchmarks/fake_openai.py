@@ -0,0 +1,84 @@
+"""
+Fake OpenAI API server for load tests
+Serves /v1/chat/completions (plain and streamed) and /v1/models from the
+synthetic backend in llm_backend.py, with configurable time-to-first-token,
+token rate and reply length, so the bot can be benchmarked without network
+access or paid tokens. Unlike LLM_BACKEND=synthetic it runs out of process,
+so its work doesn't share the bot's event loop.
+
+Usage:
+    python benchmarks/fake_openai.py [--port 18080] [--ttft-ms 300] [--tokens-per-second 60] [--reply-tokens 80]
+    OPENAI_BASE_URL=http://127.0.0.1:18080/v1 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import llm_backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from llm_backend import SyntheticLLM, request_key
+
+
+async def play(entry: dict):
+    for delay, text in entry['chunks']:
+        if delay:
+            await asyncio.sleep(delay)
+        yield text
+
+
+def create_app(llm: SyntheticLLM) -> FastAPI:
+    app = FastAPI()
+
+    async def respond(request: Request):
+        body = await request.body()
+        path = request.url.path
+        entry = llm.entry_for(request.method, path, body, request_key(request.method, path, body))
+        return StreamingResponse(play(entry), status_code=entry['status'], media_type=entry['content_type'])
+
+    app.add_api_route("/v1/chat/completions", respond, methods=["POST"])
+    app.add_api_route("/v1/models", respond, methods=["GET"])
+
+    @app.get("/stats")
+    async def stats():
+        return llm.stats()
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        llm.calls.clear()
+        llm.tokens.clear()
+        return llm.stats()
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--ttft-ms', type=float, default=300, help="Time to first token (ms)")
+    parser.add_argument('--tokens-per-second', type=float, default=60)
+    parser.add_argument('--reply-tokens', type=int, default=80, help="Tokens in a chat reply")
+    parser.add_argument('--jitter', type=float, default=0.2, help="Random +/- fraction applied to every delay")
+
+
+def from_arguments(args) -> SyntheticLLM:
+    return SyntheticLLM(args.ttft_ms / 1000, args.tokens_per_second, args.reply_tokens, args.jitter)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OpenAI API for load tests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18080)
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(f"🤖 Fake OpenAI on http://{args.host}:{args.port}/v1")
+    uvicorn.run(create_app(from_arguments(args)), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""
+End-to-end load test for POST /sessions/{id}/message
+Drives the bot with a weighted mix of gate, expedition, blog and general
+messages at a fixed concurrency, against the fake OpenAI server
+(benchmarks/fake_openai.py) and the local databases from
+benchmarks/docker-compose.yml (seeded with benchmarks/seed.py).
+
+Reports throughput, p50/p95/p99 latency per message kind, and backend calls
+per request: PostgreSQL/Redis/MongoDB/OpenAI calls come from the bot's
+/metrics, connection checkouts from /stats/db-pool (one worker's view) and
+LLM calls from the fake server. With --baseline, the run fails (exit code 1)
+when throughput, a p95 or calls per request regress by more than
+--tolerance; --save-baseline records the run.
+
+Usage:
+    docker compose -f benchmarks/docker-compose.yml up -d && python benchmarks/seed.py
+    python benchmarks/load_test.py --concurrency 20 --requests 1000 --baseline benchmarks/baseline.json
+    python benchmarks/load_test.py --llm synthetic     # in-process synthetic LLM instead of the fake server
+    python benchmarks/load_test.py --llm replay        # replay cassettes recorded with LLM_BACKEND=record
+    python benchmarks/load_test.py --base-url http://localhost:8000 --no-fake-openai   # an already running bot
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Add parent directory to path to import the benchmark helpers
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+import httpx
+
+from benchmarks import fake_openai
+from benchmarks.seed import BENCH_USER_ID, DATABASE_URL, MONGODB_URI, REDIS_URL
+
+# Messages per kind; each kind exercises a different branch of answer_from_database
+MESSAGES = {
+    'gate': [
+        "Which gate is best for tiger sightings in Ranthambore?",
+        "What is the best zone in Tadoba for a morning safari?",
+        "Which gate should I choose at Corbett?"
+    ],
+    'expedition': [
+        "Do you plan expeditions to Kanha?",
+        "I want to book a safari expedition to Bandhavgarh",
+        "Show me expedition packages for Kaziranga rhinos",
+        "Do you plan jungle expeditions in Pench?"
+    ],
+    'blog': [
+        "Tell me about tiger conservation in Ranthambore",
+        "Can I read articles about leopard behavior?",
+        "I want to learn about elephant corridors",
+        "Any case study on dhole habitat?"
+    ],
+    'general': [
+        "hello there",
+        "thanks!",
+        "What is the best time to see tigers?",
+        "How hot does it get in central India in May?",
+        "What should I pack for a safari?"
+    ]
+}
+
+DEFAULT_MIX = 'gate=1,expedition=3,blog=3,general=3'
+
+METRIC_LINE = re.compile(r'^(\w+)(?:\{([^}]*)\})? ([-+0-9.eE]+|NaN|\+Inf)$')
+LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+
+def parse_mix(text: str) -> dict:
+    """'gate=1,blog=3' -> {'gate': 1.0, 'blog': 3.0}"""
+    mix = {}
+    for item in text.split(','):
+        kind, _, weight = item.partition('=')
+        kind = kind.strip()
+        if kind not in MESSAGES:
+            raise ValueError(f"Unknown message kind '{kind}' (expected one of {', '.join(MESSAGES)})")
+        mix[kind] = float(weight)
+    return mix
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile (q in 0-100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(q / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def parse_metrics(text: str) -> dict:
+    """Prometheus text format -> {(name, ((label, value), ...)): sample}"""
+    samples = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            samples[(name, tuple(sorted(LABEL.findall(labels or ''))))] = float(value)
+    return samples
+
+
+def backend_calls(before: dict, after: dict) -> dict:
+    """Backend calls made between two /metrics scrapes, by 'backend.operation'"""
+    calls = defaultdict(float)
+    for (name, labels), value in after.items():
+        if name != 'chatbot_backend_latency_seconds_count':
+            continue
+        label_map = dict(labels)
+        delta = value - before.get((name, labels), 0.0)
+        if delta:
+            calls[f"{label_map.get('backend')}.{label_map.get('operation')}"] += delta
+    return dict(calls)
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    """Throughput and latency percentiles per message kind from (kind, seconds, ok) results"""
+    by_kind = defaultdict(list)
+    errors = 0
+    for kind, seconds, ok in results:
+        if ok:
+            by_kind[kind].append(seconds * 1000)
+        else:
+            errors += 1
+    kinds = {}
+    for kind, latencies in sorted(by_kind.items()):
+        kinds[kind] = {
+            'requests': len(latencies),
+            'p50_ms': round(percentile(latencies, 50), 1),
+            'p95_ms': round(percentile(latencies, 95), 1),
+            'p99_ms': round(percentile(latencies, 99), 1),
+            'mean_ms': round(sum(latencies) / len(latencies), 1)
+        }
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'error_rate': round(errors / len(results), 4) if results else 0.0,
+        'elapsed_s': round(elapsed, 2),
+        'throughput_rps': round(len(results) / elapsed, 2) if elapsed else 0.0,
+        'kinds': kinds
+    }
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions of `report` against `baseline` beyond `tolerance` (a fraction)"""
+    regressions = []
+    if report['throughput_rps'] < baseline['throughput_rps'] * (1 - tolerance):
+        regressions.append(f"throughput {report['throughput_rps']} rps < baseline {baseline['throughput_rps']} rps")
+    for kind, stats in baseline.get('kinds', {}).items():
+        current = report['kinds'].get(kind)
+        if current is None:
+            continue
+        if current['p95_ms'] > stats['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{kind} p95 {current['p95_ms']}ms > baseline {stats['p95_ms']}ms")
+    for call, per_request in baseline.get('calls_per_request', {}).items():
+        current = report.get('calls_per_request', {}).get(call, 0.0)
+        if current > per_request * (1 + tolerance) + 0.01:
+            regressions.append(f"{call} {current} calls/request > baseline {per_request}")
+    return regressions
+
+
+class LoadTest:
+    """Sessions, message picking and the worker pool for one run"""
+
+    def __init__(self, base_url: str, mix: dict, concurrency: int, sessions: int, seed: int):
+        self.base_url = base_url
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.concurrency = concurrency
+        self.session_count = sessions
+        self.rng = random.Random(seed)
+        self.session_ids = []
+        self.http = httpx.AsyncClient(
+            base_url=base_url, timeout=60,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        )
+
+    async def open_sessions(self):
+        for i in range(self.session_count):
+            response = await self.http.post("/sessions/", json={'user_id': BENCH_USER_ID, 'title': f"load test {i}"})
+            response.raise_for_status()
+            self.session_ids.append(response.json()['session_id'])
+
+    async def send(self) -> tuple:
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        message = self.rng.choice(MESSAGES[kind])
+        session_id = self.rng.choice(self.session_ids)
+        started = time.perf_counter()
+        try:
+            response = await self.http.post(
+                f"/sessions/{session_id}/message", json={'user_id': BENCH_USER_ID, 'message': message}
+            )
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        return kind, time.perf_counter() - started, ok
+
+    async def run(self, total: int) -> tuple:
+        """Send `total` messages from `concurrency` workers; returns (results, elapsed seconds)"""
+        results = []
+        remaining = total
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                results.append(await self.send())
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return results, time.perf_counter() - started
+
+    async def get_json(self, url: str):
+        response = await self.http.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    async def scrape_metrics(self) -> dict:
+        response = await self.http.get("/metrics")
+        return parse_metrics(response.text) if response.status_code == 200 else {}
+
+    async def close(self):
+        await self.http.aclose()
+
+
+async def start_fake_openai(args):
+    """Serve the fake OpenAI API in this process; returns (uvicorn server, serving task)"""
+    import uvicorn
+    config = uvicorn.Config(
+        fake_openai.create_app(fake_openai.from_arguments(args)),
+        host='127.0.0.1', port=args.openai_port, log_level='warning'
+    )
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+def start_app(args) -> subprocess.Popen:
+    """Run the bot under uvicorn, pointed at the stand-ins"""
+    env = {
+        **os.environ,
+        'DATABASE_URL': args.database_url,
+        'MONGODB_URI': args.mongodb_uri,
+        'REDIS_URL': args.redis_url,
+        'OPENAI_API_KEY': 'load-test',
+        'LOG_LEVEL': 'WARNING',
+        'TRACING_EXPORTER': 'none'
+    }
+    if args.llm == 'fake-server':
+        env['OPENAI_BASE_URL'] = f"http://127.0.0.1:{args.openai_port}/v1"
+    else:
+        # The bot's own record/replay/synthetic transport (llm_backend.py)
+        env.update({
+            'LLM_BACKEND': args.llm,
+            'LLM_SYNTHETIC_TTFT': str(args.ttft_ms / 1000),
+            'LLM_SYNTHETIC_TOKENS_PER_SECOND': str(args.tokens_per_second),
+            'LLM_SYNTHETIC_REPLY_TOKENS': str(args.reply_tokens),
+            'LLM_SYNTHETIC_JITTER': str(args.jitter)
+        })
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(args.app_port),
+         '--workers', str(args.workers), '--log-level', 'warning'],
+        cwd=ROOT, env=env
+    )
+
+
+async def wait_until_healthy(base_url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as http:
+        while time.monotonic() < deadline:
+            try:
+                if (await http.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise SystemExit(f"Bot at {base_url} did not become healthy within {timeout:.0f}s")
+
+
+def print_report(report: dict):
+    print(f"\n📊 {report['requests']} requests in {report['elapsed_s']}s "
+          f"({report['throughput_rps']} req/s, {report['errors']} errors)")
+    print(f"   {'kind':<12}{'requests':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for kind, stats in report['kinds'].items():
+        print(f"   {kind:<12}{stats['requests']:>9}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+              f"{stats['p99_ms']:>10}{stats['mean_ms']:>10}")
+    if report.get('calls_per_request'):
+        print("   Calls per request:")
+        for call, per_request in sorted(report['calls_per_request'].items()):
+            print(f"     {call:<40}{per_request:>8}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the chat endpoint")
+    parser.add_argument('--base-url', help="Test an already running bot instead of starting one")
+    parser.add_argument('--app-port', type=int, default=18000)
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn workers for the bot")
+    parser.add_argument('--openai-port', type=int, default=18080)
+    parser.add_argument('--no-fake-openai', action='store_true', help="Don't start the fake OpenAI server")
+    parser.add_argument('--llm', choices=['fake-server', 'synthetic', 'replay'], default='fake-server',
+                        help="LLM stand-in: the fake OpenAI server, or the bot's synthetic/replay backend")
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    parser.add_argument('--mongodb-uri', default=MONGODB_URI)
+    parser.add_argument('--redis-url', default=REDIS_URL)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--warmup', type=int, default=50, help="Requests sent before measuring")
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Message kind weights (default {DEFAULT_MIX})")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', help="Baseline report (JSON) to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Write this run to --baseline")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="Allowed regression as a fraction")
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--report', help="Also write the report to this JSON file")
+    fake_openai.add_arguments(parser)
+    args = parser.parse_args()
+
+    fake_server = app_process = None
+    if not args.no_fake_openai and args.llm == 'fake-server':
+        fake_server, fake_task = await start_fake_openai(args)
+        print(f"🤖 Fake OpenAI on port {args.openai_port} (TTFT {args.ttft_ms:.0f}ms, {args.tokens_per_second:.0f} tokens/s)")
+    base_url = args.base_url
+    if base_url is None:
+        app_process = start_app(args)
+        base_url = f"http://127.0.0.1:{args.app_port}"
+    test = LoadTest(base_url, parse_mix(args.mix), args.concurrency, args.sessions, args.seed)
+
+    try:
+        await wait_until_healthy(base_url)
+        await test.open_sessions()
+        print(f"🔥 Warming up with {args.warmup} requests...")
+        await test.run(args.warmup)
+
+        metrics_before = await test.scrape_metrics()
+        pool_before = await test.get_json("/stats/db-pool")
+        if fake_server is not None:
+            async with httpx.AsyncClient() as http:
+                await http.post(f"http://127.0.0.1:{args.openai_port}/stats/reset")
+
+        print(f"🚀 Sending {args.requests} requests with concurrency {args.concurrency}...")
+        results, elapsed = await test.run(args.requests)
+
+        report = summarize(results, elapsed)
+        calls = backend_calls(metrics_before, await test.scrape_metrics())
+        pool_after = await test.get_json("/stats/db-pool")
+        calls['postgres.checkouts'] = pool_after['checkouts'] - pool_before['checkouts']
+        if fake_server is not None:
+            async with httpx.AsyncClient() as http:
+                llm = (await http.get(f"http://127.0.0.1:{args.openai_port}/stats")).json()
+            for kind, count in llm['calls'].items():
+                calls[f"llm.{kind}"] = count
+            report['llm_tokens'] = llm['tokens']
+        report['calls_per_request'] = {call: round(count / report['requests'], 3) for call, count in calls.items()}
+        report['config'] = {'concurrency': args.concurrency, 'mix': args.mix, 'workers': args.workers, 'llm': args.llm,
+                            'ttft_ms': args.ttft_ms, 'tokens_per_second': args.tokens_per_second}
+    finally:
+        await test.close()
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait(timeout=30)
+        if fake_server is not None:
+            fake_server.should_exit = True
+            await fake_task
+
+    print_report(report)
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2))
+
+    failures = []
+    if report['error_rate'] > args.max_error_rate:
+        failures.append(f"error rate {report['error_rate']} > {args.max_error_rate}")
+    if args.baseline and args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2))
+        print(f"💾 Baseline saved to {args.baseline}")
+    elif args.baseline and Path(args.baseline).exists():
+        failures += compare_to_baseline(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+    elif args.baseline:
+        print(f"⚠️  No baseline at {args.baseline} - run with --save-baseline to record one")
+
+    if failures:
+        print("\n❌ Regressions:")
+        for failure in failures:
+            print(f"   {failure}")
+        sys.exit(1)
+    print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,7 @@
 # Configuration for intent-based package matching
 
+import os
+
 # Keywords for travel intent detection
 TRAVEL_KEYWORDS = [
     'safari', 'trip', 'visit', 'go to', 'travel to', 'book', 'planning',
@@ -139,14 +141,73 @@ Keep responses concise, friendly, and data-driven. Trust that the system has alr
 # Redis cache configuration
 REDIS_CONFIG = {
     'session_history_expiry': 3600,  # 1 hour in seconds
-    'key_prefix': 'session_history:'
+    'key_prefix': 'session_messages:', # Redis list per session (one JSON entry per message)
+    'history_window': 10             # Recent messages kept as LLM context
+}
+
+# In-process session history cache in front of Redis (per worker)
+LOCAL_HISTORY_CACHE_CONFIG = {
+    'enabled': True,
+    'max_entries': 2000,             # Sessions kept per worker
+    'max_bytes': 8 * 1024 * 1024,    # Approximate size of cached message JSON per worker
+    'ttl': 120,                      # Seconds before a local entry is re-read from Redis
+    'invalidation_channel': 'session_messages:invalidate',  # Redis pub/sub channel shared by workers
+    'resubscribe_delay': 5           # Seconds before retrying a dropped pub/sub connection
+}
+
+# Write-behind persistence of chat messages (Redis journal -> batched PostgreSQL inserts)
+WRITE_BEHIND_CONFIG = {
+    'enabled': True,                 # False writes each turn to PostgreSQL before replying
+    'journal_key': 'chatbot_messages:journal',
+    'dead_letter_key': 'chatbot_messages:journal:dead',  # Turns PostgreSQL rejected
+    'flush_interval': 1.0,           # Seconds between background flushes
+    'batch_size': 200,               # Turns per multi-row INSERT (a full batch wakes the flusher early)
+    'max_pending': 10000,            # Journal length at which requests flush inline (backpressure)
+    'inline_flush_timeout': 0.5,     # Seconds a request spends flushing inline at most
+    'max_retry_delay': 30,           # Seconds between flush attempts at most while PostgreSQL is failing
+    'shutdown_flush_timeout': 10     # Seconds allowed to drain the journal on shutdown
+}
+
+# Shared cache of general (OpenAI fallback) answers, see answer_cache.py
+ANSWER_CACHE_CONFIG = {
+    'enabled': os.getenv('ANSWER_CACHE_ENABLED', 'true').lower() == 'true',
+    'key_prefix': 'answer_cache:',
+    'ttl': int(os.getenv('ANSWER_CACHE_TTL', 6 * 3600)),  # Seconds a cached answer is served
+    'max_history_messages': 2,       # Longer conversations are never cached (answers depend on context)
+    'min_tokens': 2,                 # Questions with fewer normalized tokens are not cached
+    'near_duplicates': True,         # Serve answers to paraphrases found via SimHash LSH
+    'lsh_bands': 8,                  # 64-bit SimHash split into 8 x 8-bit buckets
+    'max_hamming_distance': 14,      # Bits a paraphrase's SimHash may differ by (short questions are noisy)
+    # A paraphrase must have the same terms once these are dropped and synonyms folded, so a
+    # question about another park, animal or person never gets this one's answer
+    'filler_words': [
+        'hi', 'hello', 'hey', 'thanks', 'thank', 'kindly', 'just', 'really', 'actually', 'also',
+        'exactly', 'like', 'more', 'detail', 'details', 'info', 'information', 'guide', 'us'
+    ],
+    'synonyms': {
+        'price': 'cost', 'charge': 'cost', 'fee': 'cost', 'expensive': 'cost',
+        'season': 'time', 'month': 'time', 'period': 'time', 'when': 'time',
+        'spot': 'see', 'sighting': 'see', 'watch': 'see', 'view': 'see',
+        'visit': 'go', 'travel': 'go', 'trip': 'go',
+        'greatest': 'best', 'ideal': 'best', 'top': 'best'
+    },
+    'max_candidates': 5,             # Closest bucket members checked per lookup
+    'stop_words': [
+        'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'do', 'does', 'did', 'can', 'could',
+        'would', 'should', 'will', 'i', 'me', 'my', 'we', 'you', 'your', 'it', 'its', 'of', 'to',
+        'in', 'on', 'at', 'for', 'about', 'with', 'and', 'or', 'what', 'which', 'tell', 'please',
+        'there', 'this', 'that', 'some', 'any', 'how', 'know', 'explain'
+    ]
 }
 
 # Package suggestion configuration
 PACKAGE_SUGGESTION_CONFIG = {
     'max_description_length': 150,
     'description_suffix': '...',
-    'max_packages_to_search': 100
+    'max_packages_to_search': 100,
+    'local_preranking': True,        # Score packages locally before asking the LLM
+    'llm_candidates': 5,             # Top-K locally ranked packages shown to the LLM
+    'clear_winner_margin': 4         # Skip the LLM when the top score leads the runner-up by this much
 }
 
 # Junglore site base URLs
@@ -198,4 +259,192 @@ GATE_PREDICTION_KEYWORDS = [
 ]
 
 # URL for Junglore's AI-powered gate prediction tool
-GATE_PREDICTION_URL = "https://www.junglore.com/trips-safaris/preditive-modals"  
\ No newline at end of file
+GATE_PREDICTION_URL = "https://www.junglore.com/trips-safaris/preditive-modals"  
+# Blog/content search configuration (PostgreSQL content table)
+CONTENT_SEARCH_CONFIG = {
+    'backend': 'fulltext',           # 'fulltext' (tsvector + GIN index) or 'like' (legacy sequential scan)
+    'text_search_config': 'english', # PostgreSQL text search configuration
+    'rank_weights': [0.1, 0.2, 0.4, 1.0],  # ts_rank weights for D, C, B, A (body=C, excerpt=B, title=A)
+    'rerank_with_keywords': True,    # Re-score rows in Python with calculate_relevance_score
+    'min_relevance_score': 3,        # Minimum keyword score when re-ranking
+    'min_rank': 0.01                 # Minimum ts_rank when not re-ranking
+}
+
+# In-memory BM25 article index (answers content matching without querying PostgreSQL)
+ARTICLE_INDEX_CONFIG = {
+    'enabled': True,
+    'refresh_interval': 60,          # Seconds between incremental (watermark) refreshes
+    'full_reload_every': 60,         # Full rebuild every N refreshes (picks up hard deletes)
+    'k1': 1.2,                       # BM25 term frequency saturation
+    'b': 0.75,                       # BM25 length normalization
+    'field_weights': {'title': 3.0, 'excerpt': 1.0, 'slug': 1.0, 'type': 0.5},
+    # Minimum BM25 score per query term to recommend an article, as a fraction of the best a term
+    # can score in the current corpus (see article_index.py), so it tracks idf as content grows.
+    # Chit-chat words found in a few excerpts ("good", "day") reach about 0.2-0.4; a rare keyword
+    # in a title 0.5+
+    'min_score_ratio': 0.45
+}
+
+# Ordering of content search candidates by keyword selectivity (see keyword_planner.py).
+# Applies to in-memory article index searches only; PostgreSQL batch searches are not planned
+KEYWORD_PLANNER_CONFIG = {
+    'enabled': True,                 # False tries the first keywords in message order
+    'max_keywords': 3,               # Rarest keywords kept per message
+    'max_candidates': 5,             # Searches tried per message at most
+    'max_document_ratio': 0.5        # Keywords in more than this share of articles are dropped while rarer ones remain
+}
+
+# Shared Redis cache of content search results for the PostgreSQL path (see content_search_cache.py)
+CONTENT_SEARCH_CACHE_CONFIG = {
+    'enabled': os.getenv('CONTENT_SEARCH_CACHE_ENABLED', 'true').lower() == 'true',
+    'key_prefix': 'content_search:',
+    'ttl': 1800,                     # Seconds a search with results is cached
+    'negative_ttl': 300,             # Seconds a "no content found" result is cached
+    'poll_interval': 30              # Seconds between content table change checks
+}
+
+# Bloom filter of published content words; topics it rules out are never searched (see vocabulary_filter.py).
+# Only active with ARTICLE_INDEX_CONFIG disabled and the full-text search backend
+VOCABULARY_FILTER_CONFIG = {
+    'enabled': os.getenv('VOCABULARY_FILTER_ENABLED', 'true').lower() == 'true',
+    'key_prefix': 'vocabulary_filter:',
+    'false_positive_rate': float(os.getenv('VOCABULARY_FILTER_FP_RATE', 0.01)),
+    'max_bytes': int(os.getenv('VOCABULARY_FILTER_MAX_BYTES', 4 * 1024 * 1024)),  # Caps the filter (raises the FP rate)
+    'refresh_interval': 300,         # Seconds between content change checks / filter reloads
+    'build_timeout': 600             # Seconds the build lock is held at most
+}
+
+# In-process cache of the MongoDB packages collection
+PACKAGE_CATALOG_CONFIG = {
+    'ttl': 900,                      # Seconds before the cached catalog is reloaded regardless
+    'poll_interval': 60,             # Seconds between change checks when change streams are unavailable
+    'use_change_stream': True,       # Invalidate on MongoDB change stream events (replica sets only)
+    # Package fields used to fingerprint the collection when polling (the admin writes updated_at,
+    # benchmarks/seed.py updatedAt)
+    'updated_fields': ['updated_at', 'updatedAt'],
+    'max_packages': 5000,            # Upper bound on packages loaded into memory
+    'min_prefix_length': 4,          # Shortest query word allowed to match as a prefix of a package term
+    # Query words that never match a package, compared after plural folding ('expeditions?' -> 'expedition')
+    'query_stop_words': [
+        'national', 'park', 'expedition', 'safari', 'package', 'tour', 'trip', 'holiday',
+        'tell', 'me', 'about', 'the', 'a', 'an', 'in', 'you', 'have', 'any', 'do', 'what', 'which',
+        'show', 'available', 'offer', 'book', 'please', 'some', 'there', 'are', 'with', 'for'
+    ]
+}
+
+# Persistent AI package description store
+DESCRIPTION_STORE_CONFIG = {
+    'key_prefix': 'package_description:',
+    'redis_ttl': 7 * 24 * 3600,      # Seconds descriptions stay in Redis (PostgreSQL keeps them permanently)
+    'batch_size': 8,                 # Packages described per LLM call by the pre-generation job
+    'generate_on_miss': 'background', # 'background' (serve fallback, fill store), 'inline' (wait for the LLM) or 'never'
+    'description_types': ['short', 'detailed']
+}
+
+# Latency budget for the general-answer pipeline in send_message
+LATENCY_BUDGET_CONFIG = {
+    'response_budget': 6.0,          # Seconds from pipeline start after which optional stages are dropped
+    'min_optional_wait': 0.05        # Grace given to an optional stage that is nearly done when the budget is spent
+}
+
+# Connection pools (each value can be overridden with the environment variable shown)
+CONNECTION_POOL_CONFIG = {
+    'postgres': {
+        'pool_size': int(os.getenv('PG_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('PG_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.getenv('PG_POOL_TIMEOUT', 10)),         # Seconds to wait for a free connection
+        'pool_recycle': int(os.getenv('PG_POOL_RECYCLE', 1800)),         # Seconds before a connection is replaced
+        'pool_pre_ping': os.getenv('PG_POOL_PRE_PING', 'true').lower() == 'true',
+        'statement_cache_size': int(os.getenv('PG_STATEMENT_CACHE_SIZE', 500)),  # Prepared statements per connection (0 behind PgBouncer transaction pooling)
+        'echo': os.getenv('PG_ECHO', 'false').lower() == 'true',        # Writes every statement to stdout; prefer LOG_LEVELS=sqlalchemy.engine=INFO
+        'warmup_connections': int(os.getenv('PG_WARMUP_CONNECTIONS', 4))
+    },
+    'mongo': {
+        'max_pool_size': int(os.getenv('MONGO_MAX_POOL_SIZE', 20)),
+        'min_pool_size': int(os.getenv('MONGO_MIN_POOL_SIZE', 2)),       # Kept open by the driver
+        'max_idle_time_ms': int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 300000)),
+        'wait_queue_timeout_ms': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000)),
+        'server_selection_timeout_ms': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        'warmup_connections': int(os.getenv('MONGO_WARMUP_CONNECTIONS', 2))
+    },
+    'redis': {
+        'max_connections': int(os.getenv('REDIS_MAX_CONNECTIONS', 50)),
+        'pool_timeout': float(os.getenv('REDIS_POOL_TIMEOUT', 5)),       # Seconds to wait for a free connection
+        'socket_timeout': float(os.getenv('REDIS_SOCKET_TIMEOUT', 5)),
+        'socket_keepalive': True,
+        'health_check_interval': int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', 30)),
+        'warmup_connections': int(os.getenv('REDIS_WARMUP_CONNECTIONS', 4))
+    },
+    'openai': {
+        'max_connections': int(os.getenv('OPENAI_MAX_CONNECTIONS', 50)),
+        'max_keepalive_connections': int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 20)),
+        'keepalive_expiry': float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 60)),
+        'http2': os.getenv('OPENAI_HTTP2', 'true').lower() == 'true',    # Needs the h2 package; falls back to HTTP/1.1
+        'connect_timeout': float(os.getenv('OPENAI_CONNECT_TIMEOUT', 5)),
+        'timeout': float(os.getenv('OPENAI_TIMEOUT', 60)),
+        'warmup_connections': int(os.getenv('OPENAI_WARMUP_CONNECTIONS', 2))
+    },
+    'warmup_timeout': float(os.getenv('POOL_WARMUP_TIMEOUT', 10))       # Seconds allowed per pool at startup
+}
+
+# Prometheus metrics served at /metrics (needs prometheus_client; see metrics.py for multi-worker setup)
+METRICS_CONFIG = {
+    'enabled': os.getenv('METRICS_ENABLED', 'true').lower() == 'true',
+    'branch_buckets': (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30),          # Seconds, whole reply
+    'backend_buckets': (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # Seconds, one call
+}
+
+# In-process request tracing (span trees + Server-Timing headers, see tracing.py)
+TRACING_CONFIG = {
+    'enabled': os.getenv('TRACING_ENABLED', 'true').lower() == 'true',
+    'sample_rate': float(os.getenv('TRACING_SAMPLE_RATE', 1.0)),   # Fraction of requests traced
+    'exporter': os.getenv('TRACING_EXPORTER', 'none'),             # 'none' (Server-Timing headers only), 'jsonl' or 'otlp'
+    'jsonl_path': os.getenv('TRACING_JSONL_PATH', 'traces.jsonl'),
+    'otlp_endpoint': os.getenv('TRACING_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces'),  # OTLP/HTTP JSON
+    'service_name': 'junglore-bot',
+    'exclude_paths': ['/health', '/metrics'],
+    'max_spans_per_trace': 500,
+    'max_queued_traces': 1000,       # Traces waiting for export; newer ones are dropped when full
+    'export_batch_size': 100,
+    'export_interval': 2.0,          # Seconds between exports
+    'export_timeout': 5.0,
+    'server_timing_max_entries': 15
+}
+
+
+# OpenAI API backend (see llm_backend.py): 'live', 'record', 'replay' or 'synthetic'
+LLM_BACKEND_CONFIG = {
+    'mode': os.getenv('LLM_BACKEND', 'live'),
+    'cassette_dir': os.getenv('LLM_CASSETTE_DIR', 'cassettes'),
+    'replay_miss': os.getenv('LLM_REPLAY_MISS', 'error'),          # 'error' or 'synthetic' for requests with no cassette
+    'replay_speed': float(os.getenv('LLM_REPLAY_SPEED', 0)),       # 1 = recorded chunk timing, 0 = instant
+    'synthetic': {
+        'ttft': float(os.getenv('LLM_SYNTHETIC_TTFT', 0.3)),        # Seconds to the first token
+        'tokens_per_second': float(os.getenv('LLM_SYNTHETIC_TOKENS_PER_SECOND', 60)),
+        'reply_tokens': int(os.getenv('LLM_SYNTHETIC_REPLY_TOKENS', 80)),
+        'jitter': float(os.getenv('LLM_SYNTHETIC_JITTER', 0.2)),    # Random +/- fraction applied to every delay
+        'seed': int(os.getenv('LLM_SYNTHETIC_SEED', 0))
+    }
+}
+
+# Structured logging (see app_logging.py)
+LOGGING_CONFIG = {
+    'level': os.getenv('LOG_LEVEL', 'INFO'),
+    'format': os.getenv('LOG_FORMAT', 'json'),     # 'json' (one object per line) or 'text'
+    # Per-subsystem levels; LOG_LEVELS="junglore.content=DEBUG,sqlalchemy.engine=INFO" overrides them
+    'levels': {
+        'junglore': 'INFO',
+        'sqlalchemy.engine': 'WARNING',
+        'httpx': 'WARNING',
+        'openai': 'WARNING'
+    },
+    'level_overrides': os.getenv('LOG_LEVELS', ''),
+    # Fraction of DEBUG records kept per logger (when DEBUG is enabled); others use the default
+    'debug_sample_rate': float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 0.1)),
+    'debug_sample_rates': {
+        'junglore.packages': 0.05,
+        'junglore.content': 0.1
+    },
+    'queue_size': 10000,                # Records waiting for the writer thread; newer ones are dropped when full
+    'request_id_header': 'x-request-id'
+}
@@ -0,0 +1,341 @@
+"""
+Connection pools for PostgreSQL, MongoDB, Redis and the OpenAI API.
+
+ConnectionManager builds every client from CONNECTION_POOL_CONFIG, opens a
+few connections per pool at startup so the first requests after a deploy
+don't pay for connection setup, closes everything on shutdown, and reports
+in-use/idle connections and pool wait times for each pool.
+"""
+
+import asyncio
+import time
+
+import httpx
+import redis.asyncio as redis
+from openai import AsyncOpenAI
+from sqlalchemy import make_url, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app_logging import get_logger
+from config import CONNECTION_POOL_CONFIG, LLM_BACKEND_CONFIG
+from llm_backend import LLMTransport
+
+log = get_logger('connections')
+
+
+class WaitTimer:
+    """Running count, mean and max of pool wait times"""
+
+    def __init__(self):
+        self.waits = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.waits += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def report(self) -> dict:
+        return {
+            'waits': self.waits,
+            'avg_wait_ms': round(self.total / self.waits * 1000, 2) if self.waits else 0.0,
+            'max_wait_ms': round(self.max * 1000, 2)
+        }
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """SQLAlchemy async queue pool that times connection checkouts"""
+
+    wait_timer = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.wait_timer is not None:
+                self.wait_timer.record(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_timer = self.wait_timer
+        return pool
+
+
+class TimedBlockingConnectionPool(redis.BlockingConnectionPool):
+    """Redis pool that waits (up to `timeout`) for a free connection and times the wait"""
+
+    wait_timer = None
+
+    async def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().get_connection(*args, **kwargs)
+        finally:
+            if self.wait_timer is not None:
+                self.wait_timer.record(time.perf_counter() - started)
+
+
+class CountingTransport(httpx.AsyncHTTPTransport):
+    """httpx transport that counts requests waiting on a connection or response headers"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.requests = 0
+
+    async def handle_async_request(self, request):
+        self.in_flight += 1
+        self.requests += 1
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self.in_flight -= 1
+
+    def pool_report(self) -> dict:
+        connections = list(self._pool.connections)
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            'connections': len(connections),
+            'in_use': len(connections) - idle,
+            'idle': idle,
+            'in_flight_requests': self.in_flight,
+            'requests': self.requests
+        }
+
+
+def mongo_pool_listener():
+    """pymongo connection pool listener tracking open/checked-out connections and wait times"""
+    from pymongo import monitoring
+
+    class PoolListener(monitoring.ConnectionPoolListener):
+        def __init__(self):
+            self.open = 0
+            self.checked_out = 0
+            self.wait_timer = WaitTimer()
+
+        def connection_created(self, event):
+            self.open += 1
+
+        def connection_closed(self, event):
+            self.open -= 1
+
+        def connection_checked_out(self, event):
+            self.checked_out += 1
+            # Check-out duration is reported by pymongo 4.7+
+            duration = getattr(event, 'duration', None)
+            if duration is not None:
+                self.wait_timer.record(duration)
+
+        def connection_checked_in(self, event):
+            self.checked_out -= 1
+
+        def pool_created(self, event):
+            pass
+
+        def pool_ready(self, event):
+            pass
+
+        def pool_cleared(self, event):
+            pass
+
+        def pool_closed(self, event):
+            pass
+
+        def connection_ready(self, event):
+            pass
+
+        def connection_check_out_started(self, event):
+            pass
+
+        def connection_check_out_failed(self, event):
+            pass
+
+        def report(self) -> dict:
+            return {
+                'open': self.open,
+                'in_use': self.checked_out,
+                'idle': self.open - self.checked_out,
+                **self.wait_timer.report()
+            }
+
+    return PoolListener()
+
+
+class ConnectionManager:
+    """Creates, warms up, reports on and closes the app's connection pools"""
+
+    def __init__(self, config: dict = CONNECTION_POOL_CONFIG):
+        self.config = config
+        self.engine = None
+        self.mongo_client = None
+        self.redis_client = None
+        self.http_transport = None
+        self.llm_transport = None
+        self.http_client = None
+        self.openai_client = None
+        self._mongo_listener = None
+        self._postgres_waits = WaitTimer()
+        self._redis_waits = WaitTimer()
+
+    def create_postgres_engine(self, database_url: str):
+        """Async engine with a sized, timed pool and asyncpg statement caching"""
+        settings = self.config['postgres']
+        url = make_url(database_url).update_query_dict({
+            # SQLAlchemy's per-connection cache of asyncpg prepared statements
+            'prepared_statement_cache_size': str(settings['statement_cache_size'])
+        })
+        self.engine = create_async_engine(
+            url,
+            echo=settings['echo'],
+            poolclass=TimedQueuePool,
+            pool_size=settings['pool_size'],
+            max_overflow=settings['max_overflow'],
+            pool_timeout=settings['pool_timeout'],
+            pool_recycle=settings['pool_recycle'],
+            pool_pre_ping=settings['pool_pre_ping'],
+            connect_args={'statement_cache_size': settings['statement_cache_size']}
+        )
+        self.engine.pool.wait_timer = self._postgres_waits
+        return self.engine
+
+    def create_mongo_client(self, mongodb_uri: str):
+        import motor.motor_asyncio
+        settings = self.config['mongo']
+        self._mongo_listener = mongo_pool_listener()
+        self.mongo_client = motor.motor_asyncio.AsyncIOMotorClient(
+            mongodb_uri,
+            maxPoolSize=settings['max_pool_size'],
+            minPoolSize=settings['min_pool_size'],
+            maxIdleTimeMS=settings['max_idle_time_ms'],
+            waitQueueTimeoutMS=settings['wait_queue_timeout_ms'],
+            serverSelectionTimeoutMS=settings['server_selection_timeout_ms'],
+            event_listeners=[self._mongo_listener]
+        )
+        return self.mongo_client
+
+    def create_redis_client(self, redis_url: str):
+        settings = self.config['redis']
+        pool = TimedBlockingConnectionPool.from_url(
+            redis_url,
+            decode_responses=True,
+            max_connections=settings['max_connections'],
+            timeout=settings['pool_timeout'],
+            socket_timeout=settings['socket_timeout'],
+            socket_keepalive=settings['socket_keepalive'],
+            health_check_interval=settings['health_check_interval']
+        )
+        pool.wait_timer = self._redis_waits
+        # from_pool hands the pool's lifetime to the client (closed by aclose)
+        self.redis_client = redis.Redis.from_pool(pool)
+        return self.redis_client
+
+    def create_openai_client(self, api_key: str, backend: dict = LLM_BACKEND_CONFIG):
+        """OpenAI client on a keepalive (and, when h2 is installed, HTTP/2) connection pool.
+
+        Outside 'live' mode requests pass through the record/replay/synthetic
+        transport from llm_backend.py (replay and synthetic need no API key).
+        """
+        settings = self.config['openai']
+        http2 = settings['http2']
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                log.warning("⚠️  h2 not installed - OpenAI client using HTTP/1.1")
+                http2 = False
+        limits = httpx.Limits(
+            max_connections=settings['max_connections'],
+            max_keepalive_connections=settings['max_keepalive_connections'],
+            keepalive_expiry=settings['keepalive_expiry']
+        )
+        self.http_transport = CountingTransport(limits=limits, http2=http2)
+        transport = self.http_transport
+        if backend['mode'] != 'live':
+            transport = self.llm_transport = LLMTransport(self.http_transport, backend)
+            log.info("🎞️  OpenAI backend mode", extra={'mode': backend['mode']})
+            if backend['mode'] in ('replay', 'synthetic'):
+                api_key = api_key or 'offline'
+        self.http_client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(settings['timeout'], connect=settings['connect_timeout'])
+        )
+        self.openai_client = AsyncOpenAI(api_key=api_key, http_client=self.http_client)
+        return self.openai_client
+
+    async def _warm(self, name: str, warmups: list):
+        """Run one pool's warm-up coroutines concurrently, within the warm-up timeout"""
+        if not warmups:
+            return
+        started = time.perf_counter()
+        results = await asyncio.wait_for(
+            asyncio.gather(*warmups, return_exceptions=True),
+            timeout=self.config['warmup_timeout']
+        )
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            log.warning("⚠️  Pool warm-up: some connections failed", extra={'pool': name, 'failed': len(failures), 'attempted': len(results), 'error': str(failures[0])})
+        else:
+            log.info("🔥 Pool warmed", extra={'pool': name, 'connections': len(results), 'ms': round((time.perf_counter() - started) * 1000)})
+
+    async def _postgres_ping(self):
+        async with self.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    async def warm_up(self):
+        """Open `warmup_connections` connections per pool so they are ready for the first requests"""
+        pools = []
+        if self.engine is not None:
+            pools.append(('PostgreSQL', [self._postgres_ping() for _ in range(self.config['postgres']['warmup_connections'])]))
+        if self.redis_client is not None:
+            pools.append(('Redis', [self.redis_client.ping() for _ in range(self.config['redis']['warmup_connections'])]))
+        if self.mongo_client is not None:
+            pools.append(('MongoDB', [self.mongo_client.admin.command('ping') for _ in range(self.config['mongo']['warmup_connections'])]))
+        if self.openai_client is not None:
+            pools.append(('OpenAI', [self.openai_client.models.list() for _ in range(self.config['openai']['warmup_connections'])]))
+        for name, warmups in pools:
+            try:
+                await self._warm(name, warmups)
+            except asyncio.TimeoutError:
+                log.warning("⚠️  Pool warm-up timed out", extra={'pool': name})
+
+    async def close(self):
+        """Close every pool (on shutdown)"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+        if self.redis_client is not None:
+            await self.redis_client.aclose()
+        if self.mongo_client is not None:
+            self.mongo_client.close()
+        if self.engine is not None:
+            await self.engine.dispose()
+
+    def report(self) -> dict:
+        """In-use/idle connections and wait times for each pool"""
+        report = {}
+        if self.engine is not None:
+            pool = self.engine.pool
+            report['postgres'] = {
+                'size': pool.size(),
+                'in_use': pool.checkedout(),
+                'idle': pool.checkedin(),
+                'overflow': pool.overflow(),
+                **self._postgres_waits.report()
+            }
+        if self.redis_client is not None:
+            pool = self.redis_client.connection_pool
+            report['redis'] = {
+                'max_connections': pool.max_connections,
+                'in_use': len(pool._in_use_connections),
+                'idle': len(pool._available_connections),
+                **self._redis_waits.report()
+            }
+        if self._mongo_listener is not None:
+            report['mongo'] = self._mongo_listener.report()
+        if self.http_transport is not None:
+            report['openai'] = self.http_transport.pool_report()
+        if self.llm_transport is not None:
+            report['openai']['backend'] = {'mode': self.llm_transport.mode, **self.llm_transport.stats}
+        return report
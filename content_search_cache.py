@@ -0,0 +1,136 @@
+"""
+Shared Redis cache of content search results, including misses.
+
+Messages with no matching article ("hello there", "thanks") are the most
+expensive content-branch outcome and the most repetitive, so "nothing found"
+is cached too, under a shorter TTL. Entries are keyed by the normalized
+search keywords and candidate topics.
+
+Every key carries the current content version. A watcher polls a cheap
+fingerprint of the `content` table (row count and latest change) and bumps
+the version when it differs, which retires every entry at once; the old
+keys simply expire.
+"""
+
+import asyncio
+import hashlib
+import json
+
+from sqlalchemy import text
+
+import metrics
+from app_logging import get_logger
+from config import CONTENT_SEARCH_CACHE_CONFIG
+
+log = get_logger('content')
+
+# KEYS[1] = version counter; ARGV[1] = entry key prefix, ARGV[2] = search key
+# Returns {version, entry or false} in one round trip
+LOOKUP_SCRIPT = """
+local version = redis.call('GET', KEYS[1]) or '0'
+return {version, redis.call('GET', ARGV[1] .. version .. ':' .. ARGV[2])}
+"""
+
+# KEYS[1] = version counter, KEYS[2] = last seen content fingerprint; ARGV[1] = current fingerprint
+# Bumps the version once per change no matter how many workers notice it
+# Returns {version, 1 if this call bumped it else 0}
+BUMP_SCRIPT = """
+if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+    redis.call('SET', KEYS[2], ARGV[1])
+    return {redis.call('INCR', KEYS[1]), 1}
+end
+return {tonumber(redis.call('GET', KEYS[1]) or '0'), 0}
+"""
+
+CONTENT_FINGERPRINT_SQL = """
+    SELECT COUNT(*) AS row_count, MAX(COALESCE(updated_at, published_at, created_at)) AS changed_at
+    FROM content
+"""
+
+
+def search_key(topics: list, keywords: list, max_results: int) -> str:
+    """Hash of the normalized candidate topics (in priority order), re-ranking keywords and result limit"""
+    def normalize(values):
+        return [" ".join(str(value).lower().split()) for value in values or []]
+    payload = json.dumps([normalize(topics), normalize(keywords), max_results])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ContentSearchCache:
+    """Versioned Redis cache of (topic, posts) search results"""
+
+    def __init__(self, redis_client, config: dict = CONTENT_SEARCH_CACHE_CONFIG):
+        self.redis = redis_client
+        self.config = config
+        self.version_key = config['key_prefix'] + 'version'
+        self.fingerprint_key = config['key_prefix'] + 'fingerprint'
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'stores': 0, 'negative_stores': 0, 'invalidations': 0}
+        self._lookup = redis_client.register_script(LOOKUP_SCRIPT)
+        self._bump = redis_client.register_script(BUMP_SCRIPT)
+
+    @property
+    def enabled(self) -> bool:
+        return self.config['enabled']
+
+    def _entry_key(self, version, key: str) -> str:
+        return f"{self.config['key_prefix']}{version}:{key}"
+
+    async def get(self, key: str):
+        """(version, cached (topic, posts) or None); version is None if Redis is unavailable"""
+        try:
+            with metrics.track('redis', 'content_search_cache_get'):
+                version, cached = await self._lookup(keys=[self.version_key], args=[self.config['key_prefix'], key])
+        except Exception as e:
+            log.warning("Error reading content search cache", extra={'error': str(e)})
+            return None, None
+        if not cached:
+            self.stats['misses'] += 1
+            metrics.count_cache('content_search', 'miss')
+            return version, None
+        entry = json.loads(cached)
+        result = 'hit' if entry['posts'] else 'negative_hit'
+        self.stats[result + 's'] += 1
+        metrics.count_cache('content_search', result)
+        return version, (entry['topic'], entry['posts'])
+
+    async def put(self, version, key: str, topic, posts: list):
+        """Store a result under the version it was looked up with (a concurrent bump retires it)"""
+        if version is None:
+            return
+        ttl = self.config['ttl'] if posts else self.config['negative_ttl']
+        try:
+            with metrics.track('redis', 'content_search_cache_put'):
+                await self.redis.set(self._entry_key(version, key), json.dumps({'topic': topic, 'posts': posts}), ex=ttl)
+        except Exception as e:
+            log.warning("Error writing content search cache", extra={'error': str(e)})
+            return
+        self.stats['stores' if posts else 'negative_stores'] += 1
+
+    async def invalidate_if_changed(self, fingerprint: str) -> int:
+        """Bump the shared version if the content fingerprint changed; returns the current version"""
+        version, bumped = await self._bump(keys=[self.version_key, self.fingerprint_key], args=[fingerprint])
+        if bumped:
+            self.stats['invalidations'] += 1
+            log.info("🧹 Content search cache invalidated", extra={'version': version})
+        return version
+
+    async def watch(self, session_factory):
+        """Background loop: poll the content table and invalidate the cache when it changes"""
+        while True:
+            try:
+                async with session_factory() as session:
+                    row = (await session.execute(text(CONTENT_FINGERPRINT_SQL))).one()
+                await self.invalidate_if_changed(f"{row.row_count}:{row.changed_at}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Error checking content table for changes", extra={'error': str(e)})
+            await asyncio.sleep(self.config['poll_interval'])
+
+    def stats_report(self) -> dict:
+        lookups = self.stats['hits'] + self.stats['negative_hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_ratio': round((self.stats['hits'] + self.stats['negative_hits']) / lookups, 3) if lookups else 0.0,
+            'negative_hit_ratio': round(self.stats['negative_hits'] / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,248 @@
+"""
+Redis-backed session history window.
+
+Each session's recent messages are stored as a Redis list of JSON entries.
+Appends run as one server-side Lua script (push, trim to the window, refresh
+the TTL), so concurrent requests on the same session can't overwrite each
+other's messages and the full history is never re-serialized.
+
+Each worker also keeps a small LRU of recent windows so an active
+conversation's reads don't leave the process. The append script publishes
+the session id on a pub/sub channel and every other worker drops its local
+copy; while that subscription is down the local cache is bypassed.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+
+import metrics
+from app_logging import get_logger
+from config import REDIS_CONFIG, LOCAL_HISTORY_CACHE_CONFIG
+
+log = get_logger('history')
+
+# KEYS[1] = history list, KEYS[2] = write-behind journal
+# ARGV[1] = window size, ARGV[2] = TTL seconds, ARGV[3] = number of new messages,
+# ARGV[4] = invalidation channel, ARGV[5] = invalidation message,
+# ARGV[6] = journal entry for the turn ('' to skip journaling),
+# ARGV[7..] = the caller's full new window (older context followed by the new messages)
+# If the list expired, the whole window is pushed so context isn't lost;
+# otherwise only the new messages are appended.
+# Returns {journal length (0 if not journaled), stored window...}
+APPEND_SCRIPT = """
+local first = 7
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    first = #ARGV - tonumber(ARGV[3]) + 1
+end
+if first <= #ARGV then
+    redis.call('RPUSH', KEYS[1], unpack(ARGV, first, #ARGV))
+end
+redis.call('LTRIM', KEYS[1], -tonumber(ARGV[1]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+local journal_length = 0
+if ARGV[6] ~= '' then
+    journal_length = redis.call('RPUSH', KEYS[2], ARGV[6])
+end
+redis.call('PUBLISH', ARGV[4], ARGV[5])
+local result = redis.call('LRANGE', KEYS[1], 0, -1)
+table.insert(result, 1, journal_length)
+return result
+"""
+
+# Cache a window loaded from PostgreSQL unless another request already started the list
+# KEYS[1] = history list, ARGV[1] = TTL seconds, ARGV[2..] = messages
+SEED_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 and #ARGV > 1 then
+    redis.call('RPUSH', KEYS[1], unpack(ARGV, 2, #ARGV))
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+class LocalHistoryCache:
+    """Size-, byte- and TTL-bounded LRU of session history windows"""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # session_id -> (expires_at, size, history)
+        self.bytes = 0
+        self.evictions = 0
+
+    def get(self, session_id: str):
+        entry = self.entries.get(session_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self.discard(session_id)
+            return None
+        self.entries.move_to_end(session_id)
+        return list(entry[2])
+
+    def put(self, session_id: str, history: list, size: int):
+        """Cache a window; `size` is its encoded size in bytes"""
+        self.discard(session_id)
+        if size > self.max_bytes:
+            return
+        self.entries[session_id] = (time.monotonic() + self.ttl, size, list(history))
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def discard(self, session_id: str):
+        entry = self.entries.pop(session_id, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+
+class RedisHistoryStore:
+    """Session history windows stored as Redis lists, with a per-worker LRU in front"""
+
+    def __init__(self, redis_client, config: dict = REDIS_CONFIG, local_config: dict = LOCAL_HISTORY_CACHE_CONFIG):
+        self.redis = redis_client
+        self.config = config
+        self.local_config = local_config
+        self.local = LocalHistoryCache(local_config['max_entries'], local_config['max_bytes'], local_config['ttl'])
+        self.worker_id = uuid.uuid4().hex
+        # Only serve local reads while we are subscribed to invalidations
+        self.invalidation_live = False
+        self.stats = {'local_hits': 0, 'redis_hits': 0, 'misses': 0, 'invalidations': 0}
+        self._append = redis_client.register_script(APPEND_SCRIPT)
+        self._seed = redis_client.register_script(SEED_SCRIPT)
+
+    def key(self, session_id: str) -> str:
+        return f"{self.config['key_prefix']}{session_id}"
+
+    @property
+    def local_enabled(self) -> bool:
+        return self.local_config['enabled'] and self.invalidation_live
+
+    def _cache_locally(self, session_id: str, history: list, encoded: list):
+        if self.local_enabled:
+            self.local.put(session_id, history, sum(len(entry) for entry in encoded))
+
+    async def read(self, session_id: str):
+        """Cached window (oldest first), or None if the session isn't cached.
+
+        Local hits need no network hop. Otherwise the Redis read and a sliding
+        TTL refresh go out in one pipelined round trip.
+        """
+        if self.local_enabled:
+            history = self.local.get(session_id)
+            if history is not None:
+                self.stats['local_hits'] += 1
+                metrics.count_cache('session_history', 'local')
+                return history
+        key = self.key(session_id)
+        with metrics.track('redis', 'history_read'):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.lrange(key, 0, -1)
+                pipe.expire(key, self.config['session_history_expiry'])
+                entries, _ = await pipe.execute()
+        if not entries:
+            self.stats['misses'] += 1
+            metrics.count_cache('session_history', 'miss')
+            return None
+        self.stats['redis_hits'] += 1
+        metrics.count_cache('session_history', 'redis')
+        history = [json.loads(entry) for entry in entries]
+        self._cache_locally(session_id, history, entries)
+        return history
+
+    async def seed(self, session_id: str, history: list):
+        """Cache a window loaded from PostgreSQL"""
+        encoded = [json.dumps(m) for m in history]
+        with metrics.track('redis', 'history_seed'):
+            seeded = await self._seed(
+                keys=[self.key(session_id)],
+                args=[self.config['session_history_expiry']] + encoded
+            )
+        # If another request started the list first, ours may be older than Redis; leave it uncached
+        if seeded:
+            self._cache_locally(session_id, history, encoded)
+
+    async def append(self, session_id: str, new_messages: list, new_history: list,
+                     journal_key: str = '', journal_entry: str = ''):
+        """Atomically append new messages, trim to the window, refresh the TTL and
+        notify other workers. A journal entry, if given, is pushed onto the
+        write-behind journal in the same step.
+
+        Returns (stored window, journal length).
+        """
+        window = new_history[-self.config['history_window']:]
+        # Drop our copy first so a failed append can't leave it ahead of Redis
+        self.local.discard(session_id)
+        with metrics.track('redis', 'history_append'):
+            result = await self._append(
+                keys=[self.key(session_id), journal_key or self.key(session_id)],
+                args=[
+                    self.config['history_window'],
+                    self.config['session_history_expiry'],
+                    len(new_messages),
+                    self.local_config['invalidation_channel'],
+                    f"{self.worker_id}:{session_id}",
+                    journal_entry
+                ] + [json.dumps(m) for m in window]
+            )
+        journal_length, entries = result[0], result[1:]
+        # Cache what Redis actually holds, which includes appends racing with ours
+        stored = [json.loads(entry) for entry in entries]
+        self._cache_locally(session_id, stored, entries)
+        return stored, journal_length
+
+    def stats_report(self) -> dict:
+        lookups = self.stats['local_hits'] + self.stats['redis_hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'local_hit_ratio': round(self.stats['local_hits'] / lookups, 3) if lookups else 0.0,
+            'local_entries': len(self.local.entries),
+            'local_bytes': self.local.bytes,
+            'local_evictions': self.local.evictions,
+            'invalidation_live': self.invalidation_live
+        }
+
+    def _handle_invalidation(self, data: str):
+        worker_id, _, session_id = data.partition(':')
+        if worker_id != self.worker_id:
+            self.local.discard(session_id)
+            self.stats['invalidations'] += 1
+
+    async def listen_for_invalidations(self):
+        """Background task: drop local windows that other workers have appended to"""
+        if not self.local_config['enabled']:
+            return
+        channel = self.local_config['invalidation_channel']
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(channel)
+                self.invalidation_live = True
+                log.info("🧠 Session history cache listening for invalidations")
+                async for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self._handle_invalidation(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Session history invalidation channel lost - bypassing local cache", extra={'error': str(e)})
+            finally:
+                # Anything cached may have missed invalidations while disconnected
+                self.invalidation_live = False
+                self.local.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(self.local_config['resubscribe_delay'])
@@ -0,0 +1,201 @@
+"""
+Write-behind persistence of chat turns to PostgreSQL.
+
+A turn is acknowledged once it is in Redis: the history append script also
+pushes it onto a journal list, and the request returns without waiting for
+PostgreSQL. A background flusher drains the journal in batches, writing
+many sessions' messages with one multi-row INSERT, and only then trims the
+flushed entries off the journal. If a worker dies mid-flush the entries are
+still in the journal and the next flush (on any worker, or at startup)
+writes them again; message uids make that replay idempotent.
+
+Turns PostgreSQL rejects as invalid (integrity or data errors) move to a
+dead-letter list so they can't block the journal; scripts/replay_dead_letters.py
+puts them back once fixed. Any other error (PostgreSQL down, a dropped
+connection) leaves the journal untouched and the flusher backs off.
+
+Backpressure: when the journal grows past `max_pending` entries, the
+request that pushed it there flushes inline until it is back under the
+limit, waiting at most `inline_flush_timeout` seconds.
+"""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+import metrics
+from app_logging import get_logger
+from config import WRITE_BEHIND_CONFIG
+from models import ChatbotMessage
+
+log = get_logger('history')
+
+# Errors caused by the turn itself; retrying can't help, so such turns are dead-lettered
+DATA_ERRORS = (IntegrityError, DataError)
+
+# Trim a flushed batch off the head of the journal, unless another flusher already did.
+# Journal entries are unique (they carry message uids), so an unchanged head means
+# nobody has trimmed since we read the batch.
+# KEYS[1] = journal, ARGV[1] = first entry of the batch, ARGV[2] = batch size
+TRIM_SCRIPT = """
+if redis.call('LINDEX', KEYS[1], 0) == ARGV[1] then
+    redis.call('LTRIM', KEYS[1], tonumber(ARGV[2]), -1)
+    return 1
+end
+return 0
+"""
+
+
+def journal_entry(session_id: str, new_messages: list) -> str:
+    """Serialized journal record for one turn"""
+    created_at = datetime.utcnow().isoformat()
+    return json.dumps({
+        'session_id': session_id,
+        'messages': [
+            {'uid': uuid.uuid4().hex, 'sender': m['sender'], 'text': m['text'], 'created_at': created_at}
+            for m in new_messages
+        ]
+    })
+
+
+def message_rows(entries: list) -> list:
+    """chatbot_messages rows for a batch of journal entries, in journal order"""
+    rows = []
+    for entry in entries:
+        turn = json.loads(entry)
+        for message in turn['messages']:
+            rows.append({
+                'uid': message['uid'],
+                'session_id': turn['session_id'],
+                'sender': message['sender'],
+                'text': message['text'],
+                'created_at': datetime.fromisoformat(message['created_at'])
+            })
+    return rows
+
+
+class HistoryWriteBehind:
+    """Redis-journaled, batched writer for chatbot_messages"""
+
+    def __init__(self, redis_client, session_factory, config: dict = WRITE_BEHIND_CONFIG):
+        self.redis = redis_client
+        self.session_factory = session_factory
+        self.config = config
+        self.stats = {'flushes': 0, 'messages_written': 0, 'inline_flushes': 0, 'dead_lettered': 0}
+        self._trim = redis_client.register_script(TRIM_SCRIPT)
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.config['enabled']
+
+    async def accepted(self, journal_length: int):
+        """Called after a turn is journaled; applies backpressure when the journal is full"""
+        if journal_length >= self.config['max_pending']:
+            log.warning("⚠️  Write-behind journal full - flushing inline", extra={'journal_length': journal_length})
+            self.stats['inline_flushes'] += 1
+            try:
+                # The turn is already journaled, so a slow or failed flush only delays persistence
+                await asyncio.wait_for(self.flush_below(self.config['max_pending']), timeout=self.config['inline_flush_timeout'])
+            except asyncio.TimeoutError:
+                log.warning("Inline history flush timed out", extra={'timeout': self.config['inline_flush_timeout']})
+            except Exception as e:
+                log.warning("Inline history flush failed", extra={'error': str(e)})
+        elif journal_length >= self.config['batch_size']:
+            self._wake.set()
+
+    async def write_rows(self, rows: list):
+        """Insert message rows, skipping any already written by an earlier flush"""
+        with metrics.track('postgres', 'history_write'):
+            async with self.session_factory() as session:
+                statement = insert(ChatbotMessage).values(rows).on_conflict_do_nothing(index_elements=['uid'])
+                await session.execute(statement)
+                await session.commit()
+
+    async def _write_batch(self, entries: list):
+        """Write a batch, dead-lettering turns PostgreSQL rejects; other errors propagate"""
+        try:
+            await self.write_rows(message_rows(entries))
+            return
+        except DATA_ERRORS as e:
+            log.warning("Error writing history batch - retrying turn by turn", extra={'error': str(e)})
+        # One bad turn (e.g. a deleted session) must not block the rest of the journal
+        for entry in entries:
+            try:
+                await self.write_rows(message_rows([entry]))
+            except DATA_ERRORS as e:
+                log.error("Error writing history turn - moving it to the dead-letter list", extra={'error': str(e)})
+                await self.redis.rpush(self.config['dead_letter_key'], entry)
+                self.stats['dead_lettered'] += 1
+
+    async def flush(self) -> int:
+        """Write one batch from the head of the journal; returns the number of turns flushed"""
+        async with self._flush_lock:
+            journal_key = self.config['journal_key']
+            entries = await self.redis.lrange(journal_key, 0, self.config['batch_size'] - 1)
+            if not entries:
+                return 0
+            await self._write_batch(entries)
+            await self._trim(keys=[journal_key], args=[entries[0], len(entries)])
+            self.stats['flushes'] += 1
+            self.stats['messages_written'] += sum(len(json.loads(e)['messages']) for e in entries)
+            return len(entries)
+
+    async def flush_all(self):
+        """Drain the journal"""
+        while await self.flush():
+            pass
+
+    async def flush_below(self, limit: int):
+        """Flush batches until the journal is shorter than `limit`"""
+        while await self.redis.llen(self.config['journal_key']) >= limit:
+            if not await self.flush():
+                break
+
+    async def replay_dead_letters(self) -> int:
+        """Move every dead-lettered turn back onto the journal; returns the number moved"""
+        moved = 0
+        while await self.redis.lmove(self.config['dead_letter_key'], self.config['journal_key'], 'LEFT', 'RIGHT') is not None:
+            moved += 1
+        if moved:
+            log.info("Dead-lettered chat turns requeued", extra={'turns': moved})
+            self._wake.set()
+        return moved
+
+    async def run(self):
+        """Background task: replay anything left by a previous process, then flush periodically"""
+        if not self.enabled:
+            return
+        failures = 0
+        while True:
+            delay = self.config['flush_interval']
+            try:
+                await self.flush_all()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # PostgreSQL unavailable: entries stay journaled, retry with exponential backoff
+                failures += 1
+                delay = min(self.config['flush_interval'] * 2 ** failures, self.config['max_retry_delay'])
+                log.exception("Error flushing chat history", extra={'retry_in': delay})
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def shutdown(self):
+        """Flush what's left before the process exits (anything not flushed stays journaled)"""
+        if not self.enabled:
+            return
+        try:
+            await asyncio.wait_for(self.flush_all(), timeout=self.config['shutdown_flush_timeout'])
+            log.info("💾 Chat history journal flushed")
+        except Exception as e:
+            log.warning("Chat history journal not fully flushed on shutdown - it will be replayed on next start", extra={'error': str(e)})
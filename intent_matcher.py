@@ -0,0 +1,179 @@
+"""
+Single-pass keyword matcher for intent detection.
+
+All intent keyword lists from config.py are compiled into one Aho-Corasick
+automaton so a user message is scanned once, no matter how many keywords
+the lists grow to. Matches are word-boundary aware ("ai" does not match
+"rain") but tolerate plural endings ("tigers" still matches "tiger").
+The automaton is rebuilt automatically when config.py changes on disk.
+"""
+
+import importlib
+import os
+import threading
+import time
+from collections import deque
+
+import config
+from app_logging import get_logger
+
+log = get_logger('intent')
+
+# Intent name -> config.py attribute holding its keyword list
+INTENT_KEYWORD_LISTS = {
+    'travel': 'TRAVEL_KEYWORDS',
+    'wildlife': 'WILDLIFE_KEYWORDS',
+    'expedition': 'EXPEDITION_KEYWORDS',
+    'blog': 'BLOG_KEYWORDS',
+    'ai_info': 'AI_INFO_KEYWORDS',
+    'gate_prediction': 'GATE_PREDICTION_KEYWORDS',
+    'location': 'LOCATION_KEYWORDS',
+}
+
+# Suffixes allowed after a keyword before the closing word boundary
+PLURAL_SUFFIXES = ('s', 'es')
+
+# Minimum seconds between config.py modification checks
+RELOAD_CHECK_INTERVAL = 5.0
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over a fixed set of lowercase keywords.
+
+    Each keyword carries a list of (category, original_keyword) labels, so a
+    keyword that appears in several lists (e.g. 'safari') is matched once and
+    reported for every list it belongs to.
+    """
+
+    def __init__(self, keyword_labels: dict):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # state -> [(keyword_length, labels)]
+        for keyword, labels in keyword_labels.items():
+            self._add(keyword, labels)
+        self._build_failure_links()
+
+    def _add(self, keyword: str, labels: list):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append((len(keyword), labels))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # Inherit outputs of the failure state (shorter suffix keywords)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    @staticmethod
+    def _closes_word(text: str, end: int) -> bool:
+        """True if a keyword ending just before `end` is followed by a word boundary,
+        optionally after a plural suffix."""
+        if end >= len(text) or not _is_word_char(text[end]):
+            return True
+        for suffix in PLURAL_SUFFIXES:
+            after = end + len(suffix)
+            if text.startswith(suffix, end) and (after >= len(text) or not _is_word_char(text[after])):
+                return True
+        return False
+
+    def find(self, text: str) -> list:
+        """Return the labels of every whole-word keyword found in `text` (already lowercased)."""
+        hits = []
+        state = 0
+        goto = self._goto
+        fail = self._fail
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, labels in self._output[state]:
+                start = i - length + 1
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if not self._closes_word(text, i + 1):
+                    continue
+                hits.extend(labels)
+        return hits
+
+
+def build_automaton(config_module=config) -> KeywordAutomaton:
+    """Compile every intent keyword list in config.py into one automaton."""
+    keyword_labels = {}
+    for category, attr in INTENT_KEYWORD_LISTS.items():
+        for position, keyword in enumerate(getattr(config_module, attr, [])):
+            normalized = ' '.join(keyword.lower().split())
+            if normalized:
+                keyword_labels.setdefault(normalized, []).append((category, keyword, position))
+    return KeywordAutomaton(keyword_labels)
+
+
+class IntentMatcher:
+    """Hot-reloadable wrapper around the compiled keyword automaton."""
+
+    def __init__(self, config_module=config):
+        self._config = config_module
+        self._lock = threading.Lock()
+        self._config_path = getattr(config_module, '__file__', None)
+        self._config_mtime = self._current_mtime()
+        self._last_check = time.monotonic()
+        self.automaton = build_automaton(config_module)
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self._config_path).st_mtime if self._config_path else None
+        except OSError:
+            return None
+
+    def reload(self):
+        """Re-import config.py and rebuild the automaton."""
+        with self._lock:
+            self._config = importlib.reload(self._config)
+            self._config_mtime = self._current_mtime()
+            self.automaton = build_automaton(self._config)
+            log.info("🔄 Intent keyword automaton rebuilt from config.py")
+
+    def reload_if_changed(self):
+        """Rebuild the automaton if config.py changed since the last build (throttled)."""
+        now = time.monotonic()
+        if now - self._last_check < RELOAD_CHECK_INTERVAL:
+            return
+        self._last_check = now
+        mtime = self._current_mtime()
+        if mtime is not None and mtime != self._config_mtime:
+            self.reload()
+
+    def match(self, user_message: str) -> dict:
+        """Scan a message once and return the matched keywords per category.
+
+        Returns a dict mapping each category in INTENT_KEYWORD_LISTS to the list
+        of original config keywords found, in config order.
+        """
+        self.reload_if_changed()
+        found = {category: {} for category in INTENT_KEYWORD_LISTS}
+        text = ' '.join(user_message.lower().split())
+        for category, keyword, position in self.automaton.find(text):
+            found[category][position] = keyword
+        return {category: [hits[p] for p in sorted(hits)] for category, hits in found.items()}
+
+
+intent_matcher = IntentMatcher()
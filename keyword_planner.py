@@ -0,0 +1,80 @@
+"""
+Selectivity-aware planning of content search candidates.
+
+Keywords are ranked by how few articles contain them, using document
+frequencies from the article index's postings (kept current by its
+incremental refreshes), instead of being tried in message order. Keywords
+no article contains are dropped, and so are very common ones ("something",
+"people") while rarer keywords remain.
+
+The most discriminating search goes first: every kept keyword together, then
+the rarest pair, then single keywords from rarest to most common. Searching
+stops at the first candidate with results.
+
+Planning needs the in-memory article index: while it loads, or with
+ARTICLE_INDEX_CONFIG disabled, match_content_in_database sends the
+unplanned candidates to PostgreSQL in one batch query, so the planner
+saves no PostgreSQL queries.
+"""
+
+import math
+
+from config import KEYWORD_PLANNER_CONFIG
+from utils import TOKEN_PATTERN
+
+
+def keyword_document_frequency(keyword: str, document_frequency) -> int:
+    """Articles that can match `keyword`: the document frequency of its rarest word"""
+    words = TOKEN_PATTERN.findall(keyword.lower())
+    return min((document_frequency(word) for word in words), default=0)
+
+
+def plan_search(keywords: list, document_frequency, total_documents: int, config: dict = KEYWORD_PLANNER_CONFIG) -> dict:
+    """Candidate topics for `keywords` ordered by selectivity.
+
+    Returns {'candidates': topics, 'ranked': [(keyword, df)], 'pruned': {keyword: reason}}.
+    Combined topics keep the keywords in message order.
+    """
+    frequencies = {}
+    for keyword in keywords:
+        if keyword not in frequencies:
+            frequencies[keyword] = keyword_document_frequency(keyword, document_frequency)
+
+    pruned = {keyword: 'absent' for keyword, df in frequencies.items() if df == 0}
+    present = [keyword for keyword in frequencies if keyword not in pruned]
+    common_limit = max(1, math.ceil(total_documents * config['max_document_ratio']))
+    informative = [keyword for keyword in present if frequencies[keyword] <= common_limit]
+    if informative:
+        pruned.update({keyword: 'common' for keyword in present if keyword not in informative})
+        present = informative
+
+    # Rarest first; ties keep message order (sorted is stable)
+    ranked = sorted(present, key=lambda keyword: frequencies[keyword])
+    for keyword in ranked[config['max_keywords']:]:
+        pruned[keyword] = 'limit'
+    ranked = ranked[:config['max_keywords']]
+
+    def in_message_order(selected):
+        return ' '.join(keyword for keyword in frequencies if keyword in selected)
+
+    candidates = []
+    if len(ranked) > 1:
+        candidates.append(in_message_order(ranked))
+    if len(ranked) > 2:
+        candidates.append(in_message_order(ranked[:2]))
+    candidates.extend(ranked)
+
+    return {
+        'candidates': candidates[:config['max_candidates']],
+        'ranked': [(keyword, frequencies[keyword]) for keyword in ranked],
+        'pruned': pruned
+    }
+
+
+def span_attributes(plan: dict) -> dict:
+    """The plan as flat tracing span attributes"""
+    return {
+        'plan.ranked': ', '.join(f"{keyword}={df}" for keyword, df in plan['ranked']),
+        'plan.pruned': ', '.join(f"{keyword}:{reason}" for keyword, reason in plan['pruned'].items()),
+        'plan.candidates': ' | '.join(plan['candidates'])
+    }
@@ -0,0 +1,345 @@
+"""
+Pluggable backend for the OpenAI API.
+
+Every OpenAI call goes through the client built by ConnectionManager, whose
+httpx transport depends on LLM_BACKEND_CONFIG['mode']:
+
+- live: requests go to the API
+- record: requests go to the API, and each successful request/response pair
+  (streamed chunks and their timing included) is saved as a cassette file
+- replay: responses are served from cassettes and nothing reaches the network
+- synthetic: completions are generated locally, with configurable latency
+  and token rate, and streamed token by token
+
+A cassette is keyed by a hash of the request's method, path and JSON body,
+so the same request always replays the same response. Synthetic replies are
+seeded from the same key, so they are deterministic too.
+"""
+
+import asyncio
+import codecs
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+from app_logging import get_logger
+from config import LLM_BACKEND_CONFIG
+
+log = get_logger('llm')
+
+MODES = ('live', 'record', 'replay', 'synthetic')
+
+WORDS = (
+    "tigers are most active at dawn and dusk when the forest is cool and the light is soft "
+    "the dry season from march to june brings animals to waterholes making sightings far more likely "
+    "local naturalists track pugmarks alarm calls and fresh kills to find them"
+).split()
+
+PACKAGE_LISTING = re.compile(r"^\s*Package (\d+):", re.MULTILINE)
+
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    """Cassette key for a request: its method, path and (canonicalised) JSON body"""
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True, separators=(',', ':')) if body else ''
+    except ValueError:
+        canonical = body.decode('utf-8', 'replace')
+    return hashlib.sha256(f"{method} {path}\n{canonical}".encode('utf-8')).hexdigest()[:32]
+
+
+def call_kind(body: dict) -> str:
+    """Which of the bot's LLM calls a chat completion request is"""
+    if (body.get('response_format') or {}).get('type') == 'json_object':
+        return 'description_batch'
+    system = next((m.get('content') or '' for m in body.get('messages', []) if m.get('role') == 'system'), '')
+    if 'safari package' in system:
+        return 'package_matching'
+    if 'compelling descriptions' in system:
+        return 'package_description'
+    return 'chat'
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class SyntheticLLM:
+    """Locally generated, latency-shaped chat completions.
+
+    Replies are shaped by the kind of call: package matching gets a package
+    number, description batches a JSON object, everything else prose.
+    Responses are returned as cassette entries so they are served exactly
+    like recorded ones.
+    """
+
+    def __init__(self, ttft: float = 0.3, tokens_per_second: float = 60, reply_tokens: int = 80,
+                 jitter: float = 0.2, seed: int = 0):
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.jitter = jitter
+        self.seed = seed
+        self.calls = Counter()
+        self.tokens = Counter()
+
+    @classmethod
+    def from_config(cls, settings: dict):
+        return cls(settings['ttft'], settings['tokens_per_second'], settings['reply_tokens'],
+                   settings['jitter'], settings['seed'])
+
+    def _pieces(self, kind: str, body: dict) -> list:
+        if kind == 'package_matching':
+            return ["1"]
+        if kind == 'description_batch':
+            prompt = body['messages'][-1].get('content') or ''
+            count = len(PACKAGE_LISTING.findall(prompt)) or 1
+            return [json.dumps({str(i): "A wild week among tigers, sal forests and river meadows." for i in range(1, count + 1)})]
+        limit = min(self.reply_tokens, body.get('max_tokens') or self.reply_tokens)
+        return [WORDS[i % len(WORDS)] + " " for i in range(limit)]
+
+    def _usage(self, body: dict, pieces: list) -> dict:
+        prompt_tokens = sum(estimate_tokens(m.get('content') or '') for m in body.get('messages', []))
+        completion_tokens = len(pieces)
+        self.tokens['prompt'] += prompt_tokens
+        self.tokens['completion'] += completion_tokens
+        return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens}
+
+    def models_entry(self) -> dict:
+        body = {'object': 'list', 'data': [{'id': 'gpt-4o-mini', 'object': 'model', 'created': 0, 'owned_by': 'synthetic'}]}
+        return {'status': 200, 'content_type': 'application/json', 'chunks': [[0.0, json.dumps(body)]]}
+
+    def completion_entry(self, body: dict, key: str) -> dict:
+        """Cassette entry answering a chat completion request (streamed or not)"""
+        rng = random.Random(f"{self.seed}:{key}")
+
+        def delay(seconds):
+            return max(0.0, seconds * rng.uniform(1 - self.jitter, 1 + self.jitter))
+
+        kind = call_kind(body)
+        self.calls[kind] += 1
+        pieces = self._pieces(kind, body)
+        base = {
+            'id': f"chatcmpl-{uuid.UUID(int=rng.getrandbits(128)).hex}",
+            'created': int(time.time()),
+            'model': body.get('model', 'gpt-4o-mini')
+        }
+
+        if not body.get('stream'):
+            completion = {
+                **base,
+                'object': 'chat.completion',
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': "".join(pieces).strip()},
+                    'finish_reason': 'stop'
+                }],
+                'usage': self._usage(body, pieces)
+            }
+            seconds = delay(self.ttft + len(pieces) / self.tokens_per_second)
+            return {'status': 200, 'content_type': 'application/json', 'chunks': [[seconds, json.dumps(completion)]]}
+
+        def event(delta: dict, finish_reason=None) -> str:
+            chunk = {**base, 'object': 'chat.completion.chunk',
+                     'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]}
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        chunks = [[delay(self.ttft), event({'role': 'assistant', 'content': ''})]]
+        chunks += [[delay(1 / self.tokens_per_second), event({'content': piece})] for piece in pieces]
+        chunks.append([0.0, event({}, 'stop')])
+        if (body.get('stream_options') or {}).get('include_usage'):
+            usage = {**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': self._usage(body, pieces)}
+            chunks.append([0.0, f"data: {json.dumps(usage)}\n\n"])
+        chunks.append([0.0, "data: [DONE]\n\n"])
+        return {'status': 200, 'content_type': 'text/event-stream', 'chunks': chunks}
+
+    def entry_for(self, method: str, path: str, body: bytes, key: str):
+        """Cassette entry for an API request, or None if it isn't one we synthesize"""
+        if method == 'GET' and path.endswith('/models'):
+            return self.models_entry()
+        if method == 'POST' and path.endswith('/chat/completions'):
+            return self.completion_entry(json.loads(body), key)
+        return None
+
+    def stats(self) -> dict:
+        return {'calls': dict(self.calls), 'tokens': dict(self.tokens)}
+
+
+class CassetteStore:
+    """Cassette files (one JSON file per request key) in a directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._loaded = {}
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str):
+        if key not in self._loaded:
+            try:
+                with open(self.path(key), encoding='utf-8') as f:
+                    self._loaded[key] = json.load(f)
+            except FileNotFoundError:
+                return None
+        return self._loaded[key]
+
+    def save(self, key: str, cassette: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{self.path(key)}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(cassette, f, indent=1, ensure_ascii=False)
+        os.replace(temporary, self.path(key))
+        self._loaded[key] = cassette
+
+
+class EntryStream(httpx.AsyncByteStream):
+    """Response body played back from a cassette entry, chunk by chunk"""
+
+    def __init__(self, chunks: list, speed: float):
+        self.chunks = chunks
+        self.speed = speed
+
+    async def __aiter__(self):
+        for delay, text in self.chunks:
+            if delay and self.speed:
+                await asyncio.sleep(delay * self.speed)
+            yield text.encode('utf-8')
+
+
+class RecordingStream(httpx.AsyncByteStream):
+    """Passes a live response body through while capturing its chunks and timing.
+
+    The cassette is saved once the body has been read to the end, or when the
+    client closes an event stream after its final `[DONE]` event (the OpenAI
+    SDK stops reading there); a body abandoned halfway is not saved.
+    """
+
+    def __init__(self, stream, on_complete):
+        self.stream = stream
+        self.on_complete = on_complete
+        self.chunks = []
+        self.saved = False
+
+    def _save(self):
+        if not self.saved:
+            self.saved = True
+            self.on_complete(self.chunks)
+
+    async def __aiter__(self):
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        last = time.perf_counter()
+        async for data in self.stream:
+            now = time.perf_counter()
+            text = decoder.decode(data)
+            if text:
+                self.chunks.append([round(now - last, 4), text])
+                last = now
+            yield data
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            self.chunks.append([0.0, tail])
+        self._save()
+
+    async def aclose(self):
+        if self.chunks and self.chunks[-1][1].rstrip().endswith('data: [DONE]'):
+            self._save()
+        await self.stream.aclose()
+
+
+class LLMTransport(httpx.AsyncBaseTransport):
+    """httpx transport implementing the record, replay and synthetic modes around the live one"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, config: dict = LLM_BACKEND_CONFIG):
+        if config['mode'] not in MODES:
+            raise ValueError(f"Unknown LLM backend mode '{config['mode']}' (expected one of {', '.join(MODES)})")
+        self.inner = inner
+        self.config = config
+        self.mode = config['mode']
+        self.cassettes = CassetteStore(config['cassette_dir'])
+        self.synthetic = SyntheticLLM.from_config(config['synthetic'])
+        self.stats = Counter()
+
+    def _response(self, request: httpx.Request, entry: dict, speed: float) -> httpx.Response:
+        return httpx.Response(
+            entry['status'],
+            headers={'content-type': entry['content_type']},
+            stream=EntryStream(entry['chunks'], speed),
+            request=request
+        )
+
+    def _missing(self, request: httpx.Request, key: str) -> httpx.Response:
+        # A 404 surfaces as openai.NotFoundError with this message, and isn't retried
+        self.stats['replay_misses'] += 1
+        if self.mode == 'synthetic':
+            message = f"No synthetic response for {request.method} {request.url.path}"
+        else:
+            message = f"No cassette {key} for {request.method} {request.url.path} in {self.config['cassette_dir']}"
+        log.warning("LLM cassette missing", extra={'key': key, 'path': request.url.path})
+        return httpx.Response(404, json={'error': {'message': message, 'type': 'cassette_missing'}}, request=request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.mode == 'live':
+            return await self.inner.handle_async_request(request)
+
+        body = await request.aread()
+        key = request_key(request.method, request.url.path, body)
+
+        if self.mode == 'synthetic':
+            entry = self.synthetic.entry_for(request.method, request.url.path, body, key)
+            if entry is None:
+                # Never reach the live API offline
+                return self._missing(request, key)
+            self.stats['synthetic'] += 1
+            return self._response(request, entry, 1.0)
+
+        if self.mode == 'replay':
+            cassette = self.cassettes.load(key)
+            if cassette is not None:
+                self.stats['replayed'] += 1
+                return self._response(request, cassette['response'], self.config['replay_speed'])
+            if self.config['replay_miss'] == 'synthetic':
+                entry = self.synthetic.entry_for(request.method, request.url.path, body, key)
+                if entry is not None:
+                    self.stats['synthetic'] += 1
+                    return self._response(request, entry, 1.0)
+            return self._missing(request, key)
+
+        # record: ask for an uncompressed body so the cassette holds plain text
+        request.headers['accept-encoding'] = 'identity'
+        response = await self.inner.handle_async_request(request)
+        if not 200 <= response.status_code < 300:
+            return response
+
+        def save(chunks):
+            self.cassettes.save(key, {
+                'request': {
+                    'method': request.method,
+                    'path': request.url.path,
+                    'body': json.loads(body) if body else None
+                },
+                'response': {
+                    'status': response.status_code,
+                    'content_type': response.headers.get('content-type', 'application/json'),
+                    'chunks': chunks
+                }
+            })
+            self.stats['recorded'] += 1
+
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=RecordingStream(response.stream, save),
+            request=request,
+            extensions=response.extensions
+        )
+
+    async def aclose(self):
+        await self.inner.aclose()
@@ -1,28 +1,94 @@
 import os
-from fastapi import FastAPI, HTTPException, Depends, Request
-from fastapi.responses import JSONResponse
+import hmac
+import logging
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Request, Header, Query
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel
 from typing import List, Optional
 from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import select
-import redis.asyncio as redis
 import openai
 import uuid
-from openai import AsyncOpenAI
 import json
 import re
-from models import Base, User, ChatbotSession as DBSession, Package
+from models import Base, User, ChatbotSession as DBSession, ChatbotMessage, Package
+from intent_matcher import intent_matcher
+from article_index import ArticleIndexRefresher
+from content_search_cache import ContentSearchCache, search_key
+from vocabulary_filter import VocabularyFilter
+import keyword_planner
+from history_store import RedisHistoryStore
+from history_writer import HistoryWriteBehind, journal_entry
+from request_db import RequestSessions
+from connections import ConnectionManager
+from answer_cache import AnswerCache
+import metrics
+import tracing
+import app_logging
+from package_catalog import PackageCatalog, park_names_for_package
+from package_ranking import rank_package_candidates, clear_winner
+from package_descriptions import (
+    DescriptionStore, DESCRIPTION_SYSTEM_PROMPT, package_id_of, package_info_text,
+    fallback_description, generate_descriptions_batch
+)
 from config import (
     TRAVEL_KEYWORDS, WILDLIFE_KEYWORDS, LOCATION_KEYWORDS, DURATION_KEYWORDS,
     BUDGET_KEYWORDS, EXPEDITION_KEYWORDS, BLOG_KEYWORDS, EXPEDITION_PARKS, AI_INFO_KEYWORDS, AI_INFO_URL, AI_PREDICTION_URL, SCORING_CONFIG, BUDGET_THRESHOLDS, PACKAGE_TYPES,
-    SYSTEM_PROMPT, REDIS_CONFIG, PACKAGE_SUGGESTION_CONFIG, SITE_BASE_URL, JUNGLORE_SITE_BASE_URL, GATE_PREDICTION_KEYWORDS, GATE_PREDICTION_URL
+    SYSTEM_PROMPT, REDIS_CONFIG, PACKAGE_SUGGESTION_CONFIG, CONTENT_SEARCH_CONFIG, CONTENT_SEARCH_CACHE_CONFIG, VOCABULARY_FILTER_CONFIG, KEYWORD_PLANNER_CONFIG, ARTICLE_INDEX_CONFIG, PACKAGE_CATALOG_CONFIG, DESCRIPTION_STORE_CONFIG, LATENCY_BUDGET_CONFIG, WRITE_BEHIND_CONFIG, SITE_BASE_URL, JUNGLORE_SITE_BASE_URL, GATE_PREDICTION_KEYWORDS, GATE_PREDICTION_URL
 )
 
 load_dotenv()
 
-app = FastAPI()
+# Queue-backed structured logging for every module (see LOGGING_CONFIG)
+app_logging.setup_logging()
+log = app_logging.get_logger('chat')
+content_log = app_logging.get_logger('content')
+packages_log = app_logging.get_logger('packages')
+
+# Long-running tasks started with the app (index refreshers etc.)
+background_tasks = []
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the connection pools and start background refreshers; stop both on shutdown"""
+    await connections.warm_up()
+    if ARTICLE_INDEX_CONFIG['enabled']:
+        background_tasks.append(asyncio.create_task(article_index_refresher.run()))
+    if CONTENT_SEARCH_CACHE_CONFIG['enabled']:
+        background_tasks.append(asyncio.create_task(content_search_cache.watch(AsyncSessionLocal)))
+    if vocabulary_filter_active:
+        background_tasks.append(asyncio.create_task(vocabulary_filter.run()))
+    if mongo_db is not None:
+        background_tasks.append(asyncio.create_task(package_catalog.run()))
+    background_tasks.append(asyncio.create_task(history_store.listen_for_invalidations()))
+    background_tasks.append(asyncio.create_task(history_writer.run()))
+    background_tasks.append(asyncio.create_task(tracer.run()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await history_writer.shutdown()
+    await tracer.shutdown()
+    await connections.close()
+    metrics.mark_worker_stopped()
+    app_logging.stop_logging()
+
+app = FastAPI(lifespan=lifespan)
+
+# Per-request span trees and Server-Timing headers
+tracer = tracing.Tracer()
+app.add_middleware(tracing.TracingMiddleware, tracer=tracer)
+# Added last so it runs first: the request id is set before tracing and every log line
+app.add_middleware(app_logging.RequestIdMiddleware)
+
+# Pooled clients for every backing service (sizes in CONNECTION_POOL_CONFIG)
+connections = ConnectionManager()
 
 # PostgreSQL setup (ExploreJungles.com - Blogs, Case Studies, Podcasts)
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -35,40 +101,60 @@ if DATABASE_URL:
     elif not DATABASE_URL.startswith("postgresql+asyncpg://"):
         # If it has any other postgresql driver, replace it
         DATABASE_URL = DATABASE_URL.replace("postgresql+", "postgresql+asyncpg://").replace("://", "", 1)
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = connections.create_postgres_engine(DATABASE_URL)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# One lazily connected session per request, shared by every helper in it
+request_sessions = RequestSessions(AsyncSessionLocal)
+request_sessions.instrument(engine)
 
 # MongoDB setup (Junglore.com - Expeditions, Predictive Models)
 MONGODB_URI = os.getenv("MONGODB_URI")
 if MONGODB_URI:
-    import motor.motor_asyncio
-    mongo_client = motor.motor_asyncio.AsyncIOMotorClient(MONGODB_URI)
+    mongo_client = connections.create_mongo_client(MONGODB_URI)
     mongo_db = mongo_client["jungloreprod"]
 else:
     mongo_client = None
     mongo_db = None
 
-# Database dependency
+# In-memory article index (content matching without a database round trip)
+article_index_refresher = ArticleIndexRefresher(AsyncSessionLocal)
+
+# Database dependency (opens the request scope; helpers share the session via request_sessions)
 async def get_db():
-    async with AsyncSessionLocal() as session:
+    async with request_sessions.scope() as session:
         yield session
 
 # Redis setup
 REDIS_URL = os.getenv("REDIS_URL")
-redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+redis_client = connections.create_redis_client(REDIS_URL)
+history_store = RedisHistoryStore(redis_client)
+history_writer = HistoryWriteBehind(redis_client, AsyncSessionLocal)
 
 # OpenAI setup
 openai_api_key = os.getenv("OPENAI_API_KEY")
-import httpx
-# Create a dedicated httpx AsyncClient and pass it to the OpenAI client to avoid version-specific constructor issues
-httpx_client = httpx.AsyncClient()
-client = AsyncOpenAI(api_key=openai_api_key, http_client=httpx_client)
+# Dedicated keepalive httpx pool passed to the OpenAI client (also avoids version-specific constructor issues)
+client = connections.create_openai_client(openai_api_key)
+
+# Content search results (and misses) shared by every worker, retired when the content table changes
+content_search_cache = ContentSearchCache(redis_client)
+# Words of published content, so keywords that occur nowhere skip the database. Only used when
+# PostgreSQL serves content matching in steady state, i.e. with the in-memory article index disabled
+vocabulary_filter = VocabularyFilter(redis_client, AsyncSessionLocal)
+vocabulary_filter_active = VOCABULARY_FILTER_CONFIG['enabled'] and not ARTICLE_INDEX_CONFIG['enabled']
+
+# AI package descriptions, generated once per package content version
+description_store = DescriptionStore(request_sessions, redis_client)
+
+# General answers shared across sessions and workers (keyed to the prompt and model that produced them)
+CHAT_MODEL = "gpt-4o-mini"
+answer_cache = AnswerCache(redis_client, f"{CHAT_MODEL}\n{SYSTEM_PROMPT}")
 
 # Models
 class Message(BaseModel):
     sender: str  # 'user' or 'bot'
     text: str
     timestamp: Optional[str] = None
+    seq: Optional[int] = None  # Pass as before_seq to page back through the transcript
 
 class NewSessionRequest(BaseModel):
     user_id: str
@@ -137,6 +223,71 @@ async def health_db():
     
     return health_status
 
+# Package matching prompt-size/latency stats, by prompt sent (whole catalog or local top-K)
+@app.get("/stats/package-matching")
+async def package_matching_statistics():
+    report = {}
+    for mode, stats in package_matching_stats.items():
+        llm_calls = stats['llm_calls'] or 1
+        requests = stats['requests'] or 1
+        report[mode] = {
+            **stats,
+            'avg_prompt_chars': round(stats['prompt_chars'] / llm_calls),
+            'avg_packages_in_prompt': round(stats['packages_in_prompt'] / llm_calls, 1),
+            'avg_llm_latency_ms': round(stats['llm_latency_ms'] / llm_calls, 1),
+            'avg_total_latency_ms': round(stats['total_latency_ms'] / requests, 1)
+        }
+    return report
+
+# Session history cache hit/miss and write-behind counters for this worker
+@app.get("/stats/session-history")
+async def session_history_statistics():
+    report = history_store.stats_report()
+    report['write_behind'] = {
+        **history_writer.stats,
+        'journal_length': await redis_client.llen(WRITE_BEHIND_CONFIG['journal_key'])
+    }
+    return report
+
+# Connection pool checkouts per request for this worker
+@app.get("/stats/db-pool")
+async def db_pool_statistics():
+    return request_sessions.report(engine.pool)
+
+# General answer cache hit/miss counters for this worker
+@app.get("/stats/answer-cache")
+async def answer_cache_statistics():
+    return answer_cache.stats_report()
+
+# Drop cached general answers (all, or one question); requires ADMIN_TOKEN
+@app.delete("/admin/answer-cache")
+async def purge_answer_cache(question: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token or not hmac.compare_digest(x_admin_token or '', admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return {"removed": await answer_cache.purge(question)}
+
+# Content search cache hit/miss counters for this worker
+@app.get("/stats/content-search-cache")
+async def content_search_cache_statistics():
+    return content_search_cache.stats_report()
+
+# Vocabulary filter size and keywords it kept out of the database for this worker
+@app.get("/stats/vocabulary-filter")
+async def vocabulary_filter_statistics():
+    return vocabulary_filter.stats_report()
+
+# Prometheus metrics (aggregated across workers when PROMETHEUS_MULTIPROC_DIR is set)
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+# In-use/idle connections and pool wait times for every backing service
+@app.get("/stats/connections")
+async def connection_statistics():
+    return connections.report()
+
 # Create a new user
 @app.post("/users/", response_model=UserResponse)
 async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
@@ -178,9 +329,7 @@ async def start_session(req: NewSessionRequest, db: AsyncSession = Depends(get_d
             created_at=session.created_at.isoformat()
         )
     except Exception as e:
-        print(f"ERROR creating session: {type(e).__name__}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error creating session", extra={'user_id': req.user_id})
         raise HTTPException(status_code=500, detail=f"Error creating session: {str(e)}")
 
 # List all sessions for a user
@@ -199,9 +348,39 @@ async def list_sessions(user_id: str, db: AsyncSession = Depends(get_db)):
         for s in sessions
     ]
 
+async def fetch_recent_messages(session_id: str, db: AsyncSession, limit: int, before_seq: Optional[int] = None) -> list:
+    """Keyset read of a session's messages older than before_seq (newest first), returned oldest first"""
+    query = select(ChatbotMessage).filter(ChatbotMessage.session_id == session_id)
+    if before_seq is not None:
+        query = query.filter(ChatbotMessage.seq < before_seq)
+    result = await db.execute(query.order_by(ChatbotMessage.seq.desc()).limit(limit))
+    return list(reversed(result.scalars().all()))
+
+async def fetch_first_message(session_id: str, db: AsyncSession):
+    result = await db.execute(
+        select(ChatbotMessage).filter(ChatbotMessage.session_id == session_id).order_by(ChatbotMessage.seq).limit(1)
+    )
+    return result.scalar_one_or_none()
+
+def legacy_messages(history: list, first_message) -> list:
+    """Legacy JSON history turns missing from chatbot_messages, oldest first, with negative seqs.
+
+    Turns from before chatbot_messages stay only in the JSON column unless
+    scripts/backfill_chatbot_messages.py copied them; a backfilled session's
+    first row repeats the JSON's first turn. Negative seqs sort before every
+    row, so before_seq paging continues into them.
+    """
+    history = history or []
+    if not history:
+        return []
+    if first_message is not None and (first_message.sender, first_message.text) == (history[0].get('sender'), history[0].get('text')):
+        return []
+    return [{**m, 'seq': i - len(history)} for i, m in enumerate(history)]
+
 # Get chat history for a session
 @app.get("/sessions/{session_id}/history", response_model=List[Message])
-async def get_history(session_id: str, user_id: str, db: AsyncSession = Depends(get_db)):
+async def get_history(session_id: str, user_id: str, before_seq: Optional[int] = None,
+                      limit: int = Query(100, ge=1, le=500), db: AsyncSession = Depends(get_db)):
     result = await db.execute(
         select(DBSession).filter(
             DBSession.session_id == session_id,
@@ -211,20 +390,23 @@ async def get_history(session_id: str, user_id: str, db: AsyncSession = Depends(
     session = result.scalar_one_or_none()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    return [Message(**m) for m in session.history or []]
+    # Negative before_seqs page through legacy turns only
+    messages = await fetch_recent_messages(session_id, db, limit, before_seq) if before_seq is None or before_seq > 0 else []
+    page = [
+        Message(sender=m.sender, text=m.text, timestamp=m.created_at.isoformat() if m.created_at else None, seq=m.seq)
+        for m in messages
+    ]
+    if len(page) < limit:
+        # Reached the session's first chatbot_messages row: older turns may only be in the legacy JSON history
+        first_message = messages[0] if messages else await fetch_first_message(session_id, db)
+        legacy = [m for m in legacy_messages(session.history, first_message) if before_seq is None or m['seq'] < before_seq]
+        page = [Message(**m) for m in legacy[max(0, len(legacy) - (limit - len(page))):]] + page
+    return page
 
 async def generate_package_description(package, description_type="short"):
     """Generate AI-powered description for packages"""
     try:
-        package_info = f"""
-        Title: {package.get('title', '')}
-        Description: {package.get('description', '')}
-        Location: {package.get('heading', '')} - {package.get('region', '')}
-        Duration: {package.get('duration', '')}
-        Type: {package.get('type', '')}
-        Price: {package.get('price', '')} {package.get('currency', '')}
-        Features: {package.get('features', {})}
-        """
+        package_info = package_info_text(package)
         
         if description_type == "short":
             prompt = f"""
@@ -248,77 +430,172 @@ async def generate_package_description(package, description_type="short"):
             Make it exciting and informative. Write 3-4 paragraphs.
             """
         
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a wildlife safari expert. Create compelling descriptions that make people excited about the safari experience."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=200 if description_type == "short" else 500,
-            temperature=0.7
-        )
+        with metrics.track('openai', 'package_description'):
+            response = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": DESCRIPTION_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=200 if description_type == "short" else 500,
+                temperature=0.7
+            )
+        metrics.count_llm_usage('package_description', response.usage)
         
         return response.choices[0].message.content.strip()
         
     except Exception as e:
-        print(f"Error generating package description: {e}")
+        packages_log.warning("Error generating package description", extra={'error': str(e)})
         # Fallback to original description
-        if description_type == "short":
-            return package.get('description', '')[:100] + "..." if len(package.get('description', '')) > 100 else package.get('description', '')
-        else:
-            return package.get('description', '')
+        return fallback_description(package, description_type)
+
+
+# Descriptions currently being generated in the background: (package_id, type) -> task
+pending_descriptions = {}
+
+async def fill_package_description(package, description_type):
+    """Generate a description outside the request path and save it to the store"""
+    key = (package_id_of(package), description_type)
+    try:
+        entries = await generate_descriptions_batch(client, [package], description_type)
+        await description_store.put_many(entries, description_type)
+    except Exception as e:
+        packages_log.warning("Error filling package description", extra={'error': str(e)})
+    finally:
+        pending_descriptions.pop(key, None)
+
 
-async def intelligent_package_matching(user_message, packages):
-    """Use GPT-4o-mini to intelligently match user intent with packages"""
+async def get_package_description(package, description_type="short"):
+    """Stored AI description for a package; never waits on the LLM unless configured to.
+
+    On a miss the package's own text is returned and the AI description is
+    generated in the background (see scripts/pregenerate_package_descriptions.py
+    for filling the store ahead of time).
+    """
+    try:
+        description = await description_store.get(package, description_type)
+        if description:
+            return description
+    except Exception as e:
+        packages_log.warning("Error reading package description store", extra={'error': str(e)})
+    
+    mode = DESCRIPTION_STORE_CONFIG['generate_on_miss']
+    if mode == 'inline':
+        description = await generate_package_description(package, description_type)
+        try:
+            await description_store.put_many([(package, description)], description_type)
+        except Exception as e:
+            packages_log.warning("Error saving package description", extra={'error': str(e)})
+        return description
+    if mode == 'background':
+        key = (package_id_of(package), description_type)
+        if key not in pending_descriptions:
+            pending_descriptions[key] = asyncio.create_task(fill_package_description(package, description_type))
+    return fallback_description(package, description_type)
+
+def build_package_matching_prompt(user_message, packages):
+    """Build the GPT-4o-mini prompt asking it to pick one of `packages`"""
+    # Create a summary of available packages for the AI
+    package_summaries = []
+    for i, package in enumerate(packages, 1):
+        summary = f"""
+        {i}. Package: {package.get('title', '')}
+        Description: {package.get('description', '')}
+        Location: {package.get('heading', '')} - {package.get('region', '')}
+        Duration: {package.get('duration', '')}
+        Type: {package.get('type', '')}
+        Wildlife Focus: {package.get('title', '')} {package.get('description', '')}
+        """
+        package_summaries.append(summary)
+    
+    # Create the matching prompt for GPT-4o-mini
+    return f"""
+    You are an expert wildlife safari consultant. A user has asked: "{user_message}"
+    
+    Based on their request, analyze these available safari packages and recommend the MOST RELEVANT ONE that best matches their specific requirements.
+    
+    Available packages:
+    {chr(10).join(package_summaries)}
+    
+    Consider:
+    1. Wildlife they want to see (tigers, elephants, lions, etc.)
+    2. Specific locations they mentioned (Ranthambore, Corbett, etc.)
+    3. Duration preferences (1 day, 3 days, etc.)
+    4. Type of experience (expedition vs luxury resort)
+    5. Budget considerations
+    6. Any negative preferences they mentioned (e.g., "not in Corbett")
+    
+    Respond with ONLY the package number (1, 2, 3, etc.) that best matches their request. If no package is suitable, respond with "NONE".
+    
+    Be very precise - only recommend a package if it's a strong match for their specific requirements.
+    """
+
+
+# Prompt size and latency of package matching, by the prompt sent ('full' = whole catalog,
+# with pre-ranking disabled or finding no local signal; 'preranked' = local top-K candidates only)
+package_matching_stats = {
+    mode: {
+        'requests': 0, 'llm_calls': 0, 'llm_skipped': 0,
+        'packages_in_prompt': 0, 'prompt_chars': 0,
+        'llm_latency_ms': 0.0, 'total_latency_ms': 0.0
+    }
+    for mode in ('full', 'preranked')
+}
+
+
+@tracing.traced()
+async def intelligent_package_matching(user_message, packages, locations=None):
+    """Use GPT-4o-mini to intelligently match user intent with packages.
+
+    Packages are first scored locally (package_ranking.py) and only the top
+    candidates are sent to the LLM; the LLM call is skipped when one candidate
+    clearly wins.
+    """
+    started = time.perf_counter()
+    preranking = PACKAGE_SUGGESTION_CONFIG['local_preranking']
+    stats = package_matching_stats['preranked' if preranking else 'full']
     try:
         if not packages:
             return None
-            
-        # Create a summary of available packages for the AI
-        package_summaries = []
-        for i, package in enumerate(packages, 1):
-            summary = f"""
-            {i}. Package: {package.get('title', '')}
-            Description: {package.get('description', '')}
-            Location: {package.get('heading', '')} - {package.get('region', '')}
-            Duration: {package.get('duration', '')}
-            Type: {package.get('type', '')}
-            Wildlife Focus: {package.get('title', '')} {package.get('description', '')}
-            """
-            package_summaries.append(summary)
-        
-        # Create the matching prompt for GPT-4o-mini
-        matching_prompt = f"""
-        You are an expert wildlife safari consultant. A user has asked: "{user_message}"
-        
-        Based on their request, analyze these available safari packages and recommend the MOST RELEVANT ONE that best matches their specific requirements.
         
-        Available packages:
-        {chr(10).join(package_summaries)}
-        
-        Consider:
-        1. Wildlife they want to see (tigers, elephants, lions, etc.)
-        2. Specific locations they mentioned (Ranthambore, Corbett, etc.)
-        3. Duration preferences (1 day, 3 days, etc.)
-        4. Type of experience (expedition vs luxury resort)
-        5. Budget considerations
-        6. Any negative preferences they mentioned (e.g., "not in Corbett")
-        
-        Respond with ONLY the package number (1, 2, 3, etc.) that best matches their request. If no package is suitable, respond with "NONE".
+        candidates = packages
+        if preranking:
+            ranked = rank_package_candidates(user_message, packages, locations, top_k=None)
+            winner = clear_winner(ranked, PACKAGE_SUGGESTION_CONFIG['clear_winner_margin'])
+            if winner is not None:
+                stats['llm_skipped'] += 1
+                packages_log.debug("Local ranking picked a package without an LLM call", extra={'package': winner.get('title')})
+                return winner
+            if not ranked:
+                stats['llm_skipped'] += 1
+                return None
+            if ranked[0][1] > 0:
+                candidates = [package for package, _score in ranked[:PACKAGE_SUGGESTION_CONFIG['llm_candidates']]]
+            else:
+                # No local signal: a top-K would just be the first packages in catalog order,
+                # so the LLM sees every package that isn't excluded
+                candidates = [package for package, _score in ranked]
+                stats = package_matching_stats['full']
         
-        Be very precise - only recommend a package if it's a strong match for their specific requirements.
-        """
+        matching_prompt = build_package_matching_prompt(user_message, candidates)
+        stats['packages_in_prompt'] += len(candidates)
+        stats['prompt_chars'] += len(matching_prompt)
         
         # Call GPT-4o-mini for intelligent matching
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a wildlife safari expert. Analyze user requests and match them with the most relevant safari package. Be precise and only recommend strong matches."},
-                {"role": "user", "content": matching_prompt}
-            ],
-            max_tokens=50,
-            temperature=0.1  # Low temperature for consistent matching
-        )
+        llm_started = time.perf_counter()
+        with metrics.track('openai', 'package_matching'):
+            response = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "You are a wildlife safari expert. Analyze user requests and match them with the most relevant safari package. Be precise and only recommend strong matches."},
+                    {"role": "user", "content": matching_prompt}
+                ],
+                max_tokens=50,
+                temperature=0.1  # Low temperature for consistent matching
+            )
+        metrics.count_llm_usage('package_matching', response.usage)
+        stats['llm_calls'] += 1
+        stats['llm_latency_ms'] += (time.perf_counter() - llm_started) * 1000
         
         ai_response = response.choices[0].message.content.strip()
         
@@ -328,37 +605,40 @@ async def intelligent_package_matching(user_message, packages):
                 return None
             elif ai_response.isdigit():
                 package_index = int(ai_response) - 1
-                if 0 <= package_index < len(packages):
-                    return packages[package_index]
+                if 0 <= package_index < len(candidates):
+                    return candidates[package_index]
         except:
             pass
             
         return None
         
     except Exception as e:
-        print(f"Error in intelligent package matching: {e}")
+        packages_log.warning("Error in intelligent package matching", extra={'error': str(e)})
         return None
+    finally:
+        stats['requests'] += 1
+        stats['total_latency_ms'] += (time.perf_counter() - started) * 1000
 
-async def find_relevant_package(user_message, db_session: AsyncSession):
+async def find_relevant_package(user_message, locations=None):
     """Find the most relevant expedition from Junglore.com MongoDB"""
     if mongo_db is None:
         return None
     
     try:
-        # Get all active expedition packages from MongoDB
-        cursor = mongo_db.packages.find({"status": True})
-        packages = await cursor.to_list(length=PACKAGE_SUGGESTION_CONFIG['max_packages_to_search'])
+        # Get all active expedition packages from the cached catalog
+        packages = [p for p in await package_catalog.get_packages() if p.get('status') is True]
+        packages = packages[:PACKAGE_SUGGESTION_CONFIG['max_packages_to_search']]
         
         if not packages:
             return None
         
         # Use AI-powered matching
-        best_match = await intelligent_package_matching(user_message, packages)
+        best_match = await intelligent_package_matching(user_message, packages, locations)
         
         return best_match
         
     except Exception as e:
-        print(f"Error finding relevant package: {e}")
+        packages_log.warning("Error finding relevant package", extra={'error': str(e)})
         return None
 
 # Helpers for expedition-specific behaviour
@@ -372,44 +652,40 @@ def _slugify(text: str) -> str:
     text = re.sub(r"-+", "-", text).strip('-')
     return text
 
+# Packages whose type marks them as expeditions
+EXPEDITION_TYPE_PATTERN = re.compile("expedition", re.IGNORECASE)
+
+@tracing.traced()
 async def find_expedition_packages(location: Optional[str] = None, max_results: int = 100):
-    """Return expedition packages from Junglore.com MongoDB (Expeditions)"""
+    """Return expedition packages from Junglore.com MongoDB (Expeditions), served from the package catalog cache"""
     if mongo_db is None:
-        print("❌ ERROR: MongoDB connection is None - cannot fetch packages")
-        print("   Check your MONGODB_URI in .env file")
+        packages_log.error("MongoDB connection is None - cannot fetch packages (check MONGODB_URI)")
         return []
     
     try:
-        print(f"\n🔍 QUERYING MONGODB for expeditions (location filter: {location})...")
-        
-        # Try lenient query first - just get expedition type packages
-        query = {"type": {"$regex": "expedition", "$options": "i"}}
+        # Lenient filter - just expedition type packages
+        with metrics.track('mongo', 'find_expedition_packages'):
+            catalog = await package_catalog.get_packages()
+        packages = [p for p in catalog if EXPEDITION_TYPE_PATTERN.search(str(p.get('type') or ''))]
         
         # Add location filter if provided
         if location:
-            query["$or"] = [
-                {"region": {"$regex": location, "$options": "i"}},
-                {"heading": {"$regex": location, "$options": "i"}},
-                {"title": {"$regex": location, "$options": "i"}},
-                {"slug": {"$regex": location, "$options": "i"}}
+            location_pattern = re.compile(re.escape(location), re.IGNORECASE)
+            packages = [
+                p for p in packages
+                if any(location_pattern.search(str(p.get(field) or '')) for field in ('region', 'heading', 'title', 'slug'))
             ]
         
-        packages = await mongo_db.packages.find(query).to_list(max_results)
-        print(f"✅ Found {len(packages)} packages in MongoDB")
+        packages = packages[:max_results]
+        packages_log.debug("Expedition packages from catalog", extra={'location': location, 'count': len(packages)})
         
         if len(packages) == 0:
-            print("⚠️  WARNING: Zero packages returned from MongoDB!")
-            print(f"   Query used: {query}")
-            print("   This suggests:")
-            print("   1. No packages exist in 'packages' collection")
-            print("   2. Wrong database connected (check MONGODB_URI)")
-            print("   3. Field 'type' doesn't contain 'expedition' in any package")
+            # Usually an empty 'packages' collection, the wrong MONGODB_URI or no 'expedition' types
+            packages_log.warning("Zero expedition packages in catalog", extra={'location': location})
         
         return packages
     except Exception as e:
-        print(f"❌ ERROR fetching expeditions from MongoDB: {e}")
-        import traceback
-        traceback.print_exc()
+        packages_log.exception("Error fetching expeditions from MongoDB")
         return []
 
 
@@ -417,14 +693,9 @@ async def extract_park_names_from_packages(packages):
     """Extract unique park/location names from packages dynamically"""
     park_names = set()
     for pkg in packages:
-        # Extract from multiple fields
-        for field in ['region', 'heading', 'title', 'location']:
-            value = pkg.get(field, '')
-            if value and isinstance(value, str):
-                # Clean up the name
-                cleaned = value.replace('National Park', '').replace('Expedition', '').strip()
-                if cleaned:
-                    park_names.add(cleaned)
+        # Catalog entries carry precomputed names
+        names = pkg.get('park_names')
+        park_names.update(names if names is not None else park_names_for_package(pkg))
     return sorted(list(park_names))
 
 
@@ -449,39 +720,103 @@ def calculate_relevance_score(article_title: str, article_excerpt: str, search_k
     return score
 
 
+# Columns selected for every content search; rank is appended by the full-text query
+CONTENT_COLUMNS = """
+    id, title, slug, excerpt, author_name,
+    featured_image, type, view_count, published_at, created_at
+"""
+
+# Set to False at runtime if the search_vector column has not been migrated yet
+fulltext_search_available = CONTENT_SEARCH_CONFIG['backend'] == 'fulltext'
+
+
+def content_search_sql(topic_ref: str) -> str:
+    """SELECT for published content matching `topic_ref` (a bind parameter or column) using the configured backend"""
+    if fulltext_search_available:
+        # Ranked search over the weighted tsvector column (see scripts/add_content_search_index.py)
+        return f"""
+            SELECT {CONTENT_COLUMNS},
+                   ts_rank(CAST(:weights AS float4[]), search_vector, query) AS rank
+            FROM content, plainto_tsquery(CAST(:ts_config AS regconfig), {topic_ref}) AS query
+            WHERE status = 'PUBLISHED'
+            AND search_vector @@ query
+            ORDER BY rank DESC, published_at DESC NULLS LAST
+            LIMIT :limit
+        """
+    # Legacy substring scan over title, excerpt and full body
+    return f"""
+        SELECT {CONTENT_COLUMNS}, 0 AS rank
+        FROM content
+        WHERE status = 'PUBLISHED'
+        AND (
+            LOWER(title) LIKE '%' || LOWER({topic_ref}) || '%'
+            OR LOWER(excerpt) LIKE '%' || LOWER({topic_ref}) || '%'
+            OR LOWER(content) LIKE '%' || LOWER({topic_ref}) || '%'
+        )
+        ORDER BY published_at DESC NULLS LAST
+        LIMIT :limit
+    """
+
+
+def batch_content_search_sql() -> str:
+    """Evaluate every candidate topic in :topics in one statement, tagging rows with the topic's priority"""
+    # The LATERAL subquery's ORDER BY only picks its LIMIT rows; the outer query must re-sort them
+    return f"""
+        SELECT t.priority, matches.*
+        FROM unnest(CAST(:topics AS text[])) WITH ORDINALITY AS t(topic, priority)
+        CROSS JOIN LATERAL ({content_search_sql('t.topic')}) AS matches
+        ORDER BY t.priority, matches.rank DESC, matches.published_at DESC NULLS LAST
+    """
+
+
+async def execute_content_search(session, build_sql, params: dict):
+    """Run a content search, falling back to LIKE if the search_vector column is missing"""
+    global fulltext_search_available
+    from sqlalchemy import text
+    from sqlalchemy.exc import ProgrammingError
+
+    def search_params():
+        if not fulltext_search_available:
+            return dict(params)
+        return {
+            **params,
+            "ts_config": CONTENT_SEARCH_CONFIG['text_search_config'],
+            "weights": CONTENT_SEARCH_CONFIG['rank_weights']
+        }
+
+    try:
+        return await session.execute(text(build_sql()), search_params())
+    except ProgrammingError as e:
+        if not fulltext_search_available or 'search_vector' not in str(e):
+            raise
+        content_log.warning("content.search_vector missing - run scripts/add_content_search_index.py. Falling back to LIKE search.")
+        fulltext_search_available = False
+        await session.rollback()
+        return await session.execute(text(build_sql()), search_params())
+
+
+@tracing.traced()
 async def find_blog_content(topic: Optional[str] = None, max_results: int = 10, keywords: list = None):
     """
     Retrieve blog/educational content from PostgreSQL (ExploreJungles.com).
-    Supports optional topic filtering and relevance scoring.
+    Topic searches use the full-text index and come back ranked by ts_rank;
+    keyword re-scoring with calculate_relevance_score is optional (CONTENT_SEARCH_CONFIG).
     Returns list of blog posts with details, sorted by relevance.
     """
     try:
-        print(f"\n🔍 QUERYING POSTGRESQL for blog content (topic: {topic}, keywords: {keywords})...")
-        
         from sqlalchemy import text
-        async with AsyncSessionLocal() as session:
+        async with metrics.track('postgres', 'find_blog_content'), request_sessions.session() as session:
             # Build query - get published content only
             if topic:
-                # Use parameterized query to avoid SQL injection
-                query = text("""
-                    SELECT id, title, slug, excerpt, author_name, 
-                           featured_image, type, view_count, published_at, created_at
-                    FROM content
-                    WHERE status = 'PUBLISHED'
-                    AND (
-                        LOWER(title) LIKE :topic
-                        OR LOWER(excerpt) LIKE :topic
-                        OR LOWER(content) LIKE :topic
-                    )
-                    ORDER BY published_at DESC NULLS LAST
-                    LIMIT :limit
-                """)
-                result = await session.execute(query, {"topic": f"%{topic.lower()}%", "limit": max_results * 2})  # Get more for scoring
+                result = await execute_content_search(
+                    session,
+                    lambda: content_search_sql(':topic'),
+                    {"topic": topic, "limit": max_results * 2}  # Get more for scoring
+                )
             else:
                 # Get recent content if no topic specified
-                query = text("""
-                    SELECT id, title, slug, excerpt, author_name, 
-                           featured_image, type, view_count, published_at, created_at
+                query = text(f"""
+                    SELECT {CONTENT_COLUMNS}, 0 AS rank
                     FROM content
                     WHERE status = 'PUBLISHED'
                     ORDER BY published_at DESC NULLS LAST
@@ -490,61 +825,130 @@ async def find_blog_content(topic: Optional[str] = None, max_results: int = 10,
                 result = await session.execute(query, {"limit": max_results})
             
             rows = result.fetchall()
-            print(f"✅ Retrieved {len(rows)} blog posts from database")
+            content_log.debug("Blog content query", extra={'topic': topic, 'keywords': keywords, 'rows': len(rows)})
             
-            if len(rows) == 0:
-                print("⚠️  WARNING: Zero blog posts returned from PostgreSQL!")
-                print(f"   Search topic: {topic}")
-                print("   This suggests:")
-                print("   1. No published content in 'content' table")
-                print("   2. Search topic doesn't match any articles")
-                print("   3. Database connection issue")
-            
-            # Format results with relevance scoring
-            formatted_content = []
-            for row in rows:
-                article = {
-                    "id": str(row[0]),
-                    "title": row[1],
-                    "slug": row[2],
-                    "excerpt": row[3] or "",
-                    "author": row[4] or "Junglore",
-                    "image": row[5] or "",
-                    "type": row[6],
-                    "views": row[7] or 0,
-                    "url": f"{SITE_BASE_URL}/blog/{row[2]}",  # explorejungles.com blog URL
-                    "relevance_score": 0
-                }
-                
-                # Calculate relevance if keywords provided
-                if keywords:
-                    article["relevance_score"] = calculate_relevance_score(
-                        article["title"], 
-                        article["excerpt"], 
-                        keywords
-                    )
-                
-                formatted_content.append(article)
-            
-            # If keywords provided, filter and sort by relevance
-            if keywords:
-                # Filter out low relevance (score < 3 means only weak matches)
-                formatted_content = [a for a in formatted_content if a["relevance_score"] >= 3]
-                # Sort by relevance score (highest first)
-                formatted_content.sort(key=lambda x: x["relevance_score"], reverse=True)
-                print(f"   Filtered to {len(formatted_content)} relevant posts (min score: 3)")
-                if formatted_content:
-                    print(f"   Top result: '{formatted_content[0]['title']}' (score: {formatted_content[0]['relevance_score']})")
-            
-            return formatted_content[:max_results]
+            return rank_blog_rows(rows, keywords, max_results)
             
     except Exception as e:
-        print(f"Error querying PostgreSQL content: {e}")
-        import traceback
-        traceback.print_exc()
+        content_log.exception("Error querying PostgreSQL content", extra={'topic': topic})
         return []
 
 
+@tracing.traced()
+async def find_blog_content_batch(topics: list, max_results: int = 10, keywords: list = None):
+    """
+    Search for several candidate topics in a single database round trip.
+    Topics are in priority order; returns (topic, posts) for the first topic
+    whose results survive relevance filtering, or (None, []) if none do.
+    Results, including misses, are served from the shared content search cache when possible.
+    """
+    if not topics:
+        return None, []
+    cache_key = version = None
+    if content_search_cache.enabled:
+        cache_key = search_key(topics, keywords, max_results)
+        version, cached = await content_search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    try:
+        async with metrics.track('postgres', 'find_blog_content_batch'), request_sessions.session() as session:
+            result = await execute_content_search(
+                session,
+                batch_content_search_sql,
+                {"topics": list(topics), "limit": max_results * 2}  # Get more for scoring
+            )
+            rows = result.fetchall()
+        content_log.debug("Batch blog content query", extra={'topics': topics, 'keywords': keywords, 'rows': len(rows)})
+        
+        # Group rows by topic priority (1-based ordinality); the query sorts each group by rank, then recency
+        rows_by_priority = {}
+        for row in rows:
+            rows_by_priority.setdefault(row[0], []).append(row[1:])
+        
+        matched_topic, posts = None, []
+        for priority, topic in enumerate(topics, 1):
+            posts = rank_blog_rows(rows_by_priority.get(priority, []), keywords, max_results)
+            if posts:
+                matched_topic = topic
+                break
+        if cache_key is not None:
+            await content_search_cache.put(version, cache_key, matched_topic, posts)
+        return matched_topic, posts
+        
+    except Exception as e:
+        content_log.exception("Error querying PostgreSQL content", extra={'topics': topics})
+        return None, []
+
+
+def rank_blog_rows(rows, keywords: list, max_results: int):
+    """Format content rows as articles, applying relevance filtering and ordering"""
+    rerank = bool(keywords) and CONTENT_SEARCH_CONFIG['rerank_with_keywords']
+    formatted_content = []
+    for row in rows:
+        article = {
+            "id": str(row[0]),
+            "title": row[1],
+            "slug": row[2],
+            "excerpt": row[3] or "",
+            "author": row[4] or "Junglore",
+            "image": row[5] or "",
+            "type": row[6],
+            "views": row[7] or 0,
+            "url": f"{SITE_BASE_URL}/blog/{row[2]}",  # explorejungles.com blog URL
+            "relevance_score": float(row[10] or 0)  # ts_rank from the full-text query
+        }
+        
+        # Calculate relevance if keywords provided
+        if rerank:
+            article["relevance_score"] = calculate_relevance_score(
+                article["title"], 
+                article["excerpt"], 
+                keywords
+            )
+        
+        formatted_content.append(article)
+    
+    if rerank:
+        # Filter out low relevance (score < 3 means only weak matches)
+        min_score = CONTENT_SEARCH_CONFIG['min_relevance_score']
+        formatted_content = [a for a in formatted_content if a["relevance_score"] >= min_score]
+        # Sort by relevance score (highest first)
+        formatted_content.sort(key=lambda x: x["relevance_score"], reverse=True)
+    elif keywords and fulltext_search_available:
+        # Rows are already ordered by ts_rank - just drop weak matches
+        formatted_content = [a for a in formatted_content if a["relevance_score"] >= CONTENT_SEARCH_CONFIG['min_rank']]
+    if keywords and formatted_content and content_log.isEnabledFor(logging.DEBUG):
+        content_log.debug("Top content result", extra={
+            'title': formatted_content[0]['title'], 'score': formatted_content[0]['relevance_score'], 'results': len(formatted_content)
+        })
+    
+    return formatted_content[:max_results]
+
+
+# Words ignored when extracting content search keywords from a user message
+CONTENT_STOP_WORDS = ['tell', 'me', 'about', 'the', 'a', 'an', 'in', 'blog', 'article', 'read', 'learn', 'want', 'to', 'know', 'case', 'study', 'what', 'why', 'how', 'is', 'are', 'was', 'were', 'can', 'could', 'would', 'should']
+
+
+def extract_search_keywords(user_message: str) -> list:
+    """Extract meaningful content search keywords from a user message, in message order"""
+    words = user_message.lower().split()
+    return [w for w in words if w not in CONTENT_STOP_WORDS and len(w) > 2]
+
+
+def build_search_candidates(keywords: list) -> list:
+    """
+    Candidate search topics in priority order: the first 3 keywords individually,
+    then the first two combined, then all keywords combined.
+    """
+    candidate_topics = list(keywords[:3])
+    if len(keywords) > 1:
+        candidate_topics.append(' '.join(keywords[:2]))
+    if len(keywords) > 2:
+        candidate_topics.append(' '.join(keywords))
+    return list(dict.fromkeys(candidate_topics))
+
+
+@tracing.traced()
 async def match_content_in_database(user_message: str) -> dict:
     """
     Analyze user message and match against ALL available content in database.
@@ -552,48 +956,45 @@ async def match_content_in_database(user_message: str) -> dict:
     Returns matched content from database.
     """
     try:
-        # Extract topic keywords from user query
-        user_lower = user_message.lower()
-        
-        # Define stop words
-        stop_words = ['tell', 'me', 'about', 'the', 'a', 'an', 'in', 'blog', 'article', 'read', 'learn', 'want', 'to', 'know', 'case', 'study', 'what', 'why', 'how', 'is', 'are', 'was', 'were', 'can', 'could', 'would', 'should']
-        
-        # Extract meaningful keywords
-        words = user_lower.split()
-        keywords = [w for w in words if w not in stop_words and len(w) > 2]
-        
-        print(f"\n🔍 CONTENT MATCHING - Extracted keywords: {keywords}")
+        keywords = extract_search_keywords(user_message)
+        index = article_index_refresher.index if article_index_refresher.ready else None
+        plan = None
+        if index is not None and KEYWORD_PLANNER_CONFIG['enabled']:
+            # Most discriminating keywords first, using the index's document frequencies
+            with tracing.span('keyword_planner.plan', keywords=len(keywords)) as plan_span:
+                plan = keyword_planner.plan_search(keywords, index.document_frequency, len(index))
+                for key, value in keyword_planner.span_attributes(plan).items():
+                    plan_span.set(key, value)
+            candidate_topics = plan['candidates']
+        else:
+            # No document frequencies without the index: PostgreSQL gets every candidate in one batch
+            candidate_topics = build_search_candidates(keywords)
         
-        # Try searching with most important keywords first
         blog_posts = []
-        search_topic = None
-        
-        if keywords:
-            # Try individual keywords starting with the most important ones
-            for keyword in keywords[:3]:  # Try first 3 keywords
-                search_topic = keyword
-                print(f"   Searching database with keyword: '{search_topic}'")
-                blog_posts = await find_blog_content(topic=search_topic, max_results=5, keywords=keywords)
-                if blog_posts:
-                    print(f"   ✅ Found {len(blog_posts)} posts with keyword: '{search_topic}'")
-                    break
-            
-            # If no results with individual keywords, try combined search
-            if not blog_posts and len(keywords) > 1:
-                search_topic = ' '.join(keywords[:2])
-                print(f"   Trying combined search: '{search_topic}'")
-                blog_posts = await find_blog_content(topic=search_topic, max_results=5, keywords=keywords)
-                
-            # If still no results, try with all keywords combined
-            if not blog_posts and len(keywords) > 2:
-                search_topic = ' '.join(keywords)
-                print(f"   Trying full search: '{search_topic}'")
-                blog_posts = await find_blog_content(topic=search_topic, max_results=5, keywords=keywords)
-        
-        if blog_posts:
-            print(f"   ✅ CONTENT MATCH SUCCESS: Found {len(blog_posts)} relevant posts")
-        else:
-            print(f"   ❌ No matching content found in database")
+        search_topic = candidate_topics[-1] if candidate_topics else None
+        if candidate_topics and index is not None:
+            # Answer from the in-memory BM25 index - no database round trip
+            with tracing.span('article_index.search', candidates=len(candidate_topics)) as search_span:
+                matched_topic, blog_posts = index.search_first(
+                    candidate_topics, max_results=5, min_score_ratio=ARTICLE_INDEX_CONFIG['min_score_ratio']
+                )
+                search_span.set('matched_topic', matched_topic or '')
+            if blog_posts:
+                search_topic = matched_topic
+        elif candidate_topics:
+            # Index disabled or not loaded yet - evaluate all candidates in one database round trip,
+            # skipping topics with a word that occurs nowhere in published content. Word-level keys
+            # can't vouch for LIKE substring matches, so the filter only applies to full-text search.
+            if vocabulary_filter_active and fulltext_search_available:
+                candidate_topics = vocabulary_filter.searchable(candidate_topics)
+            matched_topic, blog_posts = await find_blog_content_batch(candidate_topics, max_results=5, keywords=keywords)
+            if blog_posts:
+                search_topic = matched_topic
+        
+        content_log.debug("Content matching", extra={
+            'keywords': keywords, 'candidates': candidate_topics, 'topic': search_topic, 'posts': len(blog_posts),
+            'pruned': plan['pruned'] if plan else {}
+        })
         
         return {
             "matched": len(blog_posts) > 0,
@@ -602,9 +1003,7 @@ async def match_content_in_database(user_message: str) -> dict:
         }
         
     except Exception as e:
-        print(f"Error in match_content_in_database: {e}")
-        import traceback
-        traceback.print_exc()
+        content_log.exception("Error in match_content_in_database")
         return {
             "matched": False,
             "posts": [],
@@ -612,73 +1011,56 @@ async def match_content_in_database(user_message: str) -> dict:
         }
 
 
+@tracing.traced()
 async def match_user_query_to_database(user_message: str) -> dict:
     """Match user query to available expeditions in database
     Returns: {'matched': bool, 'park_name': str or None, 'packages': list}
     """
     if mongo_db is None:
-        print("ERROR: MongoDB connection is None")
+        packages_log.error("MongoDB connection is None")
         return {'matched': False, 'park_name': None, 'packages': []}
     
     try:
         # Get ALL available expedition packages from database
-        print(f"\n🔍 MATCHING user query to database...")
-        print(f"   User message: {user_message}")
         all_packages = await find_expedition_packages(location=None)
-        print(f"   Retrieved {len(all_packages)} total packages from database")
         
         if not all_packages:
-            print("⚠️  WARNING: No packages found in database")
-            print("   Returning NO MATCH result")
+            packages_log.warning("No expedition packages found - returning no match")
             return {'matched': False, 'park_name': None, 'packages': [], 'available_parks': []}
         
         # Extract park names from packages for display
         available_parks = await extract_park_names_from_packages(all_packages)
-        print(f"Available parks: {available_parks}")
         
-        # Simple string matching - check if user message contains any park-related keywords
+        # Term matching - check if user message contains any park-related keywords
         user_lower = user_message.lower()
         matched_packages = []
         matched_park_name = None
         
-        # Extract key terms from user query (remove common words)
-        stop_words = ['national', 'park', 'expedition', 'safari', 'tell', 'me', 'about', 'the', 'a', 'an', 'in']
-        user_words = [word for word in user_lower.split() if word not in stop_words and len(word) > 2]
-        
-        print(f"Extracted keywords from user query: {user_words}")
+        # Extract key terms from user query (common words are dropped by the term index once
+        # normalized, see PACKAGE_CATALOG_CONFIG['query_stop_words'])
+        user_words = [word for word in user_lower.split() if len(word) > 2]
         
-        # Search through all packages
-        for pkg in all_packages:
-            title = (pkg.get('title') or '').lower()
-            heading = (pkg.get('heading') or '').lower()
-            slug = (pkg.get('slug') or '').lower()
-            region = (pkg.get('region') or '').lower()
-            
-            # Combine all searchable fields
-            pkg_text = f"{title} {heading} {slug} {region}"
-            
-            # Check if ANY user keyword matches ANY package field
-            for user_word in user_words:
-                if user_word in pkg_text:
-                    matched_packages.append(pkg)
-                    if not matched_park_name:
-                        matched_park_name = pkg.get('heading') or pkg.get('title')
-                    print(f"  ✓ Matched '{user_word}' in package: {pkg.get('title')}")
-                    break  # Don't add same package twice
+        # Look up query words in the catalog's term index, keeping only expedition packages
+        expedition_ids = {pkg.get('_id') for pkg in all_packages}
+        for pkg, hits in await package_catalog.search(user_words):
+            if pkg.get('_id') not in expedition_ids:
+                continue
+            matched_packages.append(pkg)
+            if not matched_park_name:
+                matched_park_name = pkg.get('heading') or pkg.get('title')
         
-        print(f"String matching found {len(matched_packages)} packages for query: '{user_message}'")
+        packages_log.debug("Package term matching", extra={
+            'keywords': user_words, 'packages': len(all_packages), 'matched': len(matched_packages), 'park': matched_park_name
+        })
         
         if matched_packages:
             return {'matched': True, 'park_name': matched_park_name, 'packages': matched_packages}
         
         # No direct match - return all available parks for user to choose
-        print("No direct match - returning all available parks")
         return {'matched': False, 'park_name': None, 'packages': all_packages, 'available_parks': available_parks}
             
     except Exception as e:
-        print(f"ERROR in match_user_query_to_database: {e}")
-        import traceback
-        traceback.print_exc()
+        packages_log.exception("Error in match_user_query_to_database")
         return {'matched': False, 'park_name': None, 'packages': []}
 
 
@@ -705,6 +1087,15 @@ def construct_post_url(package):
     
     return f"{JUNGLORE_SITE_BASE_URL}/explore/{slug}"
 
+
+def package_url(package):
+    """Landing page URL for a package, precomputed for catalog entries"""
+    return package.get('post_url') or construct_post_url(package)
+
+
+# In-process cache of the MongoDB packages collection
+package_catalog = PackageCatalog(mongo_db.packages if mongo_db is not None else None, construct_post_url)
+
 # New endpoint for detailed package information
 @app.get("/packages/{package_id}/details")
 async def get_package_details(package_id: str, db: AsyncSession = Depends(get_db)):
@@ -720,7 +1111,7 @@ async def get_package_details(package_id: str, db: AsyncSession = Depends(get_db
         package_dict = package.to_dict()
         
         # Generate detailed AI description
-        detailed_description = await generate_package_description(package_dict, "detailed")
+        detailed_description = await get_package_description(package_dict, "detailed")
         
         # Prepare response with all package details
         response_data = {
@@ -741,92 +1132,153 @@ async def get_package_details(package_id: str, db: AsyncSession = Depends(get_db
         return response_data
         
     except Exception as e:
-        print(f"Error getting package details: {e}")
+        packages_log.exception("Error getting package details")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@tracing.traced()
 def detect_travel_intent(user_message):
     """Detect travel intent, expedition intent, blog intent, AI info queries, gate prediction queries, and any mentioned locations from the user message.
 
+    All keyword lists are matched in a single pass by the compiled automaton in intent_matcher.py.
+
     Returns a dict: { 'travel_intent': bool, 'expedition_intent': bool, 'blog_intent': bool, 'ai_intent': bool, 'gate_prediction_intent': bool, 'locations': [str] }
     """
     try:
-        message_lower = user_message.lower()
-        travel = any(keyword in message_lower for keyword in TRAVEL_KEYWORDS)
-        wildlife_interest = any(keyword in message_lower for keyword in WILDLIFE_KEYWORDS)
-        expedition = any(keyword in message_lower for keyword in EXPEDITION_KEYWORDS) or ('expedition' in message_lower)
-        blog_intent = any(keyword in message_lower for keyword in BLOG_KEYWORDS)
-        ai_intent = any(keyword in message_lower for keyword in AI_INFO_KEYWORDS)
-        gate_prediction_intent = any(keyword in message_lower for keyword in GATE_PREDICTION_KEYWORDS)
-        # Detect any known location keywords mentioned (case-insensitive)
-        locations = [kw for kw in LOCATION_KEYWORDS if kw.lower() in message_lower]
+        hits = intent_matcher.match(user_message)
+        metrics.count_intents(hits)
         return {
-            'travel_intent': travel or wildlife_interest,
-            'expedition_intent': expedition,
-            'blog_intent': blog_intent,
-            'ai_intent': ai_intent,
-            'gate_prediction_intent': gate_prediction_intent,
-            'locations': locations
+            'travel_intent': bool(hits['travel'] or hits['wildlife']),
+            'expedition_intent': bool(hits['expedition']),
+            'blog_intent': bool(hits['blog']),
+            'ai_intent': bool(hits['ai_info']),
+            'gate_prediction_intent': bool(hits['gate_prediction']),
+            'locations': hits['location']
         }
     except Exception as e:
-        print(f"Error in intent detection: {e}")
+        log.warning("Error in intent detection", extra={'error': str(e)})
         return {'travel_intent': False, 'expedition_intent': False, 'blog_intent': False, 'ai_intent': False, 'gate_prediction_intent': False, 'locations': []} 
 
-async def update_session_history(session_id: str, new_history: list, db_session: AsyncSession):
-    """Helper function to update session history in both PostgreSQL and Redis"""
-    # Update PostgreSQL
-    result = await db_session.execute(
-        select(DBSession).filter(DBSession.session_id == session_id)
-    )
-    session = result.scalar_one_or_none()
-    if session:
-        session.history = new_history
+@tracing.traced()
+async def update_session_history(session_id: str, new_messages: list, new_history: list):
+    """Append new messages to the Redis history window and the PostgreSQL transcript.
+
+    With write-behind enabled the turn is journaled in Redis in the same atomic
+    step and the background flusher writes it to PostgreSQL; otherwise, or if
+    Redis is unavailable, it is inserted before returning.
+    """
+    if history_writer.enabled:
+        try:
+            _, journal_length = await history_store.append(
+                session_id, new_messages, new_history,
+                journal_key=WRITE_BEHIND_CONFIG['journal_key'],
+                journal_entry=journal_entry(session_id, new_messages)
+            )
+        except Exception as e:
+            log.warning("Error journaling turn - writing it to PostgreSQL directly", extra={'session_id': session_id, 'error': str(e)})
+        else:
+            await history_writer.accepted(journal_length)
+            return
+
+    # Append-only: one INSERT per message, no read or rewrite of the session row
+    async with metrics.track('postgres', 'history_write'), request_sessions.session() as db_session:
+        db_session.add_all([
+            ChatbotMessage(session_id=session_id, sender=m["sender"], text=m["text"])
+            for m in new_messages
+        ])
         await db_session.commit()
     
-    # Update Redis cache
-    redis_key = f"session_history:{session_id}"
-    await redis_client.set(redis_key, json.dumps(new_history), ex=REDIS_CONFIG['session_history_expiry'])
+    if not history_writer.enabled:
+        # Update Redis cache (atomic append + trim + TTL refresh)
+        await history_store.append(session_id, new_messages, new_history)
  
 
-@app.post("/sessions/{session_id}/message")
-async def send_message(session_id: str, req: SendMessageRequest, db: AsyncSession = Depends(get_db)):
-    redis_key = f"session_history:{session_id}"
-    # Try to get history from Redis
-    history_json = await redis_client.get(redis_key)
-    if history_json:
-        history = json.loads(history_json)
-    else:
-        # Fallback to PostgreSQL if not in Redis
+@tracing.traced()
+async def build_package_suggestion(user_message, locations=None):
+    """Find the best matching package and build its suggestion card (None if nothing matches)"""
+    package = await find_relevant_package(user_message, locations)
+    if not package:
+        return None
+    # Short AI description for the card
+    short_description = await get_package_description(package, "short")
+    return {
+        "title": package.get("title", ""),
+        "image": package.get("image", ""),
+        "description": short_description,
+        "package_id": str(package.get("_id", ""))
+    }
+
+
+async def await_optional_stage(task, deadline: float, stage: str):
+    """Wait for an optional pipeline stage until the shared deadline; drop it (None) if it is late or fails"""
+    remaining = max(deadline - time.monotonic(), LATENCY_BUDGET_CONFIG['min_optional_wait'])
+    try:
+        return await asyncio.wait_for(task, timeout=remaining)
+    except asyncio.TimeoutError:
+        log.info("Dropped optional stage: exceeded latency budget", extra={'stage': stage})
+    except Exception as e:
+        log.warning("Error in optional stage", extra={'stage': stage, 'error': str(e)})
+    return None
+
+
+@tracing.traced()
+async def load_session_history(session_id: str, user_id: str) -> list:
+    """Recent history for a session from Redis, falling back to PostgreSQL (404 if the session doesn't exist)"""
+    # Try the local cache, then Redis
+    history = await history_store.read(session_id)
+    if history is not None:
+        return history
+    # Fallback to PostgreSQL if not in Redis
+    window = REDIS_CONFIG['history_window']
+    async with request_sessions.session() as db:
         result = await db.execute(
-            select(DBSession).filter(
+            select(DBSession.session_id, DBSession.history).filter(
                 DBSession.session_id == session_id,
-                DBSession.user_id == req.user_id
+                DBSession.user_id == user_id
             )
         )
-        session = result.scalar_one_or_none()
+        session = result.one_or_none()
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
-        history = (session.history or [])[-10:]
-        # Cache in Redis for future
-        await redis_client.set(redis_key, json.dumps(history), ex=REDIS_CONFIG['session_history_expiry'])
-    
-    # Detect travel and expedition intents
-    intent_info = detect_travel_intent(req.message)
-    travel_intent = intent_info.get('travel_intent', False)
+        messages = await fetch_recent_messages(session_id, db, window)
+        legacy = []
+        if len(messages) < window:
+            # Turns from before chatbot_messages (sessions not backfilled) are only in the JSON history
+            first_message = messages[0] if messages else await fetch_first_message(session_id, db)
+            legacy = [{"sender": m.get("sender"), "text": m.get("text")} for m in legacy_messages(session.history, first_message)]
+    history = legacy[max(0, len(legacy) - (window - len(messages))):] + [{"sender": m.sender, "text": m.text} for m in messages]
+    # Cache in Redis for future
+    await history_store.seed(session_id, history)
+    return history
+
+
+async def save_turn(session_id: str, history: list, user_text: str, bot_text: str):
+    """Append a user message and the bot reply to the session history"""
+    # Save user and bot messages
+    new_messages = [
+        {"sender": "user", "text": user_text},
+        {"sender": "bot", "text": bot_text}
+    ]
+    new_history = (history + new_messages)[-REDIS_CONFIG['history_window']:]
+    # Update database and cache
+    await update_session_history(session_id, new_messages, new_history)
+
+
+@tracing.traced()
+async def answer_from_database(user_message: str, intent_info: dict) -> Optional[dict]:
+    """Build a reply from database content for gate, expedition, content and AI-info queries.
+
+    Returns the response payload ({'reply': ..., plus optional card fields}),
+    or None when the message should be answered by the LLM.
+    """
+    started = time.perf_counter()
     expedition_intent = intent_info.get('expedition_intent', False)
-    blog_intent = intent_info.get('blog_intent', False)
     gate_prediction_intent = intent_info.get('gate_prediction_intent', False)
     detected_locations = intent_info.get('locations', [])
 
     # Handle AI Gate Prediction queries
     if gate_prediction_intent:
-        print(f"Gate prediction intent detected in message: {req.message}")
-        
-        # Extract park name if mentioned in message
-        park_mentioned = None
-        for location in LOCATION_KEYWORDS:
-            if location.lower() in req.message.lower():
-                park_mentioned = location.title()
-                break
+        # Extract park name if mentioned in message (already found by intent detection)
+        park_mentioned = detected_locations[0].title() if detected_locations else None
         
         # Build response
         bot_reply = "🎯 **Junglore's AI-Powered Gate Prediction**\n\n"
@@ -845,27 +1297,20 @@ async def send_message(session_id: str, req: SendMessageRequest, db: AsyncSessio
             match_result = await match_user_query_to_database(park_mentioned)
             if match_result['matched'] and match_result['packages']:
                 pkg = match_result['packages'][0]  # Get first package
-                url = construct_post_url(pkg)
+                url = package_url(pkg)
                 bot_reply += f"🌿 {url}\n\n"
         else:
             bot_reply += "💡 *Tip: Visit the link above and select your destination park and travel dates to get personalized gate recommendations!*\n\n"
         
         bot_reply += "Trust Junglore's AI to maximize your chances of incredible wildlife encounters! 🐅🌿"
         
-        # Save user and bot messages
-        new_history = (history + [
-            {"sender": "user", "text": req.message},
-            {"sender": "bot", "text": bot_reply}
-        ])[-10:]
-        # Update database and cache
-        await update_session_history(session_id, new_history, db)
-        
+        metrics.observe_branch('gate', started)
         return {"reply": bot_reply}
 
     # Handle explicit expedition queries using dynamic AI-powered database matching
     if expedition_intent:
         # Use AI to match user query to database
-        match_result = await match_user_query_to_database(req.message)
+        match_result = await match_user_query_to_database(user_message)
         
         if match_result['matched'] and match_result['packages']:
             # Specific park found with packages
@@ -873,7 +1318,7 @@ async def send_message(session_id: str, req: SendMessageRequest, db: AsyncSessio
             packages = match_result['packages']
             
             # Extract month/timing if mentioned in query
-            message_lower = req.message.lower()
+            message_lower = user_message.lower()
             months = ['january', 'february', 'march', 'april', 'may', 'june', 
                      'july', 'august', 'september', 'october', 'november', 'december',
                      'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
@@ -894,7 +1339,7 @@ async def send_message(session_id: str, req: SendMessageRequest, db: AsyncSessio
             title = top_package.get('title') or top_package.get('heading', '')
             duration = top_package.get('duration', '')
             description = top_package.get('description', '')
-            url = construct_post_url(top_package)
+            url = package_url(top_package)
             image = top_package.get('image', '')
             
             bot_reply += f"**{title}**\n"
@@ -912,7 +1357,7 @@ async def send_message(session_id: str, req: SendMessageRequest, db: AsyncSessio
                 bot_reply += f"\n**Other {park_name} expeditions:**\n"
                 for pkg in packages[1:3]:  # Show 2 more
                     pkg_title = pkg.get('title') or pkg.get('heading', '')
-                    pkg_url = construct_post_url(pkg)
+                    pkg_url = package_url(pkg)
                     bot_reply += f"• {pkg_title}: {pkg_url}\n"
             
             bot_reply += "\n💡 *Each expedition includes expert guides, comfortable accommodations, and curated wildlife experiences!*"
@@ -949,25 +1394,15 @@ async def send_message(session_id: str, req: SendMessageRequest, db: AsyncSessio
             bot_reply = "We're currently setting up our expedition packages. Please check back soon!"
             response_data = {"reply": bot_reply}
         
-        # Save user and bot messages
-        new_history = (history + [
-            {"sender": "user", "text": req.message},
-            {"sender": "bot", "text": bot_reply}
-        ])[-10:]
-        # Update database and cache
-        await update_session_history(session_id, new_history, db)
-        
+        metrics.observe_branch('expedition', started)
         return response_data
     
     # ALWAYS check database for relevant content FIRST (unless it's already handled above)
-    print(f"\n📊 CHECKING DATABASE for relevant content...")
-    content_result = await match_content_in_database(req.message)
+    content_result = await match_content_in_database(user_message)
     
     if content_result['matched'] and content_result['posts']:
         # Found relevant content in database - recommend it FIRST
         posts = content_result['posts']
-        print(f"✅ Found {len(posts)} relevant posts - recommending database content")
-        
         # Build recommendation with URLs
         bot_reply = "I found some great resources on this topic:\n\n"
         
@@ -1008,78 +1443,173 @@ async def send_message(session_id: str, req: SendMessageRequest, db: AsyncSessio
                 "image": posts[0]['image']
             }
         
-        # Save user and bot messages
-        new_history = (history + [
-            {"sender": "user", "text": req.message},
-            {"sender": "bot", "text": bot_reply}
-        ])[-10:]
-        # Update database and cache
-        await update_session_history(session_id, new_history, db)
-        
+        metrics.observe_branch('content', started)
         return response_data
-    else:
-        print(f"❌ No content found in database - proceeding with AI response")
     
     # Handle AI prediction queries - hardcoded URL (never let GPT generate)
     if intent_info.get('ai_intent', False):
-        print(f"AI prediction intent detected in message: {req.message}")
-        
         bot_reply = (
             f"For information on sighting probabilities and AI-based predictions, visit: {AI_PREDICTION_URL}\n\n"
             f"This page provides detailed insights into wildlife sighting predictions powered by AI technology."
         )
         
-        # Save user and bot messages
-        new_history = (history + [
-            {"sender": "user", "text": req.message},
-            {"sender": "bot", "text": bot_reply}
-        ])[-10:]
-        # Update database and cache
-        await update_session_history(session_id, new_history, db)
-        
+        metrics.observe_branch('ai_intent', started)
         return {"reply": bot_reply}
 
-    # If not handled as expedition flow, proceed to call OpenAI as before
+    return None
+
+
+def build_chat_messages(history: list, user_message: str) -> list:
+    """OpenAI chat messages: system prompt, conversation history, then the new message"""
     # Add system prompt at the beginning
     messages = [{"role": "system", "content": SYSTEM_PROMPT}]
     # Add conversation history
     messages.extend([{"role": "user" if m["sender"] == "user" else "assistant", "content": m["text"]} for m in history])
-    messages.append({"role": "user", "content": req.message})
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+@app.post("/sessions/{session_id}/message", dependencies=[Depends(get_db)])
+async def send_message(session_id: str, req: SendMessageRequest):
+    history = await load_session_history(session_id, req.user_id)
     
-    # Call OpenAI GPT-4o-mini
-    try:
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages
-        )
-        bot_reply = response.choices[0].message.content
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"OpenAI error: {e}")
+    # Detect travel and expedition intents
+    intent_info = detect_travel_intent(req.message)
+    travel_intent = intent_info.get('travel_intent', False)
+    detected_locations = intent_info.get('locations', [])
     
-    # If travel intent detected, try to find relevant package
-    package_suggestion = None
+    # Gate prediction, expedition, database content and AI-info replies
+    started = time.perf_counter()
+    response_data = await answer_from_database(req.message, intent_info)
+    if response_data is not None:
+        await save_turn(session_id, history, req.message, response_data["reply"])
+        return response_data
+    
+    # If not handled from the database, proceed to call OpenAI
+    messages = build_chat_messages(history, req.message)
+    
+    # Reply generation and the (independent) package suggestion run concurrently
+    # under one latency budget; the suggestion is optional and dropped if late
+    deadline = time.monotonic() + LATENCY_BUDGET_CONFIG['response_budget']
+    suggestion_task = None
     if travel_intent:
-        package_suggestion = await find_relevant_package(req.message, db)
+        suggestion_task = asyncio.create_task(build_package_suggestion(req.message, detected_locations))
     
-    # Save user and bot messages
-    new_history = (history + [
-        {"sender": "user", "text": req.message},
-        {"sender": "bot", "text": bot_reply}
-    ])[-10:]
-    # Update database and cache
-    await update_session_history(session_id, new_history, db)
+    # Reuse an answer to the same (or a paraphrased) question, else call OpenAI GPT-4o-mini
+    bot_reply = await answer_cache.get(req.message, history)
+    branch = 'answer_cache' if bot_reply is not None else 'llm'
+    if bot_reply is None:
+        try:
+            async with metrics.track('openai', 'chat'):
+                response = await client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=messages
+                )
+            metrics.count_llm_usage('chat', response.usage)
+            bot_reply = response.choices[0].message.content
+        except Exception as e:
+            if suggestion_task:
+                suggestion_task.cancel()
+            raise HTTPException(status_code=500, detail=f"OpenAI error: {e}")
+        await answer_cache.put(req.message, history, bot_reply)
+    
+    # If travel intent detected, wait for the package suggestion within the remaining budget
+    package_suggestion = None
+    if suggestion_task:
+        package_suggestion = await await_optional_stage(suggestion_task, deadline, "package suggestion")
+    metrics.observe_branch(branch, started)
+    
+    await save_turn(session_id, history, req.message, bot_reply)
     
     # Return response with optional package suggestion
     response_data = {"reply": bot_reply}
     if package_suggestion:
-        # Generate short AI description for the card
-        short_description = await generate_package_description(package_suggestion, "short")
-        
-        response_data["package_suggestion"] = {
-            "title": package_suggestion.get("title", ""),
-            "image": package_suggestion.get("image", ""),
-            "description": short_description,
-            "package_id": str(package_suggestion.get("_id", ""))
-        }
+        response_data["package_suggestion"] = package_suggestion
+    
+    return response_data
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/sessions/{session_id}/message/stream", dependencies=[Depends(get_db)])
+async def stream_message(session_id: str, req: SendMessageRequest):
+    """Streaming variant of send_message using Server-Sent Events.
+
+    Events: 'start' (sent immediately), 'token' (LLM reply fragments as they
+    arrive), 'reply' (the complete reply text), one event per card field
+    ('banner_image', 'expedition_package', 'featured_image', 'featured_article',
+    'package_suggestion'), 'error', and finally 'done' once history is saved.
+    """
+    history = await load_session_history(session_id, req.user_id)
+    intent_info = detect_travel_intent(req.message)
     
-    return response_data 
\ No newline at end of file
+    async def events():
+        suggestion_task = None
+        try:
+            yield sse_event("start", {"session_id": session_id})
+            
+            # Database-sourced replies go out whole, followed by their card fields
+            started = time.perf_counter()
+            response_data = await answer_from_database(req.message, intent_info)
+            if response_data is None:
+                response_data = {}
+                deadline = time.monotonic() + LATENCY_BUDGET_CONFIG['response_budget']
+                if intent_info.get('travel_intent', False):
+                    suggestion_task = asyncio.create_task(
+                        build_package_suggestion(req.message, intent_info.get('locations', []))
+                    )
+                
+                # A cached answer goes out as a single token; otherwise relay OpenAI tokens as they arrive
+                cached_reply = await answer_cache.get(req.message, history)
+                if cached_reply is not None:
+                    yield sse_event("token", {"text": cached_reply})
+                    response_data["reply"] = cached_reply
+                else:
+                    parts = []
+                    try:
+                        async with metrics.track('openai', 'chat_stream'):
+                            stream = await client.chat.completions.create(
+                                model=CHAT_MODEL,
+                                messages=build_chat_messages(history, req.message),
+                                stream=True,
+                                stream_options={"include_usage": True}  # Final chunk carries token usage
+                            )
+                            async for chunk in stream:
+                                delta = chunk.choices[0].delta.content if chunk.choices else None
+                                if delta:
+                                    parts.append(delta)
+                                    yield sse_event("token", {"text": delta})
+                                metrics.count_llm_usage('chat_stream', getattr(chunk, 'usage', None))
+                    except Exception as e:
+                        yield sse_event("error", {"detail": f"OpenAI error: {e}"})
+                        return
+                    response_data["reply"] = "".join(parts)
+                    await answer_cache.put(req.message, history, response_data["reply"])
+                
+                if suggestion_task:
+                    package_suggestion = await await_optional_stage(suggestion_task, deadline, "package suggestion")
+                    if package_suggestion:
+                        response_data["package_suggestion"] = package_suggestion
+                metrics.observe_branch('answer_cache' if cached_reply is not None else 'llm', started)
+            
+            yield sse_event("reply", {"text": response_data["reply"]})
+            for field, value in response_data.items():
+                if field != "reply":
+                    yield sse_event(field, value)
+            
+            # Persist history after the stream completes (falls back to a private session if the request's is closed)
+            await save_turn(session_id, history, req.message, response_data["reply"])
+            yield sse_event("done", {})
+        finally:
+            # Runs on client disconnect too (the generator is closed mid-stream)
+            if suggestion_task is not None and not suggestion_task.done():
+                suggestion_task.cancel()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,126 @@
+"""
+Prometheus metrics for the chat pipeline.
+
+Latency histograms per reply branch (gate, expedition, content, ai_intent,
+llm) and per backing call (Redis, PostgreSQL, MongoDB catalog, OpenAI), plus
+counters for intent hits, cache lookups and LLM tokens. Served at /metrics.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to a shared,
+empty directory before starting them; every worker writes its samples there
+and /metrics aggregates all of them. prometheus_client is optional - without
+it (or with METRICS_CONFIG['enabled'] off) every helper here is a no-op.
+"""
+
+import os
+import time
+import tracing
+from config import METRICS_CONFIG
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+    )
+    METRICS_AVAILABLE = METRICS_CONFIG['enabled']
+except ImportError:
+    METRICS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+if METRICS_AVAILABLE:
+    BRANCH_LATENCY = Histogram(
+        'chatbot_branch_latency_seconds', 'Time to build a reply, by the branch that answered',
+        ['branch'], buckets=METRICS_CONFIG['branch_buckets']
+    )
+    BACKEND_LATENCY = Histogram(
+        'chatbot_backend_latency_seconds', 'Latency of calls to backing services',
+        ['backend', 'operation'], buckets=METRICS_CONFIG['backend_buckets']
+    )
+    BACKEND_ERRORS = Counter(
+        'chatbot_backend_errors_total', 'Failed calls to backing services', ['backend', 'operation']
+    )
+    INTENT_HITS = Counter('chatbot_intent_hits_total', 'Messages matching each intent category', ['intent'])
+    CACHE_LOOKUPS = Counter('chatbot_cache_lookups_total', 'Cache lookups by cache and result', ['cache', 'result'])
+    LLM_TOKENS = Counter('chatbot_llm_tokens_total', 'OpenAI tokens used', ['call', 'kind'])
+
+
+def observe_branch(branch: str, started: float):
+    """Record a reply built by `branch`, timed from `started` (time.perf_counter())"""
+    if METRICS_AVAILABLE:
+        BRANCH_LATENCY.labels(branch).observe(time.perf_counter() - started)
+
+
+class _Track:
+    """Times one backend call (and traces it as a span); usable with `with` or `async with`"""
+
+    __slots__ = ('backend', 'operation', 'started', 'span')
+
+    def __init__(self, backend: str, operation: str):
+        self.backend = backend
+        self.operation = operation
+        self.span = tracing.span(f"{backend}.{operation}")
+
+    def __enter__(self):
+        self.span.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        BACKEND_LATENCY.labels(self.backend, self.operation).observe(time.perf_counter() - self.started)
+        if exc_type is not None:
+            BACKEND_ERRORS.labels(self.backend, self.operation).inc()
+        return self.span.__exit__(exc_type, exc, tb)
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+def track(backend: str, operation: str):
+    """Context manager timing one call to a backing service (failures are counted too).
+
+    The call is also recorded as a '<backend>.<operation>' span of the current trace.
+    """
+    if not METRICS_AVAILABLE:
+        return tracing.span(f"{backend}.{operation}")
+    return _Track(backend, operation)
+
+
+def count_intents(hits: dict):
+    """Count the intent categories a message matched (intent_matcher.match output)"""
+    if METRICS_AVAILABLE:
+        for intent, keywords in hits.items():
+            if keywords:
+                INTENT_HITS.labels(intent).inc()
+
+
+def count_cache(cache: str, result: str):
+    if METRICS_AVAILABLE:
+        CACHE_LOOKUPS.labels(cache, result).inc()
+
+
+def count_llm_usage(call: str, usage):
+    """Count prompt/completion tokens from an OpenAI response's `usage` (None is ignored)"""
+    if METRICS_AVAILABLE and usage is not None:
+        LLM_TOKENS.labels(call, 'prompt').inc(usage.prompt_tokens or 0)
+        LLM_TOKENS.labels(call, 'completion').inc(usage.completion_tokens or 0)
+
+
+def render():
+    """(body, content type) for the /metrics endpoint"""
+    if not METRICS_AVAILABLE:
+        return b"# metrics disabled (install prometheus_client and enable METRICS_CONFIG)\n", CONTENT_TYPE_LATEST
+    if MULTIPROCESS:
+        # Aggregate the samples every worker wrote to PROMETHEUS_MULTIPROC_DIR
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_worker_stopped():
+    """Drop this worker's live gauge files on shutdown (multiprocess mode only)"""
+    if METRICS_AVAILABLE and MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
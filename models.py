@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Float, DateTime, Text, JSON, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -30,10 +30,25 @@ class ChatbotSession(Base):
     user_id = Column(PGUUID(as_uuid=False), ForeignKey("users.id"), nullable=False)
     title = Column(String, default="New Chat")
     created_at = Column(DateTime, default=datetime.utcnow)
-    history = Column(JSON, default=list)  # Store chat history as JSON
+    history = Column(JSON, default=list)  # Legacy JSON history; messages now live in chatbot_messages
     
     # Relationship to user
     user = relationship("User", back_populates="chatbot_sessions")
+    messages = relationship("ChatbotMessage", back_populates="session", cascade="all, delete-orphan")
+
+class ChatbotMessage(Base):
+    """Append-only chat transcript; a session's messages are read newest-first by (session_id, seq)"""
+    __tablename__ = "chatbot_messages"
+    __table_args__ = (Index("ix_chatbot_messages_session_seq", "session_id", "seq"),)
+    
+    seq = Column(BigInteger, primary_key=True, autoincrement=True)  # Monotonic across all sessions
+    uid = Column(String, unique=True, index=True)  # Set by the write-behind journal; makes replays idempotent
+    session_id = Column(String, ForeignKey("chatbot_sessions.session_id"), nullable=False)
+    sender = Column(String, nullable=False)  # 'user' or 'bot'
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    session = relationship("ChatbotSession", back_populates="messages")
 
 class Package(Base):
     """Package model for storing expedition/safari packages"""
@@ -75,4 +90,14 @@ class Package(Base):
             "status": self.status,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None
-        } 
\ No newline at end of file
+        } 
+class PackageDescription(Base):
+    """AI-generated package description, regenerated only when the package content hash changes"""
+    __tablename__ = "chatbot_package_descriptions"
+    
+    package_id = Column(String, primary_key=True)
+    description_type = Column(String, primary_key=True)  # 'short' or 'detailed'
+    content_hash = Column(String, nullable=False)
+    description = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
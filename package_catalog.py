@@ -0,0 +1,203 @@
+"""
+In-process cache of the MongoDB `packages` collection (Junglore.com expeditions).
+
+The whole collection is loaded once and served from memory. Entries carry
+precomputed park names and landing page URLs, and a token/prefix index over
+package terms answers query matching without scanning every package. The
+cache expires after a TTL and is invalidated early by a MongoDB change
+stream, or by polling a cheap collection fingerprint when change streams
+are unavailable (standalone servers). Only the first read waits for MongoDB:
+afterwards a stale catalog keeps being served while a background task
+reloads it.
+"""
+
+import asyncio
+import time
+from collections import Counter
+
+import metrics
+from app_logging import get_logger
+from config import PACKAGE_CATALOG_CONFIG
+from utils import tokenize
+
+log = get_logger('packages')
+
+# Package fields indexed for query matching
+INDEXED_FIELDS = ('title', 'heading', 'slug', 'region')
+
+
+def park_names_for_package(package: dict) -> list:
+    """Park/location names mentioned in a package's descriptive fields"""
+    names = []
+    for field in ['region', 'heading', 'title', 'location']:
+        value = package.get(field, '')
+        if value and isinstance(value, str):
+            # Clean up the name
+            cleaned = value.replace('National Park', '').replace('Expedition', '').strip()
+            if cleaned and cleaned not in names:
+                names.append(cleaned)
+    return names
+
+
+class PackageTermIndex:
+    """Token and prefix index from normalized package/park terms to package positions.
+
+    Query words match an indexed token exactly, or as a prefix when they are at
+    least `min_prefix_length` long ('corbet' -> 'corbett'). Short words never
+    match inside other words, so 'tad' does not hit 'tadoba'. Generic words
+    ('expeditions', 'safari') are dropped after normalization, so they don't
+    match every package named after them.
+    """
+
+    def __init__(self, packages: list, min_prefix_length: int, stop_words=()):
+        self.packages = packages
+        self.min_prefix_length = min_prefix_length
+        self.stop_terms = frozenset(term for word in stop_words for term in tokenize(word))
+        self.tokens = {}    # token -> {package position}
+        self.prefixes = {}  # prefix -> {package position}
+        for position, package in enumerate(packages):
+            values = [package.get(field) for field in INDEXED_FIELDS]
+            values.extend(package.get('park_names') or [])
+            for token in {t for value in values for t in tokenize(value)}:
+                self.tokens.setdefault(token, set()).add(position)
+                for end in range(min_prefix_length, len(token) + 1):
+                    self.prefixes.setdefault(token[:end], set()).add(position)
+
+    def lookup(self, word: str) -> set:
+        """Positions of packages containing the word (exact, or as a long-enough prefix)"""
+        matches = set()
+        for term in tokenize(word):
+            if term in self.stop_terms:
+                continue
+            index = self.prefixes if len(term) >= self.min_prefix_length else self.tokens
+            matches |= index.get(term, set())
+        return matches
+
+    def search(self, words: list) -> list:
+        """Packages matching any query word as (package, hit count), most hits first, then catalog order"""
+        hits = Counter()
+        for word in dict.fromkeys(words):
+            hits.update(self.lookup(word))
+        ranked = sorted(hits.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.packages[position], count) for position, count in ranked]
+
+
+class PackageCatalog:
+    """TTL cache of all packages with change-stream or polling invalidation"""
+
+    def __init__(self, collection, url_builder, config: dict = PACKAGE_CATALOG_CONFIG):
+        self.collection = collection
+        self.url_builder = url_builder
+        self.config = config
+        self.packages = []
+        self.term_index = PackageTermIndex([], config['min_prefix_length'], config['query_stop_words'])
+        self.loaded_at = None
+        self.has_loaded = False
+        self.fingerprint = None
+        self._lock = asyncio.Lock()
+        self._reload_task = None
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.config['ttl']
+
+    def invalidate(self):
+        """Mark the catalog stale so the next read triggers a reload"""
+        self.loaded_at = None
+
+    async def get_packages(self) -> list:
+        """All cached packages; waits for MongoDB only before the first load, else serves stale ones while reloading"""
+        if self.is_fresh:
+            metrics.count_cache('package_catalog', 'hit')
+            return self.packages
+        if not self.has_loaded:
+            async with self._lock:
+                # Another request may have loaded while we waited for the lock
+                if not self.has_loaded:
+                    metrics.count_cache('package_catalog', 'reload')
+                    await self.load()
+            return self.packages
+        metrics.count_cache('package_catalog', 'stale')
+        self.reload_in_background()
+        return self.packages
+
+    def reload_in_background(self):
+        """Start a reload unless one is already running"""
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self.reload())
+
+    async def reload(self):
+        """Reload now, keeping the current packages if MongoDB fails"""
+        async with self._lock:
+            try:
+                metrics.count_cache('package_catalog', 'reload')
+                await self.load()
+            except Exception as e:
+                log.warning("Error reloading package catalog", extra={'error': str(e)})
+
+    async def search(self, words: list) -> list:
+        """Rank cached packages by how many query words they match"""
+        await self.get_packages()
+        return self.term_index.search(words)
+
+    async def load(self):
+        """Read the whole collection and precompute per-entry park names and URLs"""
+        if self.collection is None:
+            return
+        with metrics.track('mongo', 'catalog_load'):
+            documents = await self.collection.find({}).to_list(length=self.config['max_packages'])
+        for package in documents:
+            package['park_names'] = park_names_for_package(package)
+            package['post_url'] = self.url_builder(package)
+        self.packages = documents
+        self.term_index = PackageTermIndex(documents, self.config['min_prefix_length'], self.config['query_stop_words'])
+        self.fingerprint = await self._fingerprint()
+        self.loaded_at = time.monotonic()
+        self.has_loaded = True
+        log.info("📦 Package catalog loaded", extra={'packages': len(documents)})
+
+    async def _fingerprint(self):
+        """Cheap summary of the collection that changes whenever packages are added, removed or edited"""
+        fields = self.config['updated_fields']
+        group = {"_id": None, "count": {"$sum": 1}}
+        group.update({f"latest_{i}": {"$max": f"${field}"} for i, field in enumerate(fields)})
+        result = await self.collection.aggregate([{"$group": group}]).to_list(length=1)
+        if not result:
+            return (0,) + (None,) * len(fields)
+        return (result[0].get('count'),) + tuple(result[0].get(f"latest_{i}") for i in range(len(fields)))
+
+    async def _watch_change_stream(self):
+        """Invalidate on every change event (requires a replica set or sharded cluster)"""
+        async with self.collection.watch(full_document=None) as stream:
+            log.info("📦 Package catalog watching change stream")
+            async for _change in stream:
+                self.invalidate()
+
+    async def _poll(self):
+        """Invalidate when the collection fingerprint changes"""
+        log.info("📦 Package catalog polling for changes")
+        while True:
+            await asyncio.sleep(self.config['poll_interval'])
+            try:
+                if await self._fingerprint() != self.fingerprint:
+                    self.invalidate()
+                    await self.reload()
+            except Exception as e:
+                log.warning("Error polling package catalog", extra={'error': str(e)})
+
+    async def run(self):
+        """Background task: initial load, then change-stream or polling invalidation"""
+        if self.collection is None:
+            return
+        try:
+            await self.get_packages()
+        except Exception as e:
+            log.exception("Error loading package catalog")
+        if self.config['use_change_stream']:
+            try:
+                await self._watch_change_stream()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.info("Change stream unavailable - falling back to polling", extra={'error': str(e)})
+        await self._poll()
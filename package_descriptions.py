@@ -0,0 +1,259 @@
+"""
+Persistent store for AI-generated package descriptions.
+
+Descriptions are keyed by package id, description type and a hash of the
+package content, so each package is described once and only regenerated
+when its content changes. Lookups go through an in-process dict, then Redis,
+then PostgreSQL (chatbot_package_descriptions). The batch helpers here are
+used by scripts/pregenerate_package_descriptions.py to describe several
+packages per LLM call.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+import metrics
+from app_logging import get_logger
+from config import DESCRIPTION_STORE_CONFIG
+from models import PackageDescription
+
+log = get_logger('packages')
+
+# Package fields that feed the description prompt (and therefore the content hash)
+DESCRIBED_FIELDS = ('title', 'description', 'heading', 'region', 'duration', 'type', 'price', 'currency', 'features')
+
+# Values scripts/migrate_mongodb_to_postgres.py stores for fields missing in MongoDB
+MIGRATED_DEFAULTS = {'price': 0, 'currency': 'INR', 'features': {}}
+
+DESCRIPTION_SYSTEM_PROMPT = "You are a wildlife safari expert. Create compelling descriptions that make people excited about the safari experience."
+
+
+def package_id_of(package: dict) -> str:
+    return str(package.get('_id') or package.get('id') or '')
+
+
+def canonical_value(value):
+    """JSON-stable form of a field, so MongoDB and PostgreSQL copies of a package hash alike"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        # 4500 (MongoDB int) and 4500.0 (PostgreSQL Float) are the same price
+        number = float(value)
+        return int(number) if number.is_integer() else number
+    if isinstance(value, dict):
+        return {str(key): canonical_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical_value(item) for item in value]
+    return str(value).strip()
+
+
+def package_content_hash(package: dict) -> str:
+    """Stable hash of the fields a description is generated from"""
+    content = {}
+    for field in DESCRIBED_FIELDS:
+        value = package.get(field)
+        if value is None or value == '':
+            value = MIGRATED_DEFAULTS.get(field, '')
+        content[field] = canonical_value(value)
+    encoded = json.dumps(content, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def package_info_text(package: dict) -> str:
+    return f"""
+        Title: {package.get('title', '')}
+        Description: {package.get('description', '')}
+        Location: {package.get('heading', '')} - {package.get('region', '')}
+        Duration: {package.get('duration', '')}
+        Type: {package.get('type', '')}
+        Price: {package.get('price', '')} {package.get('currency', '')}
+        Features: {package.get('features', {})}
+        """
+
+
+def fallback_description(package: dict, description_type: str = "short") -> str:
+    """Description built from the package's own text, used until an AI description exists"""
+    description = package.get('description') or ''
+    if description_type == "short" and len(description) > 100:
+        return description[:100] + "..."
+    return description
+
+
+class DescriptionStore:
+    """Three-tier (process, Redis, PostgreSQL) description lookup"""
+
+    def __init__(self, session_factory, redis_client, config: dict = DESCRIPTION_STORE_CONFIG):
+        self.session_factory = session_factory
+        self.redis = redis_client
+        self.config = config
+        self.local = {}  # (package_id, type) -> (content_hash, description)
+
+    def _redis_key(self, package_id: str, description_type: str, content_hash: str) -> str:
+        return f"{self.config['key_prefix']}{package_id}:{description_type}:{content_hash}"
+
+    async def get(self, package: dict, description_type: str):
+        """Stored description for the package's current content, or None"""
+        package_id = package_id_of(package)
+        content_hash = package_content_hash(package)
+        local = self.local.get((package_id, description_type))
+        if local and local[0] == content_hash:
+            metrics.count_cache('package_description', 'local')
+            return local[1]
+
+        try:
+            with metrics.track('redis', 'description_get'):
+                description = await self.redis.get(self._redis_key(package_id, description_type, content_hash))
+        except Exception as e:
+            log.warning("Error reading description from Redis", extra={'error': str(e)})
+            description = None
+
+        if description is None:
+            with metrics.track('postgres', 'description_get'):
+                async with self.session_factory() as session:
+                    result = await session.execute(select(PackageDescription).filter(
+                        PackageDescription.package_id == package_id,
+                        PackageDescription.description_type == description_type,
+                        PackageDescription.content_hash == content_hash
+                    ))
+                    row = result.scalar_one_or_none()
+            if row is None:
+                metrics.count_cache('package_description', 'miss')
+                return None
+            metrics.count_cache('package_description', 'postgres')
+            description = row.description
+            await self._cache_in_redis(package_id, description_type, content_hash, description)
+        else:
+            metrics.count_cache('package_description', 'redis')
+
+        self.local[(package_id, description_type)] = (content_hash, description)
+        return description
+
+    async def missing(self, packages: list, description_type: str) -> list:
+        """Packages without a stored description for their current content.
+
+        A package in both MongoDB and PostgreSQL (same migrated id) is checked
+        once: both copies share the stored row.
+        """
+        wanted = {}
+        for package in packages:
+            package_id, content_hash = package_id_of(package), package_content_hash(package)
+            if package_id not in wanted:
+                wanted[package_id] = (package, content_hash)
+            elif wanted[package_id][1] != content_hash:
+                log.warning("Package content differs between sources", extra={'package_id': package_id})
+        async with self.session_factory() as session:
+            result = await session.execute(select(
+                PackageDescription.package_id, PackageDescription.content_hash
+            ).filter(
+                PackageDescription.description_type == description_type,
+                PackageDescription.package_id.in_(list(wanted))
+            ))
+            stored = dict(result.all())
+        return [package for package_id, (package, content_hash) in wanted.items() if stored.get(package_id) != content_hash]
+
+    async def put_many(self, entries: list, description_type: str):
+        """Persist [(package, description)] for one description type"""
+        if not entries:
+            return
+        rows = [{
+            'package_id': package_id_of(package),
+            'description_type': description_type,
+            'content_hash': package_content_hash(package),
+            'description': description
+        } for package, description in entries]
+        async with self.session_factory() as session:
+            statement = insert(PackageDescription).values(rows)
+            statement = statement.on_conflict_do_update(
+                index_elements=['package_id', 'description_type'],
+                set_={
+                    'content_hash': statement.excluded.content_hash,
+                    'description': statement.excluded.description,
+                    'updated_at': datetime.utcnow()
+                }
+            )
+            await session.execute(statement)
+            await session.commit()
+        for row in rows:
+            self.local[(row['package_id'], description_type)] = (row['content_hash'], row['description'])
+            await self._cache_in_redis(row['package_id'], description_type, row['content_hash'], row['description'])
+
+    async def _cache_in_redis(self, package_id, description_type, content_hash, description):
+        try:
+            with metrics.track('redis', 'description_set'):
+                await self.redis.set(
+                    self._redis_key(package_id, description_type, content_hash),
+                    description,
+                    ex=self.config['redis_ttl']
+                )
+        except Exception as e:
+            log.warning("Error caching description in Redis", extra={'error': str(e)})
+
+
+def build_batch_prompt(packages: list, description_type: str) -> str:
+    """Prompt asking for one description per package, returned as a JSON object keyed by package number"""
+    if description_type == "short":
+        instructions = ("For each package write a compelling 1-2 line description. "
+                        "Keep each under 100 characters. Focus on the main wildlife and experience.")
+    else:
+        instructions = ("For each package write a detailed, engaging description of 3-4 paragraphs covering "
+                        "what wildlife they'll see, the experience highlights, location details, "
+                        "what makes the package special and what's included.")
+    listing = "\n".join(f"Package {i}:{package_info_text(p)}" for i, p in enumerate(packages, 1))
+    return f"""
+    {instructions}
+
+    {listing}
+
+    Respond with a JSON object mapping each package number (as a string) to its description,
+    e.g. {{"1": "...", "2": "..."}}.
+    """
+
+
+async def generate_descriptions_batch(client, packages: list, description_type: str) -> list:
+    """Describe several packages with a single LLM call; returns [(package, description)]"""
+    per_package_tokens = 60 if description_type == "short" else 500
+    with metrics.track('openai', 'description_batch'):
+        response = await client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": DESCRIPTION_SYSTEM_PROMPT},
+                {"role": "user", "content": build_batch_prompt(packages, description_type)}
+            ],
+            max_tokens=per_package_tokens * len(packages) + 50,
+            temperature=0.7,
+            response_format={"type": "json_object"}
+        )
+    metrics.count_llm_usage('description_batch', response.usage)
+    generated = json.loads(response.choices[0].message.content)
+    entries = []
+    for i, package in enumerate(packages, 1):
+        description = generated.get(str(i))
+        if isinstance(description, str) and description.strip():
+            entries.append((package, description.strip()))
+    return entries
+
+
+async def pregenerate_descriptions(client, store: DescriptionStore, packages: list, description_types: list = None) -> int:
+    """Generate and store descriptions for packages whose content changed; returns the number generated"""
+    generated = 0
+    batch_size = store.config['batch_size']
+    for description_type in description_types or store.config['description_types']:
+        stale = await store.missing(packages, description_type)
+        log.info("Packages needing descriptions", extra={
+            'stale': len(stale), 'packages': len(packages), 'description_type': description_type
+        })
+        for start in range(0, len(stale), batch_size):
+            batch = stale[start:start + batch_size]
+            try:
+                entries = await generate_descriptions_batch(client, batch, description_type)
+            except Exception as e:
+                log.warning("Error generating description batch", extra={'error': str(e)})
+                continue
+            await store.put_many(entries, description_type)
+            generated += len(entries)
+    return generated
@@ -0,0 +1,124 @@
+"""
+Local candidate retrieval for package suggestions.
+
+Scores every package against the user's message with the rules in
+SCORING_CONFIG (wildlife, location, duration, type, budget, exclusions) so
+only the top few candidates need to be shown to the LLM - or none at all
+when one package clearly wins.
+"""
+
+import re
+
+from config import (
+    WILDLIFE_KEYWORDS, LOCATION_KEYWORDS, SCORING_CONFIG, BUDGET_THRESHOLDS, PACKAGE_TYPES
+)
+
+LOW_BUDGET_KEYWORDS = ['budget', 'cheap', 'affordable', 'economical', 'low cost']
+HIGH_BUDGET_KEYWORDS = ['expensive', 'luxury', 'premium', 'high end']
+SHORT_TRIP_KEYWORDS = ['short', 'overnight', 'weekend']
+LONG_TRIP_KEYWORDS = ['long', 'week']
+
+# "not in corbett", "except kanha", "avoid tadoba", "other than gir"
+EXCLUSION_PATTERN = re.compile(r"\b(?:not in|not to|except|avoid|excluding|other than|apart from)\s+(?:the\s+)?((?:[a-z]+\s?){1,3})")
+DAYS_PATTERN = re.compile(r"(\d+)\s*(?:day|night)")
+
+
+def _contains(text: str, keyword: str) -> bool:
+    return re.search(rf"\b{re.escape(keyword)}", text) is not None
+
+
+def distinct_locations(locations) -> list:
+    """Locations minus those containing another one ('jim corbett' when 'corbett' is there), so each place counts once"""
+    locations = list(dict.fromkeys(loc.lower() for loc in locations))
+    return [loc for loc in locations if not any(other != loc and _contains(loc, other) for other in locations)]
+
+
+def parse_preferences(user_message: str, locations: list = None) -> dict:
+    """Extract the preferences the scoring rules look for from a user message"""
+    message = user_message.lower()
+    excluded = set()
+    for match in EXCLUSION_PATTERN.finditer(message):
+        excluded.update(loc.lower() for loc in LOCATION_KEYWORDS if _contains(match.group(1), loc.lower()))
+    if locations is None:
+        locations = [loc for loc in LOCATION_KEYWORDS if _contains(message, loc.lower())]
+    return {
+        'wildlife': [w for w in WILDLIFE_KEYWORDS if _contains(message, w)],
+        'locations': distinct_locations(loc for loc in locations if loc.lower() not in excluded),
+        'excluded_locations': sorted(distinct_locations(excluded)),
+        'days': {int(d) for d in DAYS_PATTERN.findall(message)},
+        'short_trip': any(_contains(message, k) for k in SHORT_TRIP_KEYWORDS),
+        'long_trip': any(_contains(message, k) for k in LONG_TRIP_KEYWORDS),
+        'types': [t for t, words in PACKAGE_TYPES.items() if any(_contains(message, w) for w in words)],
+        'low_budget': any(_contains(message, k) for k in LOW_BUDGET_KEYWORDS),
+        'high_budget': any(_contains(message, k) for k in HIGH_BUDGET_KEYWORDS),
+    }
+
+
+def score_package(package: dict, preferences: dict) -> int:
+    """Score one package against parsed preferences using SCORING_CONFIG"""
+    title = (package.get('title') or '').lower()
+    content = f"{title} {(package.get('heading') or '').lower()} {(package.get('description') or '').lower()}"
+    region = (package.get('region') or '').lower()
+    package_text = f"{content} {region} {(package.get('type') or '').lower()}"
+    score = 0
+
+    wildlife_hits = [w for w in preferences['wildlife'] if w in content]
+    score += SCORING_CONFIG['wildlife_match_in_content'] * len(wildlife_hits)
+    if preferences['wildlife'] and any(w in package_text for w in WILDLIFE_KEYWORDS):
+        score += SCORING_CONFIG['wildlife_general_interest']
+
+    for location in preferences['locations']:
+        if location in content:
+            score += SCORING_CONFIG['location_exact_match']
+        elif location in region:
+            score += SCORING_CONFIG['location_region_match']
+    for location in preferences['excluded_locations']:
+        if location in package_text:
+            score += SCORING_CONFIG['excluded_location_penalty']
+
+    package_days = {int(d) for d in DAYS_PATTERN.findall((package.get('duration') or '').lower())}
+    if package_days and (
+        preferences['days'] & package_days
+        or (preferences['short_trip'] and min(package_days) <= 2)
+        or (preferences['long_trip'] and max(package_days) >= 5)
+    ):
+        score += SCORING_CONFIG['duration_match']
+
+    for package_type in preferences['types']:
+        if any(w in package_text for w in PACKAGE_TYPES[package_type]):
+            score += SCORING_CONFIG['type_match']
+
+    try:
+        price = float(package.get('price'))
+    except (TypeError, ValueError):
+        price = None
+    if price is not None and (
+        (preferences['low_budget'] and price <= BUDGET_THRESHOLDS['low'])
+        or (preferences['high_budget'] and price >= BUDGET_THRESHOLDS['high'])
+    ):
+        score += SCORING_CONFIG['budget_match']
+
+    return score
+
+
+def rank_package_candidates(user_message: str, packages: list, locations: list = None, top_k: int = 5) -> list:
+    """Return up to top_k (all if None) (package, score) pairs, best first (ties keep catalog order).
+
+    Packages with a negative score (e.g. in an excluded location) are never candidates.
+    """
+    preferences = parse_preferences(user_message, locations)
+    scored = [(score_package(package, preferences), i) for i, package in enumerate(packages)]
+    scored = [item for item in scored if item[0] >= 0]
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [(packages[i], score) for score, i in scored[:top_k]]
+
+
+def clear_winner(candidates: list, margin: int):
+    """The top candidate if it reaches the minimum score and leads the runner-up by `margin`"""
+    if not candidates:
+        return None
+    top_package, top_score = candidates[0]
+    if top_score < SCORING_CONFIG['minimum_score_threshold']:
+        return None
+    runner_up = candidates[1][1] if len(candidates) > 1 else float('-inf')
+    return top_package if top_score - runner_up >= margin else None
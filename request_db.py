@@ -0,0 +1,125 @@
+"""
+Request-scoped PostgreSQL session shared by every helper in a request.
+
+The session is created lazily on first use, so requests answered from
+Redis and the in-memory indexes never check out a pooled connection.
+Helpers take turns on the one session (concurrent pipeline stages are
+serialized by a lock), and the connection goes back to the pool after each
+use instead of being held for the rest of the request (e.g. across an LLM
+call). Outside a request, or once the request's scope has closed (streamed
+responses, background tasks), helpers get a short-lived session of their own.
+
+Pool checkouts are counted per request so connection pressure is visible.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+_current_scope = ContextVar('request_db_scope', default=None)
+
+
+class RequestScope:
+    """One request's lazily created session and checkout count"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.session = None
+        self.lock = asyncio.Lock()
+        self.checkouts = 0
+        self.closed = False
+
+    def get_session(self):
+        # Creating an AsyncSession doesn't connect; the pool is hit on the first statement
+        if self.session is None:
+            self.session = self.session_factory()
+        return self.session
+
+    async def close(self):
+        async with self.lock:
+            self.closed = True
+            if self.session is not None:
+                await self.session.close()
+
+
+class RequestSessions:
+    """Hands out the current request's shared session and tracks pool usage"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.stats = {
+            'requests': 0,
+            'requests_without_checkout': 0,
+            'checkouts': 0,
+            'checkouts_outside_requests': 0,
+            'max_checkouts_per_request': 0
+        }
+
+    def instrument(self, engine):
+        """Count connection pool checkouts against the request that caused them"""
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self.stats['checkouts'] += 1
+            scope = _current_scope.get()
+            if scope is None:
+                self.stats['checkouts_outside_requests'] += 1
+            else:
+                scope.checkouts += 1
+        event.listen(engine.sync_engine, 'checkout', on_checkout)
+
+    @asynccontextmanager
+    async def scope(self):
+        """Open a request scope (the get_db dependency); yields the shared session"""
+        scope = RequestScope(self.session_factory)
+        token = _current_scope.set(scope)
+        try:
+            yield scope.get_session()
+        finally:
+            await scope.close()
+            self.stats['requests'] += 1
+            if scope.checkouts == 0:
+                self.stats['requests_without_checkout'] += 1
+            self.stats['max_checkouts_per_request'] = max(self.stats['max_checkouts_per_request'], scope.checkouts)
+            try:
+                _current_scope.reset(token)
+            except ValueError:
+                # Teardown ran in a different context than setup
+                pass
+
+    @asynccontextmanager
+    async def session(self):
+        """The request's shared session, or a private one outside a live request.
+
+        Uncommitted ORM changes are left for the caller to commit; otherwise the
+        transaction is ended on exit so the connection returns to the pool.
+        """
+        scope = _current_scope.get()
+        if scope is not None and not scope.closed:
+            async with scope.lock:
+                if not scope.closed:
+                    session = scope.get_session()
+                    try:
+                        yield session
+                    except BaseException:
+                        await session.rollback()
+                        raise
+                    if session.in_transaction() and not (session.new or session.dirty or session.deleted):
+                        await session.rollback()
+                    return
+        async with self.session_factory() as session:
+            yield session
+
+    def __call__(self):
+        """Session factory interface (`async with request_sessions() as session`)"""
+        return self.session()
+
+    def report(self, pool) -> dict:
+        requests = self.stats['requests'] or 1
+        return {
+            **self.stats,
+            'avg_checkouts_per_request': round(
+                (self.stats['checkouts'] - self.stats['checkouts_outside_requests']) / requests, 2
+            ),
+            'pool': pool.status()
+        }
@@ -0,0 +1,56 @@
+"""
+Write-behind migration for the chatbot_messages table
+Adds the uid column and its unique index so journal replays after a crash
+don't insert the same message twice. Safe to run more than once.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import models
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from models import Base
+
+load_dotenv()
+
+ADD_UID_COLUMN = """
+    ALTER TABLE chatbot_messages ADD COLUMN IF NOT EXISTS uid VARCHAR
+"""
+
+CREATE_UID_INDEX = """
+    CREATE UNIQUE INDEX IF NOT EXISTS ix_chatbot_messages_uid
+    ON chatbot_messages (uid)
+"""
+
+async def add_chatbot_message_uid():
+    """Add the uid column and unique index to chatbot_messages"""
+    DATABASE_URL = os.getenv("DATABASE_URL")
+
+    # Handle Heroku-style DATABASE_URL
+    if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
+        DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
+    elif DATABASE_URL and DATABASE_URL.startswith("postgresql://"):
+        DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    print(f"Connecting to database...")
+    engine = create_async_engine(DATABASE_URL, echo=True)
+
+    async with engine.begin() as conn:
+        print("Creating chatbot_messages table if needed...")
+        await conn.run_sync(Base.metadata.create_all)
+        print("Adding uid column...")
+        await conn.execute(text(ADD_UID_COLUMN))
+        print("Creating unique index on uid...")
+        await conn.execute(text(CREATE_UID_INDEX))
+
+    await engine.dispose()
+    print("Write-behind migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(add_chatbot_message_uid())
@@ -0,0 +1,75 @@
+"""
+Full-text search migration for the content table
+Adds a weighted tsvector column (title=A, excerpt=B, body=C) kept up to date by
+PostgreSQL itself, backfills it for existing rows and builds a GIN index on it.
+Safe to run more than once.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from config import CONTENT_SEARCH_CONFIG
+
+load_dotenv()
+
+TS_CONFIG = CONTENT_SEARCH_CONFIG['text_search_config']
+
+# A STORED generated column is maintained on every INSERT/UPDATE and is
+# computed for all existing rows when the column is added (the backfill).
+ADD_SEARCH_VECTOR = f"""
+    ALTER TABLE content ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(excerpt, '')), 'B') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(content, '')), 'C')
+    ) STORED
+"""
+
+CREATE_GIN_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_content_search_vector
+    ON content USING GIN (search_vector)
+"""
+
+CREATE_STATUS_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_content_status_published_at
+    ON content (status, published_at DESC)
+"""
+
+async def add_content_search_index():
+    """Add the search_vector column and its indexes to the content table"""
+    DATABASE_URL = os.getenv("DATABASE_URL")
+
+    # Handle Heroku-style DATABASE_URL
+    if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
+        DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
+    elif DATABASE_URL and DATABASE_URL.startswith("postgresql://"):
+        DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    print(f"Connecting to database...")
+    engine = create_async_engine(DATABASE_URL, echo=True)
+
+    async with engine.begin() as conn:
+        print("Adding search_vector column (backfills existing rows)...")
+        await conn.execute(text(ADD_SEARCH_VECTOR))
+        print("Creating GIN index on search_vector...")
+        await conn.execute(text(CREATE_GIN_INDEX))
+        print("Creating status/published_at index...")
+        await conn.execute(text(CREATE_STATUS_INDEX))
+        await conn.execute(text("ANALYZE content"))
+
+        result = await conn.execute(text("SELECT COUNT(*) FROM content WHERE search_vector IS NOT NULL"))
+        print(f"Indexed {result.scalar()} content rows")
+
+    await engine.dispose()
+    print("Full-text search migration complete!")
+
+if __name__ == "__main__":
+    asyncio.run(add_content_search_index())
@@ -0,0 +1,65 @@
+"""
+Backfill chatbot_messages from the legacy ChatbotSession.history JSON column
+Creates the chatbot_messages table if needed, then copies each session's JSON
+history into it, skipping sessions that already have messages. Safe to run more than once.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import models
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import select, exists
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from models import Base, ChatbotSession, ChatbotMessage
+
+load_dotenv()
+
+async def backfill_messages():
+    """Copy legacy JSON histories into chatbot_messages"""
+    DATABASE_URL = os.getenv("DATABASE_URL")
+    
+    # Handle Heroku-style DATABASE_URL
+    if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
+        DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
+    elif DATABASE_URL and DATABASE_URL.startswith("postgresql://"):
+        DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+    
+    print(f"Connecting to database...")
+    engine = create_async_engine(DATABASE_URL, echo=False)
+    AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    
+    async with engine.begin() as conn:
+        print("Creating chatbot_messages table...")
+        await conn.run_sync(Base.metadata.create_all)
+    
+    async with AsyncSessionLocal() as db:
+        has_messages = exists().where(ChatbotMessage.session_id == ChatbotSession.session_id)
+        result = await db.execute(
+            select(ChatbotSession.session_id, ChatbotSession.history, ChatbotSession.created_at)
+            .filter(~has_messages)
+        )
+        sessions = result.all()
+        
+        copied = 0
+        for session_id, history, created_at in sessions:
+            for message in history or []:
+                db.add(ChatbotMessage(
+                    session_id=session_id,
+                    sender=message.get("sender", "user"),
+                    text=message.get("text", ""),
+                    created_at=created_at
+                ))
+                copied += 1
+        await db.commit()
+    
+    await engine.dispose()
+    print(f"Backfilled {copied} messages from {len(sessions)} sessions")
+
+if __name__ == "__main__":
+    asyncio.run(backfill_messages())
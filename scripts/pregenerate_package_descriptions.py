@@ -0,0 +1,76 @@
+"""
+Batch job that pre-generates AI package descriptions
+Describes every active package (MongoDB packages collection and the PostgreSQL
+chatbot_packages table) several packages per LLM call, skipping packages whose
+stored description already matches their current content.
+Run after catalog changes, e.g. nightly: python scripts/pregenerate_package_descriptions.py
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import models
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import redis.asyncio as redis
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from models import Base, Package
+from package_descriptions import DescriptionStore, pregenerate_descriptions
+
+load_dotenv()
+
+async def load_packages(AsyncSessionLocal):
+    """Active packages from MongoDB (if configured) and PostgreSQL"""
+    packages = []
+    
+    MONGODB_URI = os.getenv("MONGODB_URI")
+    if MONGODB_URI:
+        import motor.motor_asyncio
+        mongo_client = motor.motor_asyncio.AsyncIOMotorClient(MONGODB_URI)
+        mongo_packages = await mongo_client["jungloreprod"].packages.find({"status": True}).to_list(length=None)
+        print(f"Loaded {len(mongo_packages)} packages from MongoDB")
+        packages.extend(mongo_packages)
+        mongo_client.close()
+    
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Package).filter(Package.status == True))
+        pg_packages = [p.to_dict() for p in result.scalars().all()]
+    print(f"Loaded {len(pg_packages)} packages from PostgreSQL")
+    packages.extend(pg_packages)
+    return packages
+
+async def main():
+    DATABASE_URL = os.getenv("DATABASE_URL")
+    
+    # Handle Heroku-style DATABASE_URL
+    if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
+        DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
+    elif DATABASE_URL and DATABASE_URL.startswith("postgresql://"):
+        DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+    
+    engine = create_async_engine(DATABASE_URL, echo=False)
+    AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    redis_client = redis.from_url(os.getenv("REDIS_URL"), decode_responses=True)
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=httpx.AsyncClient())
+    
+    # Make sure the description table exists
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    packages = await load_packages(AsyncSessionLocal)
+    store = DescriptionStore(AsyncSessionLocal, redis_client)
+    generated = await pregenerate_descriptions(client, store, packages)
+    print(f"Generated {generated} descriptions")
+    
+    await redis_client.aclose()
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+"""
+Requeue chat turns from the write-behind dead-letter list
+Turns land there when PostgreSQL rejects them as invalid (e.g. their session
+was deleted). Once the cause is fixed, this moves them back onto the journal
+and the running app's flusher writes them; message uids keep replays idempotent.
+
+Usage:
+    python scripts/replay_dead_letters.py [--list]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import history_writer and config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import redis.asyncio as redis
+from dotenv import load_dotenv
+
+from config import WRITE_BEHIND_CONFIG
+from history_writer import HistoryWriteBehind
+
+load_dotenv()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Requeue dead-lettered chat turns")
+    parser.add_argument('--list', action='store_true', help="Only show the dead-lettered turns")
+    args = parser.parse_args()
+
+    redis_client = redis.from_url(os.getenv("REDIS_URL"), decode_responses=True)
+    try:
+        if args.list:
+            for entry in await redis_client.lrange(WRITE_BEHIND_CONFIG['dead_letter_key'], 0, -1):
+                turn = json.loads(entry)
+                print(f"{turn['session_id']}: {len(turn['messages'])} messages, {turn['messages'][0]['created_at']}")
+            return
+        moved = await HistoryWriteBehind(redis_client, None).replay_dead_letters()
+        print(f"✅ Requeued {moved} turns onto {WRITE_BEHIND_CONFIG['journal_key']}")
+    finally:
+        await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Local stand-in for an OTLP/HTTP trace collector
+Accepts the JSON export requests the bot sends when TRACING_EXPORTER=otlp,
+prints each trace as an indented span tree and optionally appends the raw
+spans to a JSONL file.
+
+Usage:
+    python scripts/trace_collector.py [--port 4318] [--out collected_traces.jsonl]
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _attributes(raw: list) -> dict:
+    values = {}
+    for attribute in raw:
+        value = attribute['value']
+        values[attribute['key']] = next(iter(value.values())) if value else None
+    return values
+
+
+def collect_spans(payload: dict) -> dict:
+    """Spans of an OTLP export request, grouped by trace id"""
+    traces = defaultdict(list)
+    for resource_spans in payload.get('resourceSpans', []):
+        for scope_spans in resource_spans.get('scopeSpans', []):
+            for span in scope_spans.get('spans', []):
+                traces[span['traceId']].append(span)
+    return traces
+
+
+def render_tree(spans: list) -> list:
+    """Lines of an indented span tree, children in start order"""
+    children = defaultdict(list)
+    for span in spans:
+        children[span.get('parentSpanId') or None].append(span)
+    for siblings in children.values():
+        siblings.sort(key=lambda s: int(s['startTimeUnixNano']))
+
+    lines = []
+
+    def walk(span, depth):
+        duration_ms = (int(span['endTimeUnixNano']) - int(span['startTimeUnixNano'])) / 1_000_000
+        error = span.get('status', {}).get('message')
+        attributes = _attributes(span.get('attributes', []))
+        detail = " ".join(f"{k}={v}" for k, v in attributes.items())
+        lines.append(f"{'  ' * depth}{span['name']} {duration_ms:.1f}ms {detail}{' ❌ ' + error if error else ''}".rstrip())
+        for child in children.get(span['spanId'], []):
+            walk(child, depth + 1)
+
+    for root in children.get(None, []):
+        walk(root, 0)
+    return lines
+
+
+def make_handler(out_path):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != '/v1/traces':
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            try:
+                payload = json.loads(body)
+            except json.JSONDecodeError:
+                self.send_response(400)
+                self.end_headers()
+                return
+
+            for trace_id, spans in collect_spans(payload).items():
+                print(f"🧵 trace {trace_id} ({len(spans)} spans)")
+                for line in render_tree(spans):
+                    print(f"   {line}")
+                if out_path:
+                    with open(out_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps({'trace_id': trace_id, 'spans': spans}) + "\n")
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print traces exported by the bot over OTLP/HTTP JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4318)
+    parser.add_argument('--out', help="Also append received traces to this JSONL file")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.out))
+    print(f"📡 Trace collector listening on http://{args.host}:{args.port}/v1/traces")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Collector stopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
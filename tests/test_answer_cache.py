@@ -0,0 +1,171 @@
+import asyncio
+import fnmatch
+
+from answer_cache import AnswerCache, hamming, normalize_question, question_hash, simhash
+from config import ANSWER_CACHE_CONFIG
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(members)
+
+    async def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    async def expire(self, key, seconds):
+        return key in self.data
+
+    async def scan_iter(self, match=None, count=None):
+        for key in list(self.data):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+    async def srem(self, key, *members):
+        bucket = self.data.get(key, set())
+        removed = len(bucket & set(members))
+        bucket.difference_update(members)
+        if not bucket:
+            self.data.pop(key, None)
+        return removed
+
+    async def unlink(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+
+def make_cache(**overrides):
+    return AnswerCache(FakeRedis(), "gpt-4o-mini\nprompt", {**ANSWER_CACHE_CONFIG, 'enabled': True, **overrides})
+
+
+def test_normalized_question_ignores_case_order_stopwords_and_plurals():
+    stop_words = {'what', 'the', 'of', 'is'}
+    assert normalize_question("What is the diet of Tigers?", stop_words) == ['diet', 'tiger']
+    assert normalize_question("tiger DIET", stop_words) == ['diet', 'tiger']
+
+
+def test_similar_token_sets_have_close_simhashes():
+    base = ['tiger', 'diet', 'ranthambore', 'winter', 'hunting', 'prey', 'deer']
+    assert hamming(simhash(base), simhash(base + ['sambar'])) < hamming(simhash(base), simhash(['monsoon', 'birds']))
+
+
+def test_exact_and_reworded_questions_hit():
+    cache = make_cache()
+
+    async def run():
+        await cache.put("What do tigers eat in Ranthambore?", [], "Mostly deer.")
+        exact = await cache.get("tigers eat Ranthambore", [])
+        reworded = await cache.get("Tell me: what does a tiger eat in ranthambore", [])
+        return exact, reworded
+
+    assert asyncio.run(run()) == ("Mostly deer.", "Mostly deer.")
+    assert cache.stats['exact_hits'] == 2
+
+
+def test_paraphrase_found_through_lsh_buckets():
+    # Accept any candidate sharing a band so the check doesn't depend on hash values
+    cache = make_cache(max_hamming_distance=64)
+    question = "best season for leopard sightings in jawai hills rajasthan"
+
+    async def run():
+        await cache.put(question, [], "October to March.")
+        return await cache.get("hi, ideal time to spot leopards in jawai hills rajasthan? thanks", [])
+
+    assert asyncio.run(run()) == "October to March."
+    assert cache.stats['near_hits'] == 1
+
+
+def test_different_question_or_context_misses():
+    cache = make_cache()
+
+    async def run():
+        await cache.put("What do tigers eat in Ranthambore?", [], "Mostly deer.")
+        other_question = await cache.get("Where do elephants sleep in Kaziranga?", [])
+        other_history = await cache.get("What do tigers eat in Ranthambore?", [{'sender': 'user', 'text': 'hello'}])
+        return other_question, other_history
+
+    assert asyncio.run(run()) == (None, None)
+
+
+def test_entity_swapped_questions_miss():
+    # Accept any candidate sharing a band: only the term check may reject these
+    cache = make_cache(max_hamming_distance=64)
+    pairs = [
+        ("best time to see tigers in ranthambore national park", "best time to see tigers in corbett national park"),
+        ("how much does a safari in kanha national park cost per person",
+         "how much does a safari in pench national park cost per person"),
+        ("best time to see leopards in jawai", "best time to see tigers in jawai"),
+    ]
+
+    async def run():
+        for cached, asked in pairs:
+            await cache.put(cached, [], "Cached answer.")
+        return [await cache.get(asked, []) for _cached, asked in pairs]
+
+    assert asyncio.run(run()) == [None, None, None]
+    assert cache.stats['near_hits'] == 0
+
+
+def test_turns_naming_a_person_are_not_cached():
+    cache = make_cache()
+
+    async def run():
+        await cache.put("Hi I am Priya, what is the best time to visit Kanha?", [], "October to June.")
+        await cache.put("What is the best time to visit Kanha?", [], "Hello Priya! October to June.")
+        await cache.put("What do tigers eat?", [{'sender': 'user', 'text': "My name is Rahul"}], "Deer.")
+        return await cache.get("Hi I am Rahul, what is the best time to visit Kanha?", [])
+
+    assert asyncio.run(run()) is None
+    assert cache.stats['stores'] == 0 and cache.redis.data == {}
+
+
+def test_long_histories_are_not_cached():
+    cache = make_cache(max_history_messages=2)
+    history = [{'sender': 'user', 'text': f"message {i}"} for i in range(3)]
+
+    async def run():
+        await cache.put("What do tigers eat?", history, "Deer.")
+        return await cache.get("What do tigers eat?", history)
+
+    assert asyncio.run(run()) is None
+    assert cache.stats['skipped'] == 1 and cache.stats['stores'] == 0
+
+
+def test_purge_removes_one_question_or_everything():
+    cache = make_cache()
+
+    async def run():
+        await cache.put("What do tigers eat?", [], "Deer.")
+        await cache.put("Where do elephants sleep?", [], "Standing up.")
+        removed = await cache.purge("tigers eat")
+        tiger, elephant = await cache.get("What do tigers eat?", []), await cache.get("Where do elephants sleep?", [])
+        # The purged question no longer sits in any LSH bucket
+        buckets = [members for key, members in cache.redis.data.items() if ':lsh:' in key]
+        leftover = [member for members in buckets for member in members if not member.endswith(elephant_hash)]
+        await cache.purge()
+        return removed, tiger, elephant, len(buckets), leftover, cache.redis.data
+
+    elephant_hash = question_hash(normalize_question("Where do elephants sleep?", cache.stop_words))
+    assert asyncio.run(run()) == (1, None, "Standing up.", ANSWER_CACHE_CONFIG['lsh_bands'], [], {})
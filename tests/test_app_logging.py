@@ -0,0 +1,84 @@
+import asyncio
+import json
+import logging
+import queue
+
+import app_logging
+
+
+def make_handler(size=100):
+    handler = app_logging.NonBlockingQueueHandler(queue.Queue(size))
+    handler.addFilter(app_logging.ContextFilter())
+    return handler
+
+
+def test_records_carry_request_id_extras_and_traceback_as_json():
+    handler = make_handler()
+    logger = logging.getLogger('junglore.test_json')
+    logger.addHandler(handler)
+    logger.propagate = False
+    token = app_logging._request_id.set('req-42')
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Lookup failed for %s", 'tiger', extra={'topic': 'tiger'})
+    finally:
+        app_logging._request_id.reset(token)
+        logger.removeHandler(handler)
+
+    record = handler.queue.get_nowait()
+    # Arguments and traceback are resolved before the record leaves the logging thread
+    assert record.args is None and record.exc_info is None
+    entry = json.loads(app_logging.JsonFormatter().format(record))
+    assert entry['request_id'] == 'req-42'
+    assert entry['msg'] == "Lookup failed for tiger"
+    assert entry['topic'] == 'tiger'
+    assert 'ValueError: boom' in entry['exc']
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = make_handler(size=1)
+    logger = logging.getLogger('junglore.test_full')
+    logger.addHandler(handler)
+    logger.propagate = False
+    logger.warning("first")
+    logger.warning("second")
+    logger.removeHandler(handler)
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+def test_debug_records_are_sampled_per_logger():
+    sampler = app_logging.DebugSampler(0.0, {'junglore.kept': 1.0})
+
+    def record(name, level):
+        return logging.LogRecord(name, level, __file__, 1, "msg", None, None)
+
+    assert sampler.filter(record('junglore.kept', logging.DEBUG))
+    assert not sampler.filter(record('junglore.other', logging.DEBUG))
+    assert sampler.filter(record('junglore.other', logging.INFO))
+
+
+def test_middleware_reuses_or_generates_request_ids():
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(app_logging.request_id())
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+
+    middleware = app_logging.RequestIdMiddleware(app)
+
+    async def call(headers):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+        await middleware({'type': 'http', 'headers': headers}, None, send)
+        return dict(sent[0]['headers'])[b'x-request-id'].decode()
+
+    reused = asyncio.run(call([(b'x-request-id', b'abc-123')]))
+    generated = asyncio.run(call([(b'x-request-id', b'not valid!')]))
+    assert reused == 'abc-123' and seen[0] == 'abc-123'
+    assert generated == seen[1] and generated != 'not valid!'
+    assert app_logging.request_id() == '-'
@@ -0,0 +1,17 @@
+import asyncio
+
+from connections import ConnectionManager, TimedQueuePool
+from config import CONNECTION_POOL_CONFIG
+
+
+def test_postgres_engine_uses_configured_pool_and_statement_cache():
+    manager = ConnectionManager(CONNECTION_POOL_CONFIG)
+    engine = manager.create_postgres_engine("postgresql+asyncpg://u:p@localhost/db")
+    settings = CONNECTION_POOL_CONFIG['postgres']
+    assert isinstance(engine.pool, TimedQueuePool)
+    assert engine.pool.size() == settings['pool_size']
+    assert engine.url.query['prepared_statement_cache_size'] == str(settings['statement_cache_size'])
+    # Disposing replaces the pool; the replacement keeps reporting into the same timer
+    asyncio.run(engine.dispose())
+    assert engine.pool.wait_timer is manager._postgres_waits
+    assert manager.report()['postgres']['in_use'] == 0
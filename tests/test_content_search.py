@@ -0,0 +1,92 @@
+from main import extract_search_keywords, build_search_candidates
+
+
+def test_search_candidates_keep_priority_order():
+    keywords = extract_search_keywords("Tell me about tiger conservation in Kanha")
+    assert keywords == ['tiger', 'conservation', 'kanha']
+    assert build_search_candidates(keywords) == [
+        'tiger', 'conservation', 'kanha',
+        'tiger conservation',
+        'tiger conservation kanha',
+    ]
+
+
+def test_search_candidates_deduplicate():
+    assert build_search_candidates(['leopards', 'leopards']) == ['leopards', 'leopards leopards']
+    assert build_search_candidates([]) == []
+
+
+def test_batch_search_orders_rows_by_rank_within_each_topic(monkeypatch):
+    import main
+
+    for fulltext in (True, False):
+        monkeypatch.setattr(main, 'fulltext_search_available', fulltext)
+        sql = " ".join(main.batch_content_search_sql().split())
+        assert sql.endswith("ORDER BY t.priority, matches.rank DESC, matches.published_at DESC NULLS LAST")
+
+
+def _article(doc_id, title, excerpt="", views=0):
+    return {"id": doc_id, "title": title, "slug": doc_id, "excerpt": excerpt,
+            "type": "BLOG", "views": views, "relevance_score": 0}
+
+
+def test_article_index_bm25_ranking_and_updates():
+    from article_index import ArticleIndex
+
+    index = ArticleIndex()
+    index.upsert(_article("tigers-of-tadoba", "Tigers of Tadoba", "Tiger families in the park"))
+    index.upsert(_article("elephant-corridors", "Elephant corridors", "How tigers and elephants share forests"))
+    index.upsert(_article("birding", "Birding in Kanha"))
+
+    results = index.search("tiger")
+    assert [a["id"] for a in results] == ["tigers-of-tadoba", "elephant-corridors"]
+    assert index.search("tiger kanha") == []
+    assert index.search_first(["hello", "kanha"])[0] == "kanha"
+
+    index.remove("tigers-of-tadoba")
+    assert [a["id"] for a in index.search("tigers")] == ["elephant-corridors"]
+    assert index.document_frequency("tiger") == 1
+
+
+def test_chit_chat_recommends_no_posts(monkeypatch):
+    import asyncio
+
+    import main
+    from article_index import ArticleIndex
+
+    index = ArticleIndex()
+    for doc_id, title, excerpt in [
+        ("tigers-of-tadoba", "Tigers of Tadoba", "A great day tracking tiger families in the park"),
+        ("elephant-corridors", "Elephant corridors", "How elephants move between forests"),
+        ("birding-kanha", "Birding in Kanha", "Good birding spots and what you will see"),
+        ("leopard-night", "A night with leopards", "Leopards of Jhalana, a great place for sightings"),
+        ("monsoon-kaziranga", "Monsoon in Kaziranga", "Rhinos and floods in the wet season"),
+        ("packing-list", "What to pack for a safari", "A good packing list for your first day"),
+        ("great-indian-bustard", "The great Indian bustard", "Saving a critically endangered bird"),
+        ("snow-leopard", "Snow leopards of Hemis", "Winter treks in Ladakh"),
+    ]:
+        index.upsert(_article(doc_id, title, excerpt))
+    monkeypatch.setattr(main.article_index_refresher, 'index', index)
+    monkeypatch.setattr(main.article_index_refresher, 'ready', True)
+
+    for message in ["Thanks, that sounds great! Have a good day", "good morning!", "ok great"]:
+        assert asyncio.run(main.match_content_in_database(message))["posts"] == []
+    rhinos = asyncio.run(main.match_content_in_database("Tell me about rhinos"))
+    assert [post["id"] for post in rhinos["posts"]] == ["monsoon-kaziranga"]
+
+
+def test_score_threshold_rises_with_the_corpus():
+    from article_index import ArticleIndex
+    from config import ARTICLE_INDEX_CONFIG
+
+    ratio = ARTICLE_INDEX_CONFIG['min_score_ratio']
+    for filler in (5, 200):
+        index = ArticleIndex()
+        for i in range(3):
+            index.upsert(_article(f"trip-{i}", f"Trip report {i}", "We had a good time"))
+        index.upsert(_article("rhino-census", "Rhino census", "Counting rhinos"))
+        for i in range(filler):
+            index.upsert(_article(f"other-{i}", f"Other article {i}", "Forests and rivers"))
+        # A chit-chat word in a few excerpts gains idf as the corpus grows, but never clears the bar
+        assert index.search("good", min_score_ratio=ratio) == []
+        assert [a["id"] for a in index.search("rhino", min_score_ratio=ratio)] == ["rhino-census"]
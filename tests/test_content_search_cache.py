@@ -0,0 +1,79 @@
+import asyncio
+
+from config import CONTENT_SEARCH_CACHE_CONFIG
+from content_search_cache import ContentSearchCache, search_key
+
+
+class FakeRedis:
+    """Evaluates the cache's two scripts in Python"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def register_script(self, script):
+        async def run(keys, args):
+            if 'INCR' in script:
+                if self.data.get(keys[1]) != args[0]:
+                    self.data[keys[1]] = args[0]
+                    self.data[keys[0]] = str(int(self.data.get(keys[0], 0)) + 1)
+                    return [int(self.data[keys[0]]), 1]
+                return [int(self.data.get(keys[0], 0)), 0]
+            version = self.data.get(keys[0], '0')
+            return [version, self.data.get(f"{args[0]}{version}:{args[1]}")]
+        return run
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.ttls[key] = ex
+
+
+def make_cache():
+    return ContentSearchCache(FakeRedis(), {**CONTENT_SEARCH_CACHE_CONFIG, 'enabled': True})
+
+
+def test_search_key_normalizes_case_and_whitespace_but_keeps_priority():
+    assert search_key(['Tiger ', 'tiger  corridors'], ['tiger'], 5) == search_key(['tiger', 'TIGER corridors'], ['Tiger'], 5)
+    assert search_key(['tiger', 'corridors'], [], 5) != search_key(['corridors', 'tiger'], [], 5)
+    assert search_key(['tiger'], [], 5) != search_key(['tiger'], [], 10)
+
+
+def test_results_and_misses_are_cached_with_their_own_ttls():
+    cache = make_cache()
+    posts = [{'title': 'Tiger corridors'}]
+
+    async def run():
+        version, cached = await cache.get('found')
+        assert cached is None
+        await cache.put(version, 'found', 'tiger', posts)
+        version, _ = await cache.get('nothing')
+        await cache.put(version, 'nothing', None, [])
+        return await cache.get('found'), await cache.get('nothing')
+
+    (_, found), (_, nothing) = asyncio.run(run())
+    assert found == ('tiger', posts)
+    assert nothing == (None, [])
+    assert cache.redis.ttls['content_search:0:found'] == CONTENT_SEARCH_CACHE_CONFIG['ttl']
+    assert cache.redis.ttls['content_search:0:nothing'] == CONTENT_SEARCH_CACHE_CONFIG['negative_ttl']
+    report = cache.stats_report()
+    assert (report['hits'], report['negative_hits'], report['misses']) == (1, 1, 2)
+    assert report['hit_ratio'] == 0.5
+
+
+def test_content_change_retires_every_entry_once():
+    cache = make_cache()
+
+    async def run():
+        await cache.invalidate_if_changed("10:2024-01-01")
+        version, _ = await cache.get('nothing')
+        await cache.put(version, 'nothing', None, [])
+        unchanged = await cache.invalidate_if_changed("10:2024-01-01")
+        before = await cache.get('nothing')
+        changed = await cache.invalidate_if_changed("11:2024-01-02")
+        after = await cache.get('nothing')
+        return unchanged, before, changed, after
+
+    unchanged, before, changed, after = asyncio.run(run())
+    assert unchanged == 1 and before == ('1', (None, []))
+    assert changed == 2 and after == ('2', None)
+    assert cache.stats['invalidations'] == 2
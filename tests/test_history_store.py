@@ -0,0 +1,79 @@
+import asyncio
+
+from history_store import LocalHistoryCache, RedisHistoryStore
+
+
+class FakeRedis:
+    def register_script(self, script):
+        return None
+
+
+def test_local_cache_evicts_least_recently_used_by_count_and_bytes():
+    cache = LocalHistoryCache(max_entries=2, max_bytes=100, ttl=60)
+    cache.put("a", [{"text": "a"}], 10)
+    cache.put("b", [{"text": "b"}], 10)
+    assert cache.get("a") == [{"text": "a"}]
+    cache.put("c", [{"text": "c"}], 10)
+    assert cache.get("b") is None
+    assert cache.bytes == 20
+
+    cache.put("d", [{"text": "d"}], 95)
+    assert list(cache.entries) == ["d"]
+    assert cache.bytes == 95
+    cache.put("huge", [], 500)
+    assert cache.get("huge") is None
+
+
+def test_local_cache_expires_entries():
+    cache = LocalHistoryCache(max_entries=10, max_bytes=100, ttl=0)
+    cache.put("a", [{"text": "a"}], 10)
+    assert cache.get("a") is None
+    assert cache.bytes == 0
+
+
+def test_invalidations_from_other_workers_drop_local_window():
+    store = RedisHistoryStore(FakeRedis())
+    store.local.put("s1", [{"text": "hi"}], 10)
+    store._handle_invalidation(f"{store.worker_id}:s1")
+    assert store.local.get("s1") is not None
+    store._handle_invalidation("other-worker:s1")
+    assert store.local.get("s1") is None
+    assert store.stats['invalidations'] == 1
+
+
+def test_seed_caches_locally_only_when_it_started_the_list():
+    class SeedingRedis:
+        def __init__(self):
+            self.lists = {}
+
+        def register_script(self, script):
+            async def seed(keys, args):
+                if keys[0] in self.lists:
+                    return 0
+                self.lists[keys[0]] = list(args[1:])
+                return 1
+            return seed
+
+    store = RedisHistoryStore(SeedingRedis())
+    store.invalidation_live = True
+    asyncio.run(store.seed("s1", [{"sender": "user", "text": "hi"}]))
+    assert store.local.get("s1") == [{"sender": "user", "text": "hi"}]
+
+    # Another request already started s2's list: our (possibly older) window stays out of the local tier
+    store.redis.lists[store.key("s2")] = ['{"sender": "user", "text": "newer"}']
+    asyncio.run(store.seed("s2", [{"sender": "user", "text": "older"}]))
+    assert store.local.get("s2") is None
+
+
+def test_legacy_json_turns_precede_message_rows_unless_backfilled():
+    from types import SimpleNamespace
+
+    from main import legacy_messages
+
+    history = [{"sender": "user", "text": "hi"}, {"sender": "bot", "text": "hello"}]
+    later_row = SimpleNamespace(sender="user", text="tigers?")
+    backfilled_row = SimpleNamespace(sender="user", text="hi")
+    assert [m['seq'] for m in legacy_messages(history, later_row)] == [-2, -1]
+    assert legacy_messages(history, None)[0]['text'] == "hi"
+    assert legacy_messages(history, backfilled_row) == []
+    assert legacy_messages(None, later_row) == []
@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from history_writer import HistoryWriteBehind, journal_entry, message_rows
+
+CONFIG = {
+    'enabled': True,
+    'journal_key': 'journal',
+    'dead_letter_key': 'journal:dead',
+    'flush_interval': 1.0,
+    'batch_size': 2,
+    'max_pending': 100,
+    'inline_flush_timeout': 1,
+    'max_retry_delay': 1,
+    'shutdown_flush_timeout': 1
+}
+
+
+class FakeRedis:
+    """Lists plus a Python stand-in for the journal trim script"""
+
+    def __init__(self):
+        self.lists = {}
+
+    def register_script(self, script):
+        async def trim(keys, args):
+            journal = self.lists.get(keys[0], [])
+            if journal and journal[0] == args[0]:
+                del journal[:args[1]]
+                return 1
+            return 0
+        return trim
+
+    async def lrange(self, key, start, end):
+        return self.lists.get(key, [])[start:end + 1]
+
+    async def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    async def lmove(self, source, destination, where_from, where_to):
+        if not self.lists.get(source):
+            return None
+        value = self.lists[source].pop(0)
+        self.lists.setdefault(destination, []).append(value)
+        return value
+
+
+class RecordingWriter(HistoryWriteBehind):
+    def __init__(self, redis_client, rejected_sessions=(), config=CONFIG):
+        super().__init__(redis_client, None, config)
+        self.rejected_sessions = set(rejected_sessions)
+        self.inserts = []
+        self.unavailable = False
+
+    async def write_rows(self, rows):
+        if self.unavailable:
+            raise OperationalError("INSERT", {}, ConnectionRefusedError("connection refused"))
+        if any(row['session_id'] in self.rejected_sessions for row in rows):
+            raise IntegrityError("INSERT", {}, ValueError("foreign key violation"))
+        self.inserts.append(rows)
+
+
+def turn(session_id, text):
+    return journal_entry(session_id, [{"sender": "user", "text": text}, {"sender": "bot", "text": "ok"}])
+
+
+def test_flush_batches_journal_in_order_and_trims_it():
+    redis_client = FakeRedis()
+    redis_client.lists['journal'] = [turn("s1", "a"), turn("s2", "b"), turn("s1", "c")]
+    writer = RecordingWriter(redis_client)
+
+    asyncio.run(writer.flush_all())
+
+    assert [len(rows) for rows in writer.inserts] == [4, 2]
+    assert [row['text'] for rows in writer.inserts for row in rows if row['sender'] == 'user'] == ["a", "b", "c"]
+    assert redis_client.lists['journal'] == []
+    assert writer.stats['messages_written'] == 6
+
+
+def test_rejected_turn_is_dead_lettered_without_blocking_others():
+    redis_client = FakeRedis()
+    bad = turn("deleted", "x")
+    redis_client.lists['journal'] = [bad, turn("s1", "a")]
+    writer = RecordingWriter(redis_client, rejected_sessions={"deleted"})
+
+    asyncio.run(writer.flush_all())
+
+    assert [rows[0]['session_id'] for rows in writer.inserts] == ["s1"]
+    assert redis_client.lists['journal:dead'] == [bad]
+    assert redis_client.lists['journal'] == []
+
+
+def test_replayed_entries_keep_their_message_uids():
+    entry = turn("s1", "a")
+    uids = [m['uid'] for m in json.loads(entry)['messages']]
+    assert [row['uid'] for row in message_rows([entry])] == uids
+    assert [row['uid'] for row in message_rows([entry])] == uids
+
+
+def test_unavailable_database_keeps_turns_journaled():
+    redis_client = FakeRedis()
+    entries = [turn("s1", "a"), turn("s2", "b")]
+    redis_client.lists['journal'] = list(entries)
+    writer = RecordingWriter(redis_client)
+    writer.unavailable = True
+
+    try:
+        asyncio.run(writer.flush_all())
+    except OperationalError:
+        pass
+    else:
+        raise AssertionError("connection errors must propagate")
+
+    assert redis_client.lists['journal'] == entries
+    assert 'journal:dead' not in redis_client.lists
+
+
+def test_dead_letters_replay_onto_the_journal():
+    redis_client = FakeRedis()
+    bad = turn("deleted", "x")
+    redis_client.lists['journal'] = [bad]
+    writer = RecordingWriter(redis_client, rejected_sessions={"deleted"})
+    asyncio.run(writer.flush_all())
+
+    writer.rejected_sessions.clear()
+    assert asyncio.run(writer.replay_dead_letters()) == 1
+    asyncio.run(writer.flush_all())
+
+    assert redis_client.lists['journal:dead'] == []
+    assert [rows[0]['session_id'] for rows in writer.inserts] == ["deleted"]
+
+
+def test_inline_backpressure_flushes_only_below_the_limit():
+    redis_client = FakeRedis()
+    redis_client.lists['journal'] = [turn("s1", str(i)) for i in range(6)]
+    writer = RecordingWriter(redis_client, config={**CONFIG, 'max_pending': 4})
+
+    asyncio.run(writer.accepted(6))
+
+    # Two batches of two bring the journal under the limit; the rest is left to the flusher
+    assert len(redis_client.lists['journal']) == 2
+    assert writer.stats['inline_flushes'] == 1
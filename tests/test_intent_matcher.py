@@ -0,0 +1,32 @@
+from intent_matcher import KeywordAutomaton, intent_matcher
+from main import detect_travel_intent
+
+
+def test_word_boundaries():
+    info = detect_travel_intent("Will it rain in the jungle again?")
+    assert info['ai_intent'] is False
+
+    info = detect_travel_intent("Can AI predict tiger sightings?")
+    assert info['ai_intent'] is True
+
+
+def test_plural_and_multi_word_keywords():
+    info = detect_travel_intent("Which gate for tigers in Jim Corbett?")
+    assert info['gate_prediction_intent'] is True
+    assert info['travel_intent'] is True
+    assert info['locations'][:2] == ['corbett', 'jim corbett']
+
+
+def test_overlapping_keywords_single_pass():
+    automaton = KeywordAutomaton({
+        'he': [('a', 'he', 0)],
+        'she': [('b', 'she', 0)],
+        'hers': [('c', 'hers', 0)],
+    })
+    labels = {label[0] for label in automaton.find('she said hers')}
+    assert labels == {'b', 'c'}
+
+
+def test_match_reports_config_order():
+    hits = intent_matcher.match("Tadoba or Kanha?")
+    assert hits['location'] == ['kanha', 'tadoba']
@@ -0,0 +1,45 @@
+from article_index import ArticleIndex
+from config import KEYWORD_PLANNER_CONFIG
+from keyword_planner import plan_search, span_attributes
+
+
+def _index():
+    index = ArticleIndex()
+    titles = {
+        "elephant-corridors": "Elephant corridors of Kaziranga",
+        "elephant-diet": "Something about elephant diet",
+        "tiger-census": "Something new in the tiger census",
+        "tiger-kanha": "Something to know about Kanha tigers",
+    }
+    for doc_id, title in titles.items():
+        index.upsert({"id": doc_id, "title": title, "slug": doc_id, "excerpt": "",
+                      "type": "BLOG", "views": 0, "relevance_score": 0})
+    return index
+
+
+def test_rarest_keywords_are_searched_first_and_common_ones_pruned():
+    index = _index()
+    plan = plan_search(["something", "elephant", "corridors"], index.document_frequency, len(index))
+    assert plan['ranked'] == [("corridors", 1), ("elephant", 2)]
+    assert plan['pruned'] == {"something": "common"}
+    # Combined topics keep message order
+    assert plan['candidates'] == ["elephant corridors", "corridors", "elephant"]
+    assert index.search_first(plan['candidates'])[0] == "elephant corridors"
+
+
+def test_absent_keywords_are_dropped_and_common_ones_kept_when_alone():
+    index = _index()
+    plan = plan_search(["hello", "something"], index.document_frequency, len(index))
+    assert plan['candidates'] == ["something"]
+    assert plan['pruned'] == {"hello": "absent"}
+    assert plan_search(["hello", "thanks"], index.document_frequency, len(index))['candidates'] == []
+
+
+def test_plan_respects_keyword_and_candidate_limits():
+    index = _index()
+    config = {**KEYWORD_PLANNER_CONFIG, 'max_keywords': 2, 'max_candidates': 2}
+    plan = plan_search(["tigers", "kanha", "census", "corridors"], index.document_frequency, len(index), config)
+    assert [keyword for keyword, _ in plan['ranked']] == ["kanha", "census"]
+    assert plan['pruned'] == {"tigers": "limit", "corridors": "limit"}
+    assert plan['candidates'] == ["kanha census", "kanha"]
+    assert span_attributes(plan)['plan.ranked'] == "kanha=1, census=1"
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import httpx
+import openai
+import pytest
+from openai import AsyncOpenAI
+
+from config import LLM_BACKEND_CONFIG
+from llm_backend import LLMTransport
+
+MESSAGES = [{'role': 'system', 'content': 'You are a guide.'}, {'role': 'user', 'content': 'Best time to see tigers?'}]
+
+
+def backend(mode, tmp_path, **overrides):
+    return {**LLM_BACKEND_CONFIG, 'mode': mode, 'cassette_dir': str(tmp_path), 'replay_speed': 0,
+            'synthetic': {**LLM_BACKEND_CONFIG['synthetic'], 'ttft': 0.0, 'tokens_per_second': 10000}, **overrides}
+
+
+def client_for(transport):
+    return AsyncOpenAI(api_key='test', http_client=httpx.AsyncClient(transport=transport), max_retries=0)
+
+
+def live_api():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        body = json.loads(request.content)
+        assert body['stream'] is True
+        events = [
+            {'id': 'c1', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'gpt-4o-mini',
+             'choices': [{'index': 0, 'delta': {'content': text}, 'finish_reason': None}]}
+            for text in ["Dawn ", "and ", "dusk ", "🐅"]
+        ]
+        sse = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+        return httpx.Response(200, headers={'content-type': 'text/event-stream'}, content=sse.encode())
+
+    return httpx.MockTransport(handler), calls
+
+
+async def streamed_reply(client):
+    stream = await client.chat.completions.create(model='gpt-4o-mini', messages=MESSAGES, stream=True)
+    return "".join([chunk.choices[0].delta.content or '' async for chunk in stream if chunk.choices])
+
+
+def test_recorded_stream_replays_without_the_network(tmp_path):
+    inner, calls = live_api()
+    recorded = asyncio.run(streamed_reply(client_for(LLMTransport(inner, backend('record', tmp_path)))))
+    assert recorded == "Dawn and dusk 🐅"
+    assert len(list(tmp_path.glob('*.json'))) == 1
+
+    offline, offline_calls = live_api()
+    replayed = asyncio.run(streamed_reply(client_for(LLMTransport(offline, backend('replay', tmp_path)))))
+    assert replayed == recorded
+    assert len(calls) == 1 and offline_calls == []
+
+
+def test_replay_miss_fails_fast_or_falls_back_to_synthetic(tmp_path):
+    inner, _ = live_api()
+    strict = client_for(LLMTransport(inner, backend('replay', tmp_path)))
+    with pytest.raises(openai.NotFoundError):
+        asyncio.run(strict.chat.completions.create(model='gpt-4o-mini', messages=MESSAGES))
+
+    lenient = client_for(LLMTransport(inner, backend('replay', tmp_path, replay_miss='synthetic')))
+    assert asyncio.run(streamed_reply(lenient))
+
+
+def test_synthetic_replies_are_deterministic_and_shaped_by_call(tmp_path):
+    inner, calls = live_api()
+    client = client_for(LLMTransport(inner, backend('synthetic', tmp_path)))
+
+    async def run():
+        first = await streamed_reply(client)
+        second = await streamed_reply(client)
+        matching = await client.chat.completions.create(model='gpt-4o-mini', max_tokens=50, messages=[
+            {'role': 'system', 'content': 'Match them with the most relevant safari package.'},
+            {'role': 'user', 'content': 'Packages: ...'}
+        ])
+        return first, second, matching
+
+    first, second, matching = asyncio.run(run())
+    assert first and first == second
+    assert matching.choices[0].message.content == "1"
+    assert matching.usage.completion_tokens == 1
+    assert calls == []
+
+
+def test_synthetic_mode_never_falls_through_to_the_live_api(tmp_path):
+    inner, calls = live_api()
+    client = client_for(LLMTransport(inner, backend('synthetic', tmp_path)))
+    with pytest.raises(openai.NotFoundError):
+        asyncio.run(client.embeddings.create(model='text-embedding-3-small', input='tigers'))
+    assert calls == []
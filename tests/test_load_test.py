@@ -0,0 +1,39 @@
+import pytest
+
+from benchmarks.load_test import backend_calls, compare_to_baseline, parse_metrics, parse_mix, percentile, summarize
+
+
+def test_percentiles_and_summary_per_kind():
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([5.0], 99) == 5.0
+    results = [('blog', 0.010, True), ('blog', 0.030, True), ('general', 0.100, True), ('general', 1.0, False)]
+    report = summarize(results, elapsed=2.0)
+    assert report['throughput_rps'] == 2.0
+    assert report['errors'] == 1 and report['error_rate'] == 0.25
+    assert report['kinds']['blog']['p50_ms'] == 10.0
+    assert report['kinds']['general']['requests'] == 1
+
+
+def test_backend_calls_from_metrics_deltas():
+    before = parse_metrics('chatbot_backend_latency_seconds_count{backend="redis",operation="history_read"} 4.0\n')
+    after = parse_metrics(
+        '# HELP chatbot_backend_latency_seconds Latency\n'
+        'chatbot_backend_latency_seconds_count{backend="redis",operation="history_read"} 10.0\n'
+        'chatbot_backend_latency_seconds_count{backend="openai",operation="chat"} 3.0\n'
+        'chatbot_backend_latency_seconds_sum{backend="openai",operation="chat"} 1.5\n'
+    )
+    assert backend_calls(before, after) == {'redis.history_read': 6.0, 'openai.chat': 3.0}
+
+
+def test_regressions_against_baseline():
+    baseline = {'throughput_rps': 100.0, 'kinds': {'blog': {'p95_ms': 50.0}}, 'calls_per_request': {'openai.chat': 0.5}}
+    within = {'throughput_rps': 90.0, 'kinds': {'blog': {'p95_ms': 55.0}}, 'calls_per_request': {'openai.chat': 0.5}}
+    worse = {'throughput_rps': 70.0, 'kinds': {'blog': {'p95_ms': 80.0}}, 'calls_per_request': {'openai.chat': 1.0}}
+    assert compare_to_baseline(within, baseline, 0.15) == []
+    assert len(compare_to_baseline(worse, baseline, 0.15)) == 3
+
+
+def test_mix_rejects_unknown_kinds():
+    assert parse_mix('gate=1,blog=2.5') == {'gate': 1.0, 'blog': 2.5}
+    with pytest.raises(ValueError):
+        parse_mix('weather=1')
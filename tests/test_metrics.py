@@ -0,0 +1,22 @@
+import asyncio
+
+import pytest
+
+import metrics
+
+
+@pytest.mark.skipif(not metrics.METRICS_AVAILABLE, reason="prometheus_client not installed")
+def test_track_times_calls_and_counts_failures():
+    async def failing_call():
+        async with metrics.track('redis', 'test_op'):
+            raise ConnectionError("down")
+
+    with metrics.track('redis', 'test_op'):
+        pass
+    with pytest.raises(ConnectionError):
+        asyncio.run(failing_call())
+
+    body, _ = metrics.render()
+    text = body.decode()
+    assert 'chatbot_backend_latency_seconds_count{backend="redis",operation="test_op"} 2.0' in text
+    assert 'chatbot_backend_errors_total{backend="redis",operation="test_op"} 1.0' in text
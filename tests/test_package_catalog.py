@@ -0,0 +1,126 @@
+import asyncio
+
+from package_catalog import PackageCatalog, park_names_for_package
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return [dict(d) for d in self.documents]
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.find_calls = 0
+
+    def find(self, query):
+        self.find_calls += 1
+        return FakeCursor(self.documents)
+
+    def aggregate(self, pipeline):
+        return FakeCursor([{"count": len(self.documents), "latest": None}])
+
+
+def test_catalog_caches_and_precomputes():
+    collection = FakeCollection([
+        {"_id": 1, "title": "Tadoba", "region": "Tadoba National Park", "type": "Expedition"},
+    ])
+    catalog = PackageCatalog(collection, lambda pkg: f"url:{pkg['title']}")
+
+    async def read_twice():
+        await catalog.get_packages()
+        return await catalog.get_packages()
+
+    packages = asyncio.run(read_twice())
+    assert collection.find_calls == 1
+    assert packages[0]['post_url'] == 'url:Tadoba'
+    assert packages[0]['park_names'] == ['Tadoba']
+
+    async def read_stale():
+        catalog.invalidate()
+        collection.documents = collection.documents + [{"_id": 2, "title": "Kanha"}]
+        stale = await catalog.get_packages()  # Served at once; the reload runs in the background
+        await catalog._reload_task
+        return stale, await catalog.get_packages()
+
+    stale, reloaded = asyncio.run(read_stale())
+    assert [p['_id'] for p in stale] == [1]
+    assert [p['_id'] for p in reloaded] == [1, 2]
+    assert collection.find_calls == 2
+
+
+def test_fingerprint_tracks_both_updated_fields():
+    class GroupingCollection(FakeCollection):
+        def aggregate(self, pipeline):
+            group = pipeline[0]["$group"]
+            return FakeCursor([{"count": len(self.documents), **{
+                name: max((d.get(spec["$max"][1:]) for d in self.documents if spec["$max"][1:] in d), default=None)
+                for name, spec in group.items() if name.startswith("latest")
+            }}])
+
+    collection = GroupingCollection([{"_id": 1, "updated_at": 1}, {"_id": 2, "updatedAt": 5}])
+    catalog = PackageCatalog(collection, lambda pkg: "")
+    before = asyncio.run(catalog._fingerprint())
+    collection.documents[0]["updated_at"] = 2
+    assert before == (2, 1, 5)
+    assert asyncio.run(catalog._fingerprint()) != before
+
+
+def test_park_names_for_package():
+    package = {"heading": "Jim Corbett National Park", "title": "Jim Corbett Expedition"}
+    assert park_names_for_package(package) == ['Jim Corbett']
+
+
+def test_term_index_ranks_by_hits_without_substring_false_hits():
+    from package_catalog import PackageTermIndex
+
+    packages = [
+        {"_id": 1, "title": "Tadoba Expedition", "region": "Maharashtra"},
+        {"_id": 2, "title": "Ranthambore Tiger Safari", "slug": "ranthambore-tigers"},
+        {"_id": 3, "title": "Maasai Mara Migration", "region": "Kenya, Africa"},
+    ]
+    index = PackageTermIndex(packages, min_prefix_length=4)
+
+    assert index.search(['tad', 'ran']) == []
+    assert [p['_id'] for p, _ in index.search(['ranth'])] == [2]
+    ranked = index.search(['tigers', 'kenya', 'africa'])
+    assert [(p['_id'], hits) for p, hits in ranked] == [(3, 2), (2, 1)]
+
+
+def test_generic_words_match_no_package_after_normalization():
+    from config import PACKAGE_CATALOG_CONFIG
+    from package_catalog import PackageTermIndex
+
+    packages = [
+        {"_id": 1, "title": "Tadoba Expedition", "heading": "Tadoba National Park"},
+        {"_id": 2, "title": "Ranthambore Tiger Safari Package"},
+    ]
+    index = PackageTermIndex(packages, 4, PACKAGE_CATALOG_CONFIG['query_stop_words'])
+
+    for message in ["tell me about expeditions in kenya", "Do you have expeditions?", "any safaris or packages?"]:
+        assert index.search([w for w in message.lower().split() if len(w) > 2]) == []
+    assert [p['_id'] for p, _ in index.search("tadoba expeditions".split())] == [1]
+
+
+def test_description_hash_tracks_content():
+    from package_descriptions import package_content_hash, fallback_description
+
+    package = {"_id": 1, "title": "Tadoba", "description": "x" * 150, "status": True}
+    unchanged = dict(package, status=False, image="new.jpg")
+    edited = dict(package, description="Tigers of Tadoba")
+    assert package_content_hash(package) == package_content_hash(unchanged)
+    assert package_content_hash(package) != package_content_hash(edited)
+    assert fallback_description(package, "short") == "x" * 100 + "..."
+
+
+def test_description_hash_matches_across_mongo_and_postgres_copies():
+    from package_descriptions import package_content_hash
+
+    mongo = {"_id": "64f0", "title": "Tadoba Expedition ", "price": 4500, "duration": "3 Days"}
+    postgres = {"_id": "64f0", "title": "Tadoba Expedition", "description": "", "heading": "", "region": "",
+                "duration": "3 Days", "type": "", "price": 4500.0, "currency": "INR", "features": {}}
+    assert package_content_hash(mongo) == package_content_hash(postgres)
+    assert package_content_hash(mongo) != package_content_hash(dict(postgres, price=4999.0))
@@ -0,0 +1,34 @@
+from package_ranking import rank_package_candidates, clear_winner
+
+PACKAGES = [
+    {"title": "Jim Corbett Tiger Safari", "region": "Uttarakhand", "duration": "3 Days", "type": "expedition", "price": 45000},
+    {"title": "Kanha Jungle Expedition", "description": "Tigers and barasingha", "duration": "4 Days", "type": "expedition", "price": 60000},
+    {"title": "Kerala Backwater Resort", "region": "Kerala", "duration": "2 Days", "type": "resort", "price": 250000},
+]
+
+
+def test_location_and_wildlife_rank_first():
+    ranked = rank_package_candidates("I want to see tigers in Kanha", PACKAGES, locations=['kanha'])
+    assert ranked[0][0]['title'] == "Kanha Jungle Expedition"
+    assert clear_winner(ranked, margin=4) is PACKAGES[1]
+
+
+def test_excluded_location_is_dropped():
+    ranked = rank_package_candidates("tiger safari but not in corbett", PACKAGES)
+    assert PACKAGES[0] not in [package for package, _ in ranked]
+
+
+def test_no_clear_winner_without_signal():
+    ranked = rank_package_candidates("any suggestions?", PACKAGES)
+    assert len(ranked) == 3
+    assert clear_winner(ranked, margin=4) is None
+
+
+def test_overlapping_location_names_count_once():
+    from package_ranking import parse_preferences, score_package
+
+    preferences = parse_preferences("tigers in jim corbett national park")
+    assert preferences['locations'] == ['corbett']
+    single = score_package(PACKAGES[0], parse_preferences("tigers in corbett"))
+    assert score_package(PACKAGES[0], preferences) == single
+    assert parse_preferences("safari, not in jim corbett")['excluded_locations'] == ['corbett']
@@ -0,0 +1,17 @@
+import asyncio
+import time
+
+from main import await_optional_stage
+
+
+def test_optional_stage_dropped_after_deadline():
+    async def run():
+        slow = asyncio.create_task(asyncio.sleep(5, result="card"))
+        fast = asyncio.create_task(asyncio.sleep(0, result="card"))
+        deadline = time.monotonic() + 0.05
+        return await await_optional_stage(fast, deadline, "fast"), await await_optional_stage(slow, deadline, "slow"), slow
+
+    fast_result, slow_result, slow_task = asyncio.run(run())
+    assert fast_result == "card"
+    assert slow_result is None
+    assert slow_task.cancelled()
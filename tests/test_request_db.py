@@ -0,0 +1,82 @@
+import asyncio
+
+from request_db import RequestSessions
+
+
+class FakeSession:
+    def __init__(self):
+        self.new, self.dirty, self.deleted = set(), set(), set()
+        self.active = False
+        self.rollbacks = 0
+        self.closed = False
+
+    def in_transaction(self):
+        return self.active
+
+    async def execute(self):
+        self.active = True
+
+    async def rollback(self):
+        self.active = False
+        self.rollbacks += 1
+
+    async def close(self):
+        self.closed = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+def test_helpers_share_one_lazily_created_session_per_request():
+    created = []
+
+    def factory():
+        created.append(FakeSession())
+        return created[-1]
+
+    sessions = RequestSessions(factory)
+
+    async def helper():
+        async with sessions.session() as session:
+            await session.execute()
+            await asyncio.sleep(0)
+            return session
+
+    async def request():
+        async with sessions.scope():
+            first, second = await asyncio.gather(helper(), helper())
+        return first, second
+
+    first, second = asyncio.run(request())
+    assert first is second
+    assert len(created) == 1
+    # Each use ended its read-only transaction, returning the connection to the pool
+    assert first.rollbacks == 2 and not first.in_transaction()
+    assert first.closed
+    assert sessions.stats['requests'] == 1
+
+
+def test_private_session_outside_request_or_after_scope_closes():
+    created = []
+
+    def factory():
+        created.append(FakeSession())
+        return created[-1]
+
+    sessions = RequestSessions(factory)
+
+    async def run():
+        async with sessions.session() as outside:
+            pass
+        async with sessions.scope():
+            pass
+        async with sessions.session() as late:
+            pass
+        return outside, late
+
+    outside, late = asyncio.run(run())
+    assert outside is not late
+    assert outside.closed and late.closed
@@ -0,0 +1,75 @@
+import asyncio
+
+import tracing
+from config import TRACING_CONFIG
+
+
+def make_tracer():
+    # Queued records are inspected directly; run() is never started, so nothing is written
+    return tracing.Tracer({**TRACING_CONFIG, 'enabled': True, 'sample_rate': 1.0, 'exporter': 'jsonl'})
+
+
+def test_spans_nest_under_the_request_and_feed_server_timing():
+    tracer = make_tracer()
+
+    @tracing.traced()
+    async def lookup():
+        with tracing.span('redis.history_read'):
+            await asyncio.sleep(0)
+
+    async def request():
+        root = tracer.start('POST /sessions/x/message')
+        with root:
+            await lookup()
+            await lookup()
+            header = tracing.server_timing(root.trace, root, 15)
+        tracer.finish(root)
+        return root, header
+
+    root, header = asyncio.run(request())
+    record = tracer.queue.get_nowait()
+    by_name = {}
+    for span in record['spans']:
+        by_name.setdefault(span['name'], []).append(span)
+
+    assert len(by_name['lookup']) == 2
+    assert all(s['parent_id'] == root.span_id for s in by_name['lookup'])
+    lookup_ids = {s['span_id'] for s in by_name['lookup']}
+    assert all(s['parent_id'] in lookup_ids for s in by_name['redis.history_read'])
+    assert header.startswith('total;dur=')
+    assert 'lookup;dur=' in header and 'desc="2 calls"' in header
+
+
+def test_span_outside_a_trace_is_a_noop():
+    with tracing.span('orphan') as span:
+        span.set('key', 'value')
+    assert tracing.current_span() is span
+
+
+def test_otlp_payload_links_parents_and_flags_errors():
+    tracer = make_tracer()
+    root = tracer.start('GET /sessions/')
+    try:
+        with root:
+            with tracing.span('postgres.query', rows=3):
+                raise ValueError("boom")
+    except ValueError:
+        pass
+    tracer.finish(root)
+
+    payload = tracing.otlp_payload([tracer.queue.get_nowait()], 'junglore-bot')
+    spans = payload['resourceSpans'][0]['scopeSpans'][0]['spans']
+    child = next(s for s in spans if s['name'] == 'postgres.query')
+    parent = next(s for s in spans if s['name'] == 'GET /sessions/')
+    assert child['parentSpanId'] == parent['spanId'] and parent['parentSpanId'] == ''
+    assert child['status']['code'] == 2 and 'boom' in child['status']['message']
+    assert {'key': 'rows', 'value': {'intValue': '3'}} in child['attributes']
+
+
+def test_no_exporter_queues_nothing():
+    tracer = tracing.Tracer({**TRACING_CONFIG, 'enabled': True, 'sample_rate': 1.0, 'exporter': 'none'})
+    root = tracer.start('GET /sessions/')
+    with root:
+        pass
+    tracer.finish(root)
+    assert tracer.queue.empty() and tracer.stats['traces'] == 1
@@ -0,0 +1,122 @@
+import asyncio
+from types import SimpleNamespace
+
+from config import VOCABULARY_FILTER_CONFIG
+from vocabulary_filter import BloomFilter, VocabularyFilter, filter_size, match_key
+
+ROWS = [
+    ("Tiger corridors", "How tigers migrate", "Tigers are hoping for connected forests."),
+    ("Happy elephants", None, "Running herds in Kaziranga."),
+]
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def one(self):
+        return self.rows[0]
+
+    def __aiter__(self):
+        async def rows():
+            for row in self.rows:
+                yield row
+        return rows()
+
+
+class FakeSession:
+    async def execute(self, statement):
+        return FakeResult([SimpleNamespace(row_count=len(ROWS), changed_at='2024-01-01')])
+
+    async def stream(self, statement):
+        return FakeResult(ROWS)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+
+    def set(self, key, value):
+        self.redis.data[key] = value
+
+    def hset(self, key, mapping):
+        self.redis.data[key] = {field: str(value) for field, value in mapping.items()}
+
+    async def execute(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+
+def test_match_keys_conflate_stemmer_variants():
+    assert match_key("migrate") == match_key("migration")
+    assert match_key("hope") == match_key("hoping")
+    assert match_key("runs") == match_key("running")
+    assert match_key("happy") == match_key("happiness")
+    assert match_key("tigers") == match_key("tiger")
+
+
+def test_filter_size_meets_rate_within_memory_cap():
+    bits, hashes = filter_size(10000, 0.01, 1024 * 1024)
+    bloom = BloomFilter(bits, hashes)
+    for i in range(10000):
+        bloom.add(f"word{i}")
+    assert all(f"word{i}" in bloom for i in range(10000))
+    assert bloom.expected_false_positive_rate() < 0.011
+    assert filter_size(10000, 0.0001, 1024)[0] == 1024 * 8
+
+
+def test_built_filter_is_shared_through_redis_and_skips_unknown_topics():
+    redis = FakeRedis()
+    config = {**VOCABULARY_FILTER_CONFIG, 'enabled': True}
+    builder = VocabularyFilter(redis, FakeSession, config)
+    worker = VocabularyFilter(redis, FakeSession, config)
+    topics = ["hello", "tiger", "migrating elephants", "hello tiger"]
+
+    async def run():
+        assert worker.searchable(topics) == topics  # Nothing loaded yet
+        assert await builder.rebuild_if_changed()
+        assert not await builder.rebuild_if_changed()  # Content unchanged
+        assert await worker.load_if_published()
+        assert not await worker.load_if_published()
+
+    asyncio.run(run())
+    assert worker.searchable(topics) == ["tiger", "migrating elephants"]
+    assert worker.stats_report()['skipped'] == 2
+    assert 'vocabulary_filter:lock' not in redis.data
@@ -0,0 +1,326 @@
+"""
+Lightweight in-process request tracing.
+
+TracingMiddleware opens a trace per HTTP request; `span()` (or the `traced`
+decorator) records nested, timed stages inside it, and every backend call
+timed by metrics.track gets a span too. Each response carries a
+Server-Timing header summarising the stages finished before its headers
+were sent, and whole traces (span trees) are exported in the background to a
+JSONL file or an OTLP/HTTP (JSON) collector - scripts/trace_collector.py is a
+local stand-in for one.
+
+Outside a traced request every helper here is a no-op.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+
+import httpx
+
+from app_logging import get_logger, request_id
+from config import TRACING_CONFIG
+
+log = get_logger('tracing')
+
+_current_span = ContextVar('tracing_span', default=None)
+
+# Characters allowed in a Server-Timing metric name (an HTTP token)
+_NON_TOKEN = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+
+class Trace:
+    """Spans recorded for one request"""
+
+    __slots__ = ('trace_id', 'spans', 'max_spans', 'dropped')
+
+    def __init__(self, max_spans: int):
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self.max_spans = max_spans
+        self.dropped = 0
+
+
+class Span:
+    """One timed stage; usable with `with` or `async with`"""
+
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'attributes', 'start_ns', 'started',
+                 'duration', 'error', '_token')
+
+    def __init__(self, trace: Trace, name: str, parent_id, attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.duration = None
+        self.error = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self.started = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Exited in a different context than it was entered (e.g. a closed generator)
+            pass
+        trace = self.trace
+        if len(trace.spans) < trace.max_spans:
+            trace.spans.append(self)
+        else:
+            trace.dropped += 1
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+    def to_dict(self) -> dict:
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'duration_ms': round(self.duration * 1000, 3),
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+
+class _NoopSpan:
+    """Stand-in when no trace is active"""
+
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """Child span of the current one, or a no-op outside a traced request"""
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+
+def current_span():
+    return _current_span.get() or _NOOP
+
+
+def traced(name: str = None):
+    """Decorator wrapping every call of a (sync or async) function in a span"""
+    def decorate(func):
+        span_name = name or func.__name__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def server_timing(trace: Trace, root: Span, max_entries: int) -> str:
+    """Server-Timing header value: finished spans summed by name, slowest first, plus the total so far"""
+    totals = {}
+    for finished in trace.spans:
+        entry = totals.setdefault(_NON_TOKEN.sub('_', finished.name), [0.0, 0])
+        entry[0] += finished.duration
+        entry[1] += 1
+    slowest = sorted(totals.items(), key=lambda item: -item[1][0])[:max_entries]
+    parts = [f"total;dur={(time.perf_counter() - root.started) * 1000:.1f}"]
+    for metric, (duration, count) in slowest:
+        part = f"{metric};dur={duration * 1000:.1f}"
+        if count > 1:
+            part += f';desc="{count} calls"'
+        parts.append(part)
+    return ", ".join(parts)
+
+
+def otlp_payload(traces: list, service_name: str) -> dict:
+    """OTLP/HTTP JSON export request for a batch of finished traces"""
+    def attribute(key, value):
+        if isinstance(value, bool):
+            return {'key': key, 'value': {'boolValue': value}}
+        if isinstance(value, int):
+            return {'key': key, 'value': {'intValue': str(value)}}
+        if isinstance(value, float):
+            return {'key': key, 'value': {'doubleValue': value}}
+        return {'key': key, 'value': {'stringValue': str(value)}}
+
+    spans = []
+    for trace in traces:
+        for recorded in trace['spans']:
+            spans.append({
+                'traceId': trace['trace_id'],
+                'spanId': recorded['span_id'],
+                'parentSpanId': recorded['parent_id'] or '',
+                'name': recorded['name'],
+                'kind': 2 if recorded['parent_id'] is None else 1,  # SERVER for the request, INTERNAL below it
+                'startTimeUnixNano': str(recorded['start_ns']),
+                'endTimeUnixNano': str(recorded['start_ns'] + int(recorded['duration_ms'] * 1_000_000)),
+                'attributes': [attribute(k, v) for k, v in recorded['attributes'].items()],
+                'status': {'code': 2, 'message': recorded['error']} if recorded['error'] else {'code': 1}
+            })
+    return {'resourceSpans': [{
+        'resource': {'attributes': [attribute('service.name', service_name)]},
+        'scopeSpans': [{'scope': {'name': 'tracing'}, 'spans': spans}]
+    }]}
+
+
+class Tracer:
+    """Starts traces for requests and exports finished ones in the background"""
+
+    def __init__(self, config: dict = TRACING_CONFIG):
+        self.config = config
+        self.queue = asyncio.Queue(maxsize=config['max_queued_traces'])
+        self.stats = {'traces': 0, 'exported': 0, 'dropped': 0, 'export_errors': 0}
+        self._http = None
+
+    def start(self, name: str, **attributes):
+        """Root span for a new trace, or None when tracing is off or the request isn't sampled"""
+        if not self.config['enabled'] or random.random() >= self.config['sample_rate']:
+            return None
+        trace = Trace(self.config['max_spans_per_trace'])
+        return Span(trace, name, None, attributes)
+
+    def finish(self, root: Span):
+        """Queue a finished trace for export (dropped if the exporter is behind)"""
+        trace = root.trace
+        self.stats['traces'] += 1
+        if self.config['exporter'] == 'none':
+            return  # Server-Timing only; nothing would drain the queue
+        record = {
+            'trace_id': trace.trace_id,
+            'name': root.name,
+            'duration_ms': round(root.duration * 1000, 3),
+            'dropped_spans': trace.dropped,
+            'spans': [recorded.to_dict() for recorded in trace.spans]
+        }
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+
+    def _write_jsonl(self, records: list):
+        with open(self.config['jsonl_path'], 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+
+    async def _export(self, records: list):
+        exporter = self.config['exporter']
+        if exporter == 'jsonl':
+            await asyncio.to_thread(self._write_jsonl, records)
+        elif exporter == 'otlp':
+            if self._http is None:
+                self._http = httpx.AsyncClient(timeout=self.config['export_timeout'])
+            response = await self._http.post(
+                self.config['otlp_endpoint'], json=otlp_payload(records, self.config['service_name'])
+            )
+            response.raise_for_status()
+        self.stats['exported'] += len(records)
+
+    async def _drain(self):
+        records = []
+        while not self.queue.empty() and len(records) < self.config['export_batch_size']:
+            records.append(self.queue.get_nowait())
+        if records:
+            try:
+                await self._export(records)
+            except Exception as e:
+                self.stats['export_errors'] += 1
+                log.warning("Error exporting traces", extra={'error': str(e)})
+        return len(records)
+
+    async def run(self):
+        """Background task: export queued traces in batches"""
+        if not self.config['enabled'] or self.config['exporter'] == 'none':
+            return
+        while True:
+            await asyncio.sleep(self.config['export_interval'])
+            while await self._drain():
+                pass
+
+    async def shutdown(self):
+        """Export whatever is still queued and close the exporter's HTTP client"""
+        if self.config['enabled'] and self.config['exporter'] != 'none':
+            while await self._drain():
+                pass
+        if self._http is not None:
+            await self._http.aclose()
+
+
+class TracingMiddleware:
+    """ASGI middleware tracing each HTTP request and adding a Server-Timing header.
+
+    A plain ASGI middleware (not BaseHTTPMiddleware) so streamed responses
+    aren't buffered and the trace context reaches the endpoint. For streamed
+    responses the header covers the stages before the first byte; the exported
+    trace covers the whole stream.
+    """
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in self.tracer.config['exclude_paths']:
+            await self.app(scope, receive, send)
+            return
+        root = self.tracer.start(f"{scope['method']} {scope['path']}", **{
+            'http.method': scope['method'], 'http.target': scope['path'], 'request.id': request_id()
+        })
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                root.set('http.status_code', message['status'])
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', server_timing(root.trace, root, self.tracer.config['server_timing_max_entries']).encode('latin-1')))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            with root:
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            self.tracer.finish(root)
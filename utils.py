@@ -1 +1,21 @@
-# Utility functions for chatbot backend (placeholder) 
\ No newline at end of file
+# Utility functions for chatbot backend
+
+import re
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_token(token: str) -> str:
+    """Fold simple English plurals so 'tigers' and 'tiger' share a term"""
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(value) -> list:
+    """Lowercase, split on non-alphanumerics and normalize each token"""
+    if not value:
+        return []
+    return [normalize_token(t) for t in TOKEN_PATTERN.findall(str(value).lower())]
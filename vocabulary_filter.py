@@ -0,0 +1,222 @@
+"""
+Bloom filter of every word in published content (title, excerpt and body).
+
+A content search topic with a word that appears nowhere in the corpus can't
+match, so match_content_in_database drops it before querying PostgreSQL.
+Chit-chat ("hello", "thanks") then never costs a round trip. This only
+matters where PostgreSQL serves content matching in steady state: with the
+in-memory article index disabled, and with full-text search (LIKE matches
+substrings, which word keys can't vouch for).
+
+One worker at a time (Redis lock) rebuilds the filter when the `content`
+table's fingerprint changes and publishes it to Redis. Every worker loads the
+published filter into memory, so membership tests are local. Until a filter
+is loaded every topic is searched.
+
+Words are reduced to a match key (plural folding, a few suffixes stripped,
+first five characters) so the variants PostgreSQL's english stemmer
+conflates, such as "migrate"/"migration" or "hope"/"hoping", share a key.
+Over-merging only adds false positives, which cost a query, never a match.
+"""
+
+import asyncio
+import base64
+import hashlib
+import math
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app_logging import get_logger
+from config import VOCABULARY_FILTER_CONFIG
+from content_search_cache import CONTENT_FINGERPRINT_SQL
+from utils import normalize_token, tokenize
+
+log = get_logger('content')
+
+MATCH_SUFFIXES = ('ation', 'ness', 'ing', 'ion', 'ed', 'ly', 'es', 'e')
+MATCH_KEY_LENGTH = 5
+
+PUBLISHED_TEXT_SQL = """
+    SELECT title, excerpt, content
+    FROM content
+    WHERE status = 'PUBLISHED'
+"""
+
+
+def match_key(token: str) -> str:
+    """Coarse stem of a token used as the filter key"""
+    token = normalize_token(token)
+    for suffix in MATCH_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+    if len(token) > 5 and token.endswith('at'):
+        token = token[:-2]  # migrate/migrating/migration
+    if len(token) > 3 and token[-1] == token[-2]:
+        token = token[:-1]  # running -> runn -> run
+    if token.endswith('y'):
+        token = token[:-1] + 'i'  # happy/happiness
+    return token[:MATCH_KEY_LENGTH]
+
+
+def filter_size(items: int, false_positive_rate: float, max_bytes: int):
+    """(bits, hash functions) for `items` at the target false-positive rate, capped at `max_bytes`"""
+    items = max(items, 1)
+    bits = math.ceil(-items * math.log(false_positive_rate) / math.log(2) ** 2)
+    bits = max(64, min(bits, max_bytes * 8))
+    hashes = max(1, round(bits / items * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter with double hashing over a blake2b digest"""
+
+    def __init__(self, size_bits: int, hashes: int, bits: bytearray = None):
+        self.size_bits = size_bits
+        self.hashes = hashes
+        self.bits = bits if bits is not None else bytearray((size_bits + 7) // 8)
+        self.items = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size_bits for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.items += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def expected_false_positive_rate(self) -> float:
+        if not self.items:
+            return 0.0
+        return (1 - math.exp(-self.hashes * self.items / self.size_bits)) ** self.hashes
+
+
+class VocabularyFilter:
+    """Builds, publishes and loads the shared vocabulary Bloom filter"""
+
+    def __init__(self, redis_client, session_factory, config: dict = VOCABULARY_FILTER_CONFIG):
+        self.redis = redis_client
+        self.session_factory = session_factory
+        self.config = config
+        self.bits_key = config['key_prefix'] + 'bits'
+        self.meta_key = config['key_prefix'] + 'meta'
+        self.lock_key = config['key_prefix'] + 'lock'
+        self.bloom = None
+        self.version = None
+        self.stats = {'checked': 0, 'skipped': 0, 'builds': 0, 'loads': 0}
+
+    @property
+    def ready(self) -> bool:
+        return self.bloom is not None
+
+    def might_contain(self, topic: str) -> bool:
+        """False only if some word of `topic` occurs nowhere in published content (True while not loaded)"""
+        if self.bloom is None:
+            return True
+        return all(match_key(token) in self.bloom for token in tokenize(topic))
+
+    def searchable(self, topics: list) -> list:
+        """Search topics that may match published content, in order"""
+        if self.bloom is None:
+            return list(topics)
+        kept = [topic for topic in topics if self.might_contain(topic)]
+        self.stats['checked'] += len(topics)
+        self.stats['skipped'] += len(topics) - len(kept)
+        return kept
+
+    async def content_fingerprint(self) -> str:
+        async with self.session_factory() as session:
+            row = (await session.execute(text(CONTENT_FINGERPRINT_SQL))).one()
+        return f"{row.row_count}:{row.changed_at}"
+
+    async def build(self) -> BloomFilter:
+        """Scan published content and build a filter sized for its vocabulary"""
+        keys = set()
+        async with self.session_factory() as session:
+            result = await session.stream(text(PUBLISHED_TEXT_SQL))  # Server-side cursor
+            async for row in result:
+                for value in row:
+                    keys.update(match_key(token) for token in tokenize(value))
+        size_bits, hashes = filter_size(len(keys), self.config['false_positive_rate'], self.config['max_bytes'])
+        bloom = BloomFilter(size_bits, hashes)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    async def rebuild_if_changed(self) -> bool:
+        """Rebuild and publish the filter if content changed since the published one; True if rebuilt"""
+        fingerprint = await self.content_fingerprint()
+        if await self.redis.hget(self.meta_key, 'fingerprint') == fingerprint:
+            return False
+        # Only one worker scans the corpus; the others load its result
+        token = uuid.uuid4().hex
+        if not await self.redis.set(self.lock_key, token, nx=True, ex=self.config['build_timeout']):
+            return False
+        try:
+            started = time.perf_counter()
+            bloom = await self.build()
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.set(self.bits_key, base64.b64encode(bytes(bloom.bits)).decode('ascii'))
+                pipe.hset(self.meta_key, mapping={
+                    'version': uuid.uuid4().hex,
+                    'fingerprint': fingerprint,
+                    'size_bits': bloom.size_bits,
+                    'hashes': bloom.hashes,
+                    'items': bloom.items,
+                    'built_at': time.time()
+                })
+                await pipe.execute()
+        finally:
+            if await self.redis.get(self.lock_key) == token:
+                await self.redis.delete(self.lock_key)
+        self.stats['builds'] += 1
+        log.info("🔤 Vocabulary filter built", extra={
+            'words': bloom.items, 'bytes': len(bloom.bits), 'hashes': bloom.hashes,
+            'false_positive_rate': round(bloom.expected_false_positive_rate(), 5),
+            'seconds': round(time.perf_counter() - started, 2)
+        })
+        return True
+
+    async def load_if_published(self) -> bool:
+        """Load the published filter if it differs from the one in memory; True if loaded"""
+        meta = await self.redis.hgetall(self.meta_key)
+        if not meta or meta.get('version') == self.version:
+            return False
+        encoded = await self.redis.get(self.bits_key)
+        if encoded is None:
+            return False
+        bloom = BloomFilter(int(meta['size_bits']), int(meta['hashes']), bytearray(base64.b64decode(encoded)))
+        bloom.items = int(meta['items'])
+        self.bloom, self.version = bloom, meta['version']
+        self.stats['loads'] += 1
+        return True
+
+    async def run(self):
+        """Background loop: rebuild when content changes, then pick up the published filter"""
+        while True:
+            try:
+                await self.rebuild_if_changed()
+                await self.load_if_published()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Error refreshing vocabulary filter", extra={'error': str(e)})
+            await asyncio.sleep(self.config['refresh_interval'])
+
+    def stats_report(self) -> dict:
+        report = {**self.stats, 'ready': self.ready}
+        if self.bloom is not None:
+            report.update({
+                'words': self.bloom.items,
+                'bytes': len(self.bloom.bits),
+                'hashes': self.bloom.hashes,
+                'expected_false_positive_rate': round(self.bloom.expected_false_positive_rate(), 5)
+            })
+        return report